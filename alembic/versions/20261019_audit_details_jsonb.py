@@ -0,0 +1,37 @@
+"""audit_logs.details_json text -> jsonb, with a GIN index for containment filters
+
+Revision ID: 20261019_audit_jsonb
+Revises: 20261019_audit_entity_index
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "20261019_audit_jsonb"
+down_revision = "20261019_audit_entity_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The text default cannot be cast in place: drop it, convert, and set it again as jsonb
+    op.alter_column("audit_logs", "details_json", server_default=None)
+    op.alter_column(
+        "audit_logs", "details_json",
+        type_=postgresql.JSONB(),
+        postgresql_using="COALESCE(NULLIF(details_json, ''), '{}')::jsonb",
+    )
+    op.alter_column("audit_logs", "details_json", server_default=sa.text("'{}'::jsonb"))
+    op.create_index(
+        "ix_audit_logs_details", "audit_logs", ["details_json"], unique=False,
+        postgresql_using="gin", postgresql_ops={"details_json": "jsonb_path_ops"},
+    )
+
+
+def downgrade():
+    op.drop_index("ix_audit_logs_details", table_name="audit_logs")
+    op.alter_column("audit_logs", "details_json", server_default=None)
+    op.alter_column("audit_logs", "details_json", type_=sa.Text(), postgresql_using="details_json::text")
+    op.alter_column("audit_logs", "details_json", server_default="{}")
@@ -0,0 +1,25 @@
+"""composite (entity_type, entity_id, created_at) index on audit_logs for entity timelines
+
+Replaces ix_audit_logs_entity_type, which is a prefix of the new index.
+
+Revision ID: 20261019_audit_entity_index
+Revises: 20261019_native_dates
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+
+revision = "20261019_audit_entity_index"
+down_revision = "20261019_native_dates"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_audit_logs_entity_created", "audit_logs", ["entity_type", "entity_id", "created_at"], unique=False)
+    op.drop_index(op.f("ix_audit_logs_entity_type"), table_name="audit_logs")
+
+
+def downgrade():
+    op.create_index(op.f("ix_audit_logs_entity_type"), "audit_logs", ["entity_type"], unique=False)
+    op.drop_index("ix_audit_logs_entity_created", table_name="audit_logs")
@@ -0,0 +1,141 @@
+"""monthly range partitioning of audit_logs and email_logs by created_at
+
+Each table is rebuilt as a partitioned table (primary key (id, created_at), as required for
+partitioning) with one partition per month from its oldest row to three months ahead plus a
+default partition, and the existing rows are copied over. Later months are created by the
+maintain_log_partitions beat job (app/services/log_partitions.py).
+
+The copy runs in the migration transaction and holds an exclusive lock on both tables until it
+commits. For large tables, run it in a maintenance window. Check the row counts first with
+scripts/log_partitions_tool.py status.
+
+Revision ID: 20261019_partition_logs
+Revises: 20261019_audit_jsonb
+Create Date: 2026-10-19
+
+"""
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "20261019_partition_logs"
+down_revision = "20261019_audit_jsonb"
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+
+def _add_months(d: date, n: int) -> date:
+    y, m = divmod(d.year * 12 + d.month - 1 + n, 12)
+    return date(y, m + 1, 1)
+
+
+def _utc(d: date) -> str:
+    return datetime(d.year, d.month, d.day, tzinfo=timezone.utc).isoformat()
+
+
+def _audit_columns():
+    return [
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("actor_user_id", sa.String(length=36), nullable=False),
+        sa.Column("action", sa.String(length=80), nullable=False),
+        sa.Column("entity_type", sa.String(length=40), nullable=False),
+        sa.Column("entity_id", sa.String(length=36), nullable=False),
+        sa.Column("details_json", postgresql.JSONB(), nullable=False, server_default=sa.text("'{}'::jsonb")),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+    ]
+
+
+def _email_columns():
+    return [
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("to_email", sa.String(length=320), nullable=False),
+        sa.Column("subject", sa.String(length=200), nullable=False),
+        sa.Column("body", sa.Text(), nullable=True),
+        sa.Column("status", sa.String(length=30), nullable=False, server_default="queued"),
+        sa.Column("related_booking_ref", sa.String(length=20), nullable=False, server_default=""),
+        sa.Column("attach_ticket_booking_ref", sa.String(length=20), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+    ]
+
+
+def _audit_indexes():
+    op.create_index("ix_audit_logs_actor_user_id", "audit_logs", ["actor_user_id"])
+    op.create_index("ix_audit_logs_action", "audit_logs", ["action"])
+    op.create_index("ix_audit_logs_entity_id", "audit_logs", ["entity_id"])
+    op.create_index("ix_audit_logs_entity_created", "audit_logs", ["entity_type", "entity_id", "created_at"])
+    op.create_index(
+        "ix_audit_logs_details", "audit_logs", ["details_json"],
+        postgresql_using="gin", postgresql_ops={"details_json": "jsonb_path_ops"},
+    )
+
+
+def _email_indexes():
+    op.create_index("ix_email_logs_to_email", "email_logs", ["to_email"])
+    # process_pending_emails: queued/failed rows of the recent partitions, oldest first
+    op.create_index(
+        "ix_email_logs_pending", "email_logs", ["created_at"],
+        postgresql_where=sa.text("status IN ('queued', 'failed')"),
+    )
+
+
+def _partition(table: str, columns, create_indexes):
+    bind = op.get_bind()
+    legacy = f"{table}_legacy"
+    op.rename_table(table, legacy)
+    op.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey")
+    for (name,) in bind.execute(sa.text("SELECT indexname FROM pg_indexes WHERE tablename = :t AND indexname LIKE 'ix_%'"), {"t": legacy}):
+        op.drop_index(name, table_name=legacy)
+
+    op.create_table(
+        table,
+        *columns(),
+        sa.PrimaryKeyConstraint("id", "created_at", name=f"{table}_pkey"),
+        postgresql_partition_by="RANGE (created_at)",
+    )
+    today = datetime.now(timezone.utc).date()
+    oldest = bind.execute(sa.text(f"SELECT min(created_at) FROM {legacy}")).scalar()
+    month = date(oldest.year, oldest.month, 1) if oldest else date(today.year, today.month, 1)
+    last = _add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE {table}_p{month.year:04d}{month.month:02d} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{_utc(month)}') TO ('{_utc(_add_months(month, 1))}')"
+        )
+        month = _add_months(month, 1)
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+    cols = ", ".join(c.name for c in columns())
+    op.execute(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {legacy}")
+    op.drop_table(legacy)
+    create_indexes()
+
+
+def _unpartition(table: str, columns, create_indexes):
+    partitioned = f"{table}_partitioned"
+    op.rename_table(table, partitioned)
+    op.execute(f"ALTER TABLE {partitioned} RENAME CONSTRAINT {table}_pkey TO {partitioned}_pkey")
+    bind = op.get_bind()
+    for (name,) in bind.execute(sa.text("SELECT indexname FROM pg_indexes WHERE tablename = :t AND indexname LIKE 'ix_%'"), {"t": partitioned}):
+        op.drop_index(name, table_name=partitioned)
+    op.create_table(table, *columns(), sa.PrimaryKeyConstraint("id", name=f"{table}_pkey"))
+    cols = ", ".join(c.name for c in columns())
+    op.execute(f"INSERT INTO {table} ({cols}) SELECT {cols} FROM {partitioned}")
+    op.drop_table(partitioned)  # drops the partitions too
+    create_indexes()
+
+
+def upgrade():
+    op.execute("LOCK TABLE audit_logs, email_logs IN ACCESS EXCLUSIVE MODE")
+    _partition("audit_logs", _audit_columns, _audit_indexes)
+    _partition("email_logs", _email_columns, _email_indexes)
+
+
+def downgrade():
+    op.execute("LOCK TABLE audit_logs, email_logs IN ACCESS EXCLUSIVE MODE")
+    _unpartition("audit_logs", _audit_columns, _audit_indexes)
+    _unpartition("email_logs", _email_columns, lambda: op.create_index("ix_email_logs_to_email", "email_logs", ["to_email"]))
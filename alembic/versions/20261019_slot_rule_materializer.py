@@ -0,0 +1,26 @@
+"""slot rule high-water mark and time_entry.slot_rule_id for incremental generation
+
+Revision ID: 20261019_slot_materializer
+Revises: 20260209_aircraft
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261019_slot_materializer"
+down_revision = "20260209_aircraft"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("slot_rules", sa.Column("generated_through", sa.Date(), nullable=True))
+    op.add_column("time_entries", sa.Column("slot_rule_id", sa.String(length=36), nullable=True))
+    op.create_index(op.f("ix_time_entries_slot_rule_id"), "time_entries", ["slot_rule_id"], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f("ix_time_entries_slot_rule_id"), table_name="time_entries")
+    op.drop_column("time_entries", "slot_rule_id")
+    op.drop_column("slot_rules", "generated_through")
@@ -0,0 +1,29 @@
+"""startup_steps: fingerprints of the migrations, seed and cleanup that container startup has applied
+
+Revision ID: 20261019_startup_steps
+Revises: 20261019_partition_logs
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261019_startup_steps"
+down_revision = "20261019_partition_logs"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "startup_steps",
+        sa.Column("step", sa.String(length=40), nullable=False),
+        sa.Column("fingerprint", sa.String(length=64), nullable=False),
+        sa.Column("duration_ms", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("step"),
+    )
+
+
+def downgrade():
+    op.drop_table("startup_steps")
@@ -0,0 +1,78 @@
+"""native DATE/TIME columns on time_entries and composite availability indexes
+
+flight_date / departure_time mirror date_str / start (kept in sync by a trigger, so every
+existing writer keeps working) and back the composite indexes used by the public queries.
+
+Revision ID: 20261019_native_dates
+Revises: 20261019_slot_materializer
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "20261019_native_dates"
+down_revision = "20261019_slot_materializer"
+branch_labels = None
+depends_on = None
+
+# text -> date/time casts depend on DateStyle and are not immutable, so a generated column is not
+# possible. The trigger and the backfill parse with fixed formats behind the same regex guards
+# (NULL on malformed legacy values); no EXCEPTION block, which would open a subtransaction per row.
+DATE_STR_OK = "'^\\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\\d|3[01])$'"
+START_OK = "'^([01]\\d|2[0-3]):[0-5]\\d$'"
+
+SYNC_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION time_entries_sync_native_dates() RETURNS trigger AS $$
+BEGIN
+    NEW.flight_date := CASE WHEN NEW.date_str ~ {DATE_STR_OK} THEN to_date(NEW.date_str, 'YYYY-MM-DD') END;
+    NEW.departure_time := CASE WHEN NEW.start ~ {START_OK} THEN NEW.start::time END;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+SYNC_TRIGGER = """
+CREATE TRIGGER trg_time_entries_sync_native_dates
+BEFORE INSERT OR UPDATE OF date_str, start ON time_entries
+FOR EACH ROW EXECUTE FUNCTION time_entries_sync_native_dates();
+"""
+
+BACKFILL = f"""
+UPDATE time_entries SET
+    flight_date = CASE WHEN date_str ~ {DATE_STR_OK} THEN to_date(date_str, 'YYYY-MM-DD') END,
+    departure_time = CASE WHEN start ~ {START_OK} THEN start::time END
+"""
+
+def upgrade():
+    op.add_column("time_entries", sa.Column("flight_date", sa.Date(), nullable=True))
+    op.add_column("time_entries", sa.Column("departure_time", sa.Time(), nullable=True))
+    op.execute(SYNC_FUNCTION)
+    op.execute(SYNC_TRIGGER)
+    op.execute(BACKFILL)
+
+    # Public availability: equality on route/visibility/status, range on flight_date; the INCLUDE
+    # columns let calendar and slot-date lookups run as index-only scans.
+    op.create_index(
+        "ix_time_entries_route_date_public",
+        "time_entries",
+        ["route_id", "flight_date", "visibility", "status"],
+        postgresql_include=["seats_available", "departure_time", "price_usd", "base_price_usd", "override_price_usd"],
+    )
+    # route_id is the leading column of the composite index, so the single-column index is redundant
+    op.drop_index("ix_time_entries_route_id", table_name="time_entries")
+    # Ops listings and day boards (all routes for a date, ordered by departure)
+    op.create_index("ix_time_entries_date_departure", "time_entries", ["flight_date", "departure_time"])
+    op.create_index("ix_bookings_created_at", "bookings", ["created_at"])
+    op.execute("ANALYZE time_entries")
+
+
+def downgrade():
+    op.drop_index("ix_bookings_created_at", table_name="bookings")
+    op.drop_index("ix_time_entries_date_departure", table_name="time_entries")
+    op.create_index("ix_time_entries_route_id", "time_entries", ["route_id"])
+    op.drop_index("ix_time_entries_route_date_public", table_name="time_entries")
+    op.execute("DROP TRIGGER IF EXISTS trg_time_entries_sync_native_dates ON time_entries")
+    op.execute("DROP FUNCTION IF EXISTS time_entries_sync_native_dates()")
+    op.drop_column("time_entries", "departure_time")
+    op.drop_column("time_entries", "flight_date")
@@ -1,5 +1,5 @@
 import uuid
-from datetime import datetime, timezone, date
+from datetime import datetime, timezone, date, timedelta
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
@@ -15,6 +15,7 @@ from app.models.time_entry import TimeEntry
 from app.models.slot_rule import SlotRule
 from app.models.setting import Setting
 from app.core.security import hash_password
+from app.core import response_cache
 from app.services.audit_service import log_audit
 from app.services.email_service import queue_email
 
@@ -108,12 +109,18 @@ def reset_password(user_id: str, tempPassword: str | None = None,
 def metrics_overview(fromDate: str | None = None, toDate: str | None = None,
                      db: Session = Depends(get_db),
                      me: User = Depends(require_roles("admin","finance","superadmin"))):
-    # dateStr is stored on time_entries; for quick metrics we use booking.created_at day boundaries
+    # dateStr is stored on time_entries; for quick metrics we use booking.created_at UTC day boundaries
+    # (half-open timestamptz range, so the created_at index applies and the whole last day is counted)
     q = db.query(Booking)
-    if fromDate:
-        q = q.filter(Booking.created_at >= fromDate + "T00:00:00")
-    if toDate:
-        q = q.filter(Booking.created_at <= toDate + "T23:59:59")
+    try:
+        if fromDate:
+            start = datetime.strptime(fromDate, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+            q = q.filter(Booking.created_at >= start)
+        if toDate:
+            end = datetime.strptime(toDate, "%Y-%m-%d").replace(tzinfo=timezone.utc) + timedelta(days=1)
+            q = q.filter(Booking.created_at < end)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="fromDate and toDate must be YYYY-MM-DD")
     total_bookings = q.count()
     paid_bookings = q.filter(Booking.payment_status == "paid").count()
     canceled = q.filter(Booking.status.in_(["CANCELED","REFUNDED"])).count()
@@ -164,6 +171,7 @@ def admin_create_route(fromLabel: str, toLabel: str, region: str = "Tanzania", a
     db.add(r)
     log_audit(db, me.id, "route.create", "route", r.id, {"from":fromLabel,"to":toLabel,"region":region,"active":active})
     db.commit()
+    response_cache.invalidate(response_cache.ROUTES)
     return {"id": r.id}
 
 @router.delete("/admin/reset/all")
@@ -183,4 +191,19 @@ def admin_reset_all(seed: bool = True, db: Session = Depends(get_db), me: User =
     if seed:
         from app.seed import run as seed_run
         seed_run()
+    response_cache.invalidate(response_cache.ORIGINS, response_cache.ROUTES, response_cache.FX)
     return {"ok": True, "seeded": seed}
+
+@router.get("/admin/debug/sql-profiles")
+def list_sql_profiles(me: User = Depends(require_roles("admin","superadmin"))):
+    """Recent SQL profiler reports of this worker (see app/core/sql_profiler.py)."""
+    from app.core import sql_profiler
+    return {"items": sql_profiler.list_reports()}
+
+@router.get("/admin/debug/sql-profiles/{profile_id}")
+def get_sql_profile(profile_id: str, me: User = Depends(require_roles("admin","superadmin"))):
+    from app.core import sql_profiler
+    report = sql_profiler.get_report(profile_id)
+    if not report:
+        raise HTTPException(status_code=404, detail="Profile not found (expired, or served by another worker)")
+    return report
@@ -1,21 +1,40 @@
 import uuid
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.schemas.auth import LoginRequest, TokenPair, RefreshRequest, ChangePasswordRequest
 from app.models.user import User
-from app.core.security import verify_password, create_access_token, create_refresh_token
+from app.core.security import (
+    verify_and_update_password_async, hash_password_async, create_access_token, create_refresh_token,
+)
 from app.api.deps import get_current_user
 
 router = APIRouter(tags=["auth"])
 
+def _get_user_by_email(db: Session, email: str) -> User | None:
+    return db.query(User).filter(User.email == email.lower()).first()
+
+
+def _save_password_hash(db: Session, user: User, password_hash: str, must_change_password: bool | None = None) -> None:
+    user.password_hash = password_hash
+    if must_change_password is not None:
+        user.must_change_password = must_change_password
+    db.commit()
+
+
+# Async so PBKDF2 runs on the dedicated password executor; DB work goes through the regular threadpool.
 @router.post("/auth/login", response_model=TokenPair)
-def login(body: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == body.email.lower()).first()
+async def login(body: LoginRequest, db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_get_user_by_email, db, body.email)
     if not user or not user.is_active:
         raise HTTPException(status_code=401, detail="Invalid email or password.")
-    if not verify_password(body.password, user.password_hash):
+    ok, new_hash = await verify_and_update_password_async(body.password, user.password_hash)
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid email or password.")
+    if new_hash:
+        # Stored hash used old parameters (e.g. PASSWORD_HASH_ROUNDS changed): upgrade transparently
+        await run_in_threadpool(_save_password_hash, db, user, new_hash)
     must_change = getattr(user, "must_change_password", False)
     return TokenPair(
         access_token=create_access_token(user.id),
@@ -56,15 +75,14 @@ def me(me: User = Depends(get_current_user)):
 
 
 @router.post("/auth/change-password")
-def change_password(body: ChangePasswordRequest,
-                    db: Session = Depends(get_db),
-                    me: User = Depends(get_current_user)):
-    from app.core.security import hash_password
-    if not verify_password(body.oldPassword, me.password_hash):
+async def change_password(body: ChangePasswordRequest,
+                          db: Session = Depends(get_db),
+                          me: User = Depends(get_current_user)):
+    ok, _ = await verify_and_update_password_async(body.oldPassword, me.password_hash)
+    if not ok:
         raise HTTPException(status_code=400, detail="Old password incorrect")
     if len(body.newPassword) < 8:
         raise HTTPException(status_code=400, detail="Password too short")
-    me.password_hash = hash_password(body.newPassword)
-    me.must_change_password = False
-    db.commit()
+    new_hash = await hash_password_async(body.newPassword)
+    await run_in_threadpool(_save_password_hash, db, me, new_hash, False)
     return {"ok": True}
@@ -1,6 +1,7 @@
+import os
 import uuid
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import FileResponse, Response
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response
 from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.models.user import User
@@ -10,9 +11,11 @@ from app.models.route import Route
 from app.models.passenger import Passenger
 from app.schemas.booking import BookingCreate, BookingOut
 from app.core.config import settings
-from app.core.security import hash_password
+from app.core.security import UNUSABLE_PASSWORD
 from app.services.booking_service import create_booking
+from app.core.file_responses import conditional_file_response
 from app.services.ticket_service import build_ticket_context, render_ticket_pdf_bytes
+from app.services.ticket_storage import LocalTicketStorage, TicketStorageUnavailable, get_ticket_storage
 
 router = APIRouter(tags=["bookings"])
 
@@ -25,7 +28,7 @@ def get_or_create_booker(db: Session, email: str, name: str) -> User:
         email=email.lower(),
         full_name=name or "",
         role="customer",
-        password_hash=hash_password(str(uuid.uuid4())),  # random; can reset later
+        password_hash=UNUSABLE_PASSWORD,  # no login until a password is set; avoids hashing at checkout
         is_active=True,
     )
     db.add(u)
@@ -99,7 +102,7 @@ def get_booking(booking_ref: str, db: Session = Depends(get_db)):
 
 
 @router.get("/public/bookings/{booking_ref}/ticket")
-def download_ticket(booking_ref: str, db: Session = Depends(get_db)):
+def download_ticket(booking_ref: str, request: Request, db: Session = Depends(get_db)):
     b = db.query(Booking).filter(Booking.booking_ref == booking_ref).first()
     if not b:
         raise HTTPException(status_code=404, detail="Not found")
@@ -114,30 +117,45 @@ def download_ticket(booking_ref: str, db: Session = Depends(get_db)):
         return Response(
             content=pdf_bytes,
             media_type="application/pdf",
-            headers={"Content-Disposition": f'inline; filename="{booking_ref}.pdf"'},
+            headers={"Content-Disposition": f'inline; filename="{booking_ref}.pdf"', "Cache-Control": "no-store"},
         )
 
     # Paid: ensure ticket is generated and stored, then return it
+    from app.api.v1.routes.payments import _generate_ticket_for_booking
+
     if not b.ticket_object_key:
-        from app.api.v1.routes.payments import _generate_ticket_for_booking
         _generate_ticket_for_booking(db, b)
         db.refresh(b)
 
-    if b.ticket_storage == "local":
-        return FileResponse(path=b.ticket_object_key, media_type="application/pdf", filename=f"{booking_ref}.pdf")
-
-    # GCS: optionally return a signed URL if google-cloud-storage is available
     try:
-        from google.cloud import storage  # type: ignore
-        from datetime import timedelta
-    except Exception:
-        return {"storage": "gcs", "objectKey": b.ticket_object_key, "note": "Install google-cloud-storage to generate signed URLs."}
+        backend = get_ticket_storage(b.ticket_storage or "local")
+    except TicketStorageUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
-    if not settings.GCS_BUCKET_NAME:
-        return {"storage": "gcs", "objectKey": b.ticket_object_key}
+    if isinstance(backend, LocalTicketStorage):
+        path = backend.path_for(b.ticket_object_key or "")
+        if not os.path.isfile(path):
+            # Stored file lost (e.g. volume not persisted): render and store it again
+            b.ticket_object_key = None
+            b.ticket_status = "none"
+            _generate_ticket_for_booking(db, b)
+            db.refresh(b)
+            path = backend.path_for(b.ticket_object_key or "")
+            if not os.path.isfile(path):
+                raise HTTPException(status_code=404, detail="Ticket not available")
+        return conditional_file_response(
+            request,
+            path,
+            media_type="application/pdf",
+            filename=f"{booking_ref}.pdf",
+        )
 
-    client = storage.Client()
-    bucket = client.bucket(settings.GCS_BUCKET_NAME)
-    blob = bucket.blob(b.ticket_object_key)
-    url = blob.generate_signed_url(expiration=timedelta(minutes=20), method="GET")
-    return {"storage": "gcs", "url": url}
+    # Bucket backends: signed URL (cached per object while most of its lifetime remains)
+    try:
+        signed = backend.signed_url(b.ticket_object_key)
+    except TicketStorageUnavailable as e:
+        return {"storage": backend.name, "objectKey": b.ticket_object_key, "note": str(e)}
+    if not signed:
+        raise HTTPException(status_code=404, detail="Ticket not available")
+    url, expires_in = signed
+    return {"storage": backend.name, "url": url, "expiresIn": expires_in}
@@ -1,15 +1,15 @@
+import json
 import uuid
 from urllib.parse import quote
 from datetime import datetime, timezone, timedelta, date
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, text
+from sqlalchemy import func, and_, text, select
 from app.db.session import get_db
 from app.api.deps import require_roles
 from app.models.booking import Booking
 from app.models.payment import Payment
-from app.models.audit_log import AuditLog
 from app.models.pilot import PilotAssignment
 from app.models.user import User
 from app.models.time_entry import TimeEntry
@@ -17,10 +17,9 @@ from app.models.route import Route
 from app.models.location import Location
 from app.schemas.location import LocationIn, LocationPatch
 from app.models.slot_rule import SlotRule
-from app.models.passenger import Passenger
 from app.models.cancellation import Cancellation
 from app.services.email_service import queue_email, send_booking_confirmation_and_ticket
-from app.services.audit_service import log_audit
+from app.services.audit_service import log_audit, search_audit
 from app.api.v1.routes.payments import _generate_ticket_for_booking
 from app.schemas.ops import (
     TimeEntryIn, TimeEntryOut, SlotRuleIn, SlotRuleOut, SlotsFillRequest, SlotsFillResponse,
@@ -28,11 +27,21 @@ from app.schemas.ops import (
     DashboardOverviewResponse, DashboardOverviewToday, DashboardOverviewSummary, DashboardOverviewTrends,
     DashboardOverviewByStatus, DashboardOverviewRouteCount, DashboardOverviewAttention,
     WeeklyPlanImportRequest, WeeklyPlanImportResponse,
+    FlightMoveIn, FlightCancelIn, FlightRetimeIn, FlightBulkResult,
 )
 from app.services.weekly_plan_service import import_weekly_plan, get_preset_legs, PRESETS
+from app.services.inventory_service import NotEnoughSeats, insert_time_entries, delete_unused_slots, release_seats, transfer_seats
+from app.services.slot_materializer import apply_rule_edit, schedule_snapshot
 from app.services.settings_service import get_usd_to_tzs_rate
+from app.services.availability_service import parse_date
 from app.services.partner_service import get_partner_by_code
+from app.services.booking_detail_service import AUDIT_PAGE_DEFAULT, AUDIT_PAGE_MAX, audit_page, load_booking_detail
+from app.services.flight_ops_service import (
+    INACTIVE_BOOKING_STATUSES, FlightOpResult,
+    cancel_flight_bookings, dispatch_flight_updates, move_flight_bookings, retime_flight,
+)
 from app.core.config import settings
+from app.core import response_cache
 
 router = APIRouter(tags=["ops"])
 class MoveBookingIn(BaseModel):
@@ -67,13 +76,13 @@ def ops_create_draft_booking(body: OpsDraftBookingIn, db: Session = Depends(get_
     # create or get booker user
     booker = db.query(User).filter(User.email == body.bookerEmail.lower()).first()
     if not booker:
-        from app.core.security import hash_password
+        from app.core.security import UNUSABLE_PASSWORD
         booker = User(
             id=str(uuid.uuid4()),
             email=body.bookerEmail.lower(),
             full_name=body.bookerName or "",
             role="customer",
-            password_hash=hash_password(str(uuid.uuid4())),
+            password_hash=UNUSABLE_PASSWORD,
             is_active=True,
         )
         db.add(booker)
@@ -89,7 +98,7 @@ def ops_create_draft_booking(body: OpsDraftBookingIn, db: Session = Depends(get_
     booking.created_by_role = "OPS"
     booking.currency = body.currency
     booking.exchange_rate_used = body.exchangeRate
-    log_audit(db, user.id, "booking.create_draft", "booking", booking.id, {"booking_ref": booking.booking_ref, "currency": body.currency, "exchangeRate": body.exchangeRate})
+    log_audit(db, user.id, "booking.create_draft", "booking", booking.id, {"booking_ref": booking.booking_ref, "currency": body.currency, "exchangeRate": body.exchangeRate}, sync=False)
     db.commit()
     return {"bookingRef": booking.booking_ref, "status": booking.status, "paymentStatus": booking.payment_status}
 
@@ -142,67 +151,67 @@ def list_bookings(
 @router.get("/ops/bookings/{booking_ref}")
 def booking_detail(
     booking_ref: str,
+    audit_limit: int = AUDIT_PAGE_DEFAULT,
     db: Session = Depends(get_db),
     user: User = Depends(require_roles("ops","admin","superadmin","finance")),
 ):
-    b = db.query(Booking).filter(Booking.booking_ref == booking_ref).first()
-    if not b:
+    """Booking with flight, booker, passengers, payments and the latest `audit_limit` audit entries (see auditTotal)."""
+    detail = load_booking_detail(db, booking_ref, audit_limit)
+    if detail is None:
         raise HTTPException(status_code=404, detail="Not found")
-    te = db.get(TimeEntry, b.time_entry_id)
-    booker = db.get(User, b.user_id) if b.user_id else None
-    route = db.get(Route, te.route_id) if te else None
-    pax = db.query(Passenger).filter(Passenger.booking_id == b.id).all()
-    pays = db.query(Payment).filter(Payment.booking_id == b.id).order_by(Payment.created_at.desc()).all()
 
-    referral_code = getattr(b, "referral_code", None)
+    referral_code = detail["referralCode"]
     referral_from = None
     if referral_code and (getattr(settings, "PARTNERS_APP_URL", None) or "").strip():
         partner = get_partner_by_code(settings.PARTNERS_APP_URL.strip(), referral_code)
         if partner:
             referral_from = partner
+    detail["referralFrom"] = referral_from
+    return detail
 
-    return {
-        "bookingRef": b.booking_ref,
-        "status": b.status,
-        "paymentStatus": b.payment_status,
-        "pax": b.pax,
-        "holdExpiresAt": b.hold_expires_at.isoformat() if b.hold_expires_at else None,
-        "createdAt": b.created_at.isoformat(),
-        "from": route.from_label if route else None,
-        "to": route.to_label if route else None,
-        "dateStr": te.date_str if te else None,
-        "contactEmail": booker.email if booker else None,
-        "contactName": booker.full_name if booker else None,
-        "referralCode": referral_code,
-        "referralFrom": referral_from,
-        "timeEntry": {
-            "id": te.id if te else b.time_entry_id,
-            "routeId": te.route_id if te else None,
-            "dateStr": te.date_str if te else None,
-            "start": te.start if te else None,
-            "end": te.end if te else None,
-            "priceUSD": te.price_usd if te else None,
-            "seatsAvailable": te.seats_available if te else None,
-            "flightNo": te.flight_no if te else None,
-            "cabin": te.cabin if te else None,
-        },
-        "passengers": [{
-            "first": p.first, "last": p.last, "phone": p.phone, "gender": p.gender,
-            "dob": p.dob, "nationality": p.nationality, "idType": p.id_type, "idNumber": p.id_number
-        } for p in pax],
-        "payments": [{
-            "provider": p.provider, "status": p.status, "amountUSD": p.amount_usd, "currency": p.currency,
-            "providerRef": p.provider_ref, "createdAt": p.created_at.isoformat()
-        } for p in pays],
-
-        "audit": [{
-            "at": a.created_at.isoformat(),
-            "action": a.action,
-            "actor": a.actor_user_id,
-            "details": a.details_json,
-        } for a in db.query(AuditLog).filter(AuditLog.entity_type == "booking", AuditLog.entity_id == b.booking_ref).order_by(AuditLog.created_at.asc()).all()],
-
-    }
+@router.get("/ops/bookings/{booking_ref}/audit")
+def booking_audit(
+    booking_ref: str,
+    limit: int = AUDIT_PAGE_DEFAULT,
+    offset: int = 0,
+    db: Session = Depends(get_db),
+    user: User = Depends(require_roles("ops","admin","superadmin","finance")),
+):
+    """Older pages of a booking's audit timeline: offset counts back from the newest entry; items are oldest first."""
+    items = audit_page(db, booking_ref, limit, offset)
+    return {"items": items, "limit": min(max(limit, 1), AUDIT_PAGE_MAX), "offset": max(offset, 0)}
+
+@router.get("/ops/audit")
+def list_audit(
+    entity_type: str | None = None,
+    entity_id: str | None = None,
+    action: str | None = None,
+    actor: str | None = None,
+    details: str | None = None,
+    limit: int = 100,
+    offset: int = 0,
+    db: Session = Depends(get_db),
+    user: User = Depends(require_roles("ops","admin","superadmin","finance")),
+):
+    """Audit log search, newest first. details = JSON object the entry's details must contain, e.g. {"reason": "weather"}."""
+    match = None
+    if details:
+        try:
+            match = json.loads(details)
+        except ValueError:
+            match = None
+        if not isinstance(match, dict):
+            raise HTTPException(status_code=400, detail="details must be a JSON object")
+    rows = search_audit(db, entity_type=entity_type, entity_id=entity_id, action=action, actor=actor,
+                        details=match, limit=limit, offset=offset)
+    return {"items": [{
+        "at": a.created_at.isoformat(),
+        "action": a.action,
+        "actor": a.actor_user_id,
+        "entityType": a.entity_type,
+        "entityId": a.entity_id,
+        "details": a.details_json,
+    } for a in rows]}
 
 @router.post("/ops/bookings/{booking_ref}/mark-paid")
 def mark_paid(
@@ -228,7 +237,7 @@ def mark_paid(
         status="paid",
         provider_ref=f"manual:{user.email}:{datetime.now(timezone.utc).isoformat()}",
     ))
-    log_audit(db, user.id, "booking.mark_paid", "booking", b.id, {"bookingRef": b.booking_ref})
+    log_audit(db, user.id, "booking.mark_paid", "booking", b.id, {"bookingRef": b.booking_ref}, sync=True)
 
     # Generate ticket PDF with QR code (scan → open PDF) so user can view ticket after mark paid
     try:
@@ -316,14 +325,13 @@ def ops_cancel_booking(
     db: Session = Depends(get_db),
     user: User = Depends(require_roles("ops","admin","superadmin","finance")),
 ):
-    b = db.query(Booking).filter(Booking.booking_ref == booking_ref).first()
+    b = db.query(Booking).filter(Booking.booking_ref == booking_ref).with_for_update().first()
     if not b:
         raise HTTPException(status_code=404, detail="Not found")
 
-    # Release seats if not already completed/expired
-    te = db.get(TimeEntry, b.time_entry_id)
-    if te and b.status not in ["EXPIRED","CANCELLED"]:
-        te.seats_available += b.pax
+    # Release seats if the booking still holds them (row locked above, so only once)
+    if b.status not in INACTIVE_BOOKING_STATUSES:
+        release_seats(db, {b.time_entry_id: int(b.pax or 1)})
 
     b.status = "CANCELLED"
     if b.payment_status == "paid":
@@ -341,7 +349,7 @@ def ops_cancel_booking(
         decided_at=datetime.now(timezone.utc),
     )
     db.add(c)
-    log_audit(db, user.id, "booking.cancel", "booking", b.id, {"refund": c.refund_amount_usd})
+    log_audit(db, user.id, "booking.cancel", "booking", b.id, {"refund": c.refund_amount_usd}, sync=True)
     db.commit()
     return {"ok": True, "bookingRef": b.booking_ref, "status": b.status}
 
@@ -376,9 +384,11 @@ def move_booking(
     db: Session = Depends(get_db),
     user: User = Depends(require_roles("ops","admin","superadmin")),
 ):
-    b = db.query(Booking).filter(Booking.booking_ref == booking_ref).first()
+    b = db.query(Booking).filter(Booking.booking_ref == booking_ref).with_for_update().first()
     if not b:
         raise HTTPException(status_code=404, detail="Not found")
+    if b.status in INACTIVE_BOOKING_STATUSES:
+        raise HTTPException(status_code=409, detail=f"Booking is {b.status}")
 
     target = (body.target or "").strip()
     if not target:
@@ -407,20 +417,18 @@ def move_booking(
     new_te = db.get(TimeEntry, te_id)
     if not new_te:
         raise HTTPException(status_code=404, detail="Target time entry not found")
+    if new_te.id == b.time_entry_id:
+        return {"ok": True, "bookingRef": booking_ref, "movedTo": new_te.id}
 
-    old_te = db.get(TimeEntry, b.time_entry_id) if b.time_entry_id else None
-
-    pax = int(b.pax or 1)
-    if new_te.seats_available < pax:
+    # Conditional seat updates in id order: no oversell, no deadlock with an opposite move
+    try:
+        transfer_seats(db, b.time_entry_id, new_te.id, int(b.pax or 1))
+    except NotEnoughSeats:
+        db.rollback()
         raise HTTPException(status_code=409, detail="Not enough seats in target time entry")
-
-    # Adjust inventory atomically
     try:
-        if old_te:
-            old_te.seats_available = int(old_te.seats_available or 0) + pax
-        new_te.seats_available = int(new_te.seats_available or 0) - pax
         b.time_entry_id = new_te.id
-        log_audit(db, user.id, "booking.move", "booking", b.id, {"booking_ref": booking_ref, "target": te_id, "reason": body.reason})
+        log_audit(db, user.id, "booking.move", "booking", b.id, {"booking_ref": booking_ref, "target": te_id, "reason": body.reason}, sync=True)
         db.commit()
     except Exception as e:
         db.rollback()
@@ -446,7 +454,7 @@ def refund_booking(
     p = Payment(id=str(uuid.uuid4()), booking_id=b.id, provider="manual", amount_usd=amt, currency="USD", status="refunded", provider_ref="ops_refund")
     db.add(p)
     b.payment_status = "refunded"
-    log_audit(db, user.id, "booking.refund", "booking", b.id, {"booking_ref": booking_ref, "amount_usd": amt, "reason": body.reason})
+    log_audit(db, user.id, "booking.refund", "booking", b.id, {"booking_ref": booking_ref, "amount_usd": amt, "reason": body.reason}, sync=True)
     db.commit()
     return {"ok": True, "bookingRef": booking_ref, "refunded": amt}
 
@@ -507,6 +515,16 @@ class OverviewTodayStats(BaseModel):
     seatsAvailable: int
 
 
+def _slot_totals_for_day(db: Session, day) -> tuple[int, int]:
+    """(slot count, seats available) over all time entries on one day."""
+    slots, seats = (
+        db.query(func.count(TimeEntry.id), func.coalesce(func.sum(TimeEntry.seats_available), 0))
+        .filter(TimeEntry.flight_date == day)
+        .one()
+    )
+    return int(slots or 0), int(seats or 0)
+
+
 @router.get("/ops/dashboard/today-stats", response_model=OverviewTodayStats)
 def dashboard_today_stats(
     db: Session = Depends(get_db),
@@ -517,9 +535,7 @@ def dashboard_today_stats(
     today_str = today.isoformat()
     weekday = today.weekday()  # 0=Mon .. 6=Sun
     # Use filled time entries for today so Overview matches Inventory (Ops)
-    entries = db.query(TimeEntry).filter(TimeEntry.date_str == today_str).all()
-    inventory_slots = len(entries)
-    seats_available = sum(int(getattr(e, "seats_available", 0) or 0) for e in entries)
+    inventory_slots, seats_available = _slot_totals_for_day(db, today)
     return OverviewTodayStats(
         dateStr=today_str,
         weekday=weekday,
@@ -543,9 +559,13 @@ def list_time_entries(
         q = q.filter(TimeEntry.route_id == route_id)
     if dateStr:
         if dateStr.strip().lower() == "today":
-            dateStr = datetime.now(timezone.utc).date().isoformat()
-        q = q.filter(TimeEntry.date_str == dateStr)
-    items = q.order_by(TimeEntry.date_str.asc(), TimeEntry.start.asc()).limit(2000).all()
+            day = datetime.now(timezone.utc).date()
+        else:
+            day = parse_date(dateStr)
+            if day is None:
+                return []
+        q = q.filter(TimeEntry.flight_date == day)
+    items = q.order_by(TimeEntry.flight_date.asc(), TimeEntry.departure_time.asc(), TimeEntry.start.asc()).limit(2000).all()
     out = []
     for t in items:
         route = db.get(Route, t.route_id) if t.route_id else None
@@ -634,6 +654,73 @@ def delete_time_entry(
     return {"ok": True}
 
 
+
+# -------------------------
+# FLIGHT-LEVEL BULK OPERATIONS (disruptions: one request for every booking on a slot)
+# -------------------------
+def _flight_bulk_response(db: Session, background: BackgroundTasks, run) -> FlightBulkResult:
+    try:
+        r: FlightOpResult = run()
+        db.commit()
+    except LookupError as e:
+        db.rollback()
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    if r.reticket_booking_ids or r.email_ids:
+        dispatch_flight_updates(r.reticket_booking_ids, r.email_ids, background.add_task)
+    return FlightBulkResult(
+        timeEntryId=r.time_entry_id,
+        bookingRefs=r.booking_refs,
+        pax=r.pax,
+        targetTimeEntryId=r.target_time_entry_id,
+        emailsQueued=len(r.email_ids),
+        ticketsQueued=len(r.reticket_booking_ids),
+    )
+
+@router.post("/ops/time-entries/{time_entry_id}/move-bookings", response_model=FlightBulkResult)
+def move_flight(
+    time_entry_id: str,
+    body: FlightMoveIn,
+    background: BackgroundTasks,
+    db: Session = Depends(get_db),
+    user: User = Depends(require_roles("ops","admin","superadmin")),
+):
+    """Move every active booking on the slot (or only body.booking_refs) to another slot, all or nothing."""
+    return _flight_bulk_response(db, background, lambda: move_flight_bookings(
+        db, user.id, time_entry_id, body.target_time_entry_id,
+        booking_refs=body.booking_refs, reason=body.reason, notify=body.notify,
+    ))
+
+@router.post("/ops/time-entries/{time_entry_id}/cancel-bookings", response_model=FlightBulkResult)
+def cancel_flight(
+    time_entry_id: str,
+    body: FlightCancelIn,
+    background: BackgroundTasks,
+    db: Session = Depends(get_db),
+    user: User = Depends(require_roles("ops","admin","superadmin")),
+):
+    """Cancel every active booking on the slot (or only body.booking_refs); closes the slot unless close_slot=false."""
+    return _flight_bulk_response(db, background, lambda: cancel_flight_bookings(
+        db, user.id, time_entry_id, booking_refs=body.booking_refs, reason=body.reason,
+        refund=body.refund, close_slot=body.close_slot, notify=body.notify,
+    ))
+
+@router.post("/ops/time-entries/{time_entry_id}/retime", response_model=FlightBulkResult)
+def retime_flight_slot(
+    time_entry_id: str,
+    body: FlightRetimeIn,
+    background: BackgroundTasks,
+    db: Session = Depends(get_db),
+    user: User = Depends(require_roles("ops","admin","superadmin")),
+):
+    """Change the departure time (and optionally date) of the slot; passengers are re-ticketed and notified."""
+    return _flight_bulk_response(db, background, lambda: retime_flight(
+        db, user.id, time_entry_id, body.start, body.end,
+        date_str=body.date_str, reason=body.reason, notify=body.notify,
+    ))
+
 def _time_to_minutes(t: str) -> int | None:
     """Parse HH:MM or H:MM to minutes since midnight. Returns None if invalid."""
     t = (t or "").strip()
@@ -685,35 +772,24 @@ def fill_slots_for_day(
     if not route:
         raise HTTPException(status_code=404, detail="Route not found")
     rate_tzs = get_usd_to_tzs_rate(db)
-    created_ids = []
-    skipped = 0
-    for s in body.slots:
-        exists = db.query(TimeEntry).filter_by(
-            route_id=body.route_id,
-            date_str=body.date_str,
-            start=s.start.strip(),
-        ).first()
-        if exists:
-            skipped += 1
-            continue
-        te = TimeEntry(
-            id=str(uuid.uuid4()),
-            route_id=body.route_id,
-            date_str=body.date_str,
-            start=s.start.strip(),
-            end=s.end.strip(),
-            price_usd=s.price_usd,
-            price_tzs=int(s.price_usd * rate_tzs) if rate_tzs else None,
-            seats_available=s.seats_available,
-            flight_no=(s.flight_no or "FSB").strip(),
-            cabin=(s.cabin or "Economy").strip(),
-            aircraft_type=(s.aircraft_type or "").strip() or None,
-            departure_location=(s.departure_location or "").strip() or None,
-            visibility="PUBLIC",
-            status="PUBLISHED",
-        )
-        db.add(te)
-        created_ids.append(te.id)
+    rows = [{
+        "route_id": body.route_id,
+        "date_str": body.date_str,
+        "start": s.start.strip(),
+        "end": s.end.strip(),
+        "price_usd": s.price_usd,
+        "price_tzs": int(s.price_usd * rate_tzs) if rate_tzs else None,
+        "seats_available": s.seats_available,
+        "flight_no": (s.flight_no or "FSB").strip(),
+        "cabin": (s.cabin or "Economy").strip(),
+        "aircraft_type": (s.aircraft_type or "").strip() or None,
+        "departure_location": (s.departure_location or "").strip() or None,
+        "visibility": "PUBLIC",
+        "status": "PUBLISHED",
+    } for s in body.slots]
+    # One existence query + one INSERT ... ON CONFLICT DO NOTHING for the whole day
+    created_ids = insert_time_entries(db, rows)
+    skipped = len(rows) - len(created_ids)
     log_audit(db, user.id, "slots.fill", "time_entry", body.date_str, {"route_id": body.route_id, "created": len(created_ids), "skipped": skipped})
     db.commit()
     return SlotsFillResponse(created=len(created_ids), ids=created_ids, skipped=skipped)
@@ -722,24 +798,26 @@ def fill_slots_for_day(
 @router.delete("/ops/slots/cleanup-unused")
 def cleanup_unused_slots(
     origin: str = "",
+    dry_run: bool = False,
+    batch_size: int = 5000,
     db: Session = Depends(get_db),
     user: User = Depends(require_roles("ops", "admin", "superadmin")),
 ):
-    """Delete time entries (slots) that have no bookings. Optional origin: only slots for routes with this from_label (e.g. 'Dar es Salaam Airport')."""
-    # Time entry ids that have at least one booking — we must not delete these
-    used_ids = {row[0] for row in db.query(Booking.time_entry_id).filter(Booking.time_entry_id.isnot(None)).distinct().all()}
-    q = db.query(TimeEntry).filter(~TimeEntry.id.in_(used_ids)) if used_ids else db.query(TimeEntry)
+    """Delete time entries (slots) that have no bookings. Optional origin: only slots for routes with this from_label (e.g. 'Dar es Salaam Airport').
+    dry_run=true only returns how many slots would be deleted. Deletes run in batches of batch_size, each committed."""
+    route_ids = None
     if origin and origin.strip():
-        route_ids = [row[0] for row in db.query(Route.id).filter(Route.from_label == origin.strip()).all()]
-        if not route_ids:
+        if not db.query(Route.id).filter(Route.from_label == origin.strip()).first():
             return {"deleted": 0, "message": f"No routes with origin '{origin}'"}
-        q = q.filter(TimeEntry.route_id.in_(route_ids))
-    to_delete = q.all()
-    for te in to_delete:
-        db.delete(te)
-    log_audit(db, user.id, "slots.cleanup_unused", "time_entry", origin or "all", {"deleted": len(to_delete)})
+        route_ids = select(Route.id).where(Route.from_label == origin.strip())
+    batch_size = min(max(batch_size, 100), 50000)
+    if dry_run:
+        count = delete_unused_slots(db, route_ids=route_ids, dry_run=True)
+        return {"deleted": 0, "wouldDelete": count, "dryRun": True}
+    deleted = delete_unused_slots(db, route_ids=route_ids, batch_size=batch_size)
+    log_audit(db, user.id, "slots.cleanup_unused", "time_entry", origin or "all", {"deleted": deleted})
     db.commit()
-    return {"deleted": len(to_delete)}
+    return {"deleted": deleted}
 
 
 # -------------------------
@@ -759,6 +837,8 @@ def weekly_plan_import(
     """Import a weekly operations plan (e.g. 5H-FSA helicopter). Creates routes if needed and time entries for the given week. Use plan_id='5H-FSA' to use the embedded plan."""
     result = import_weekly_plan(db, body)
     db.commit()
+    if result.routes_created:
+        response_cache.invalidate(response_cache.ROUTES)
     legs_used = len(body.legs) if body.legs else len(get_preset_legs(body.plan_id or ""))
     log_audit(db, user.id, "weekly_plan.import", "weekly_plan", body.week_start_date, {"legs": legs_used, "created": result.time_entries_created})
     return result
@@ -800,9 +880,13 @@ def update_slot_rule(
     r = db.get(SlotRule, rule_id)
     if not r:
         raise HTTPException(status_code=404, detail="Not found")
-    for k,v in body.model_dump().items():
+    changes = body.model_dump()
+    previous = schedule_snapshot(r)
+    for k,v in changes.items():
         setattr(r, k, v)
-    log_audit(db, user.id, "slot_rule.update", "slot_rule", r.id, body.model_dump())
+    # Only this rule's future unbooked slots change, in this transaction (updated or regenerated)
+    slots = apply_rule_edit(db, r, previous)
+    log_audit(db, user.id, "slot_rule.update", "slot_rule", r.id, {**changes, "slots": slots})
     db.commit()
     return SlotRuleOut(id=r.id, **body.model_dump())
 
@@ -964,10 +1048,7 @@ def dashboard_overview(
     range_30_start = today_start - timedelta(days=30)
     older_than_24h = now - timedelta(hours=24)
 
-    today_str = today.isoformat()
-    entries_today = db.query(TimeEntry).filter(TimeEntry.date_str == today_str).all()
-    filled_slots_today = len(entries_today)
-    seats_available_today = sum(int(getattr(e, "seats_available", 0) or 0) for e in entries_today)
+    filled_slots_today, seats_available_today = _slot_totals_for_day(db, today)
 
     bookings_today = db.query(func.count(Booking.id)).filter(
         Booking.created_at >= today_start, Booking.created_at < today_end
@@ -1243,6 +1324,7 @@ def ops_create_route(fromLabel: str, toLabel: str, region: str = "Tanzania", mai
     db.add(r)
     log_audit(db, user.id, "route.create", "route", r.id, {"from":fromLabel,"to":toLabel,"region":region,"mainRegion":mainRegion,"subRegion":subRegion,"active":active})
     db.commit()
+    response_cache.invalidate(response_cache.ROUTES)
     return {"id": r.id}
 
 @router.patch("/ops/routes/{route_id}")
@@ -1259,6 +1341,7 @@ def ops_update_route(route_id: str, fromLabel: str | None = None, toLabel: str |
     if active is not None: r.active = active
     log_audit(db, user.id, "route.update", "route", r.id, {"fromLabel":fromLabel,"toLabel":toLabel,"region":region,"mainRegion":mainRegion,"subRegion":subRegion,"active":active})
     db.commit()
+    response_cache.invalidate(response_cache.ROUTES)
     return {"ok": True}
 
 @router.delete("/ops/routes/{route_id}")
@@ -1270,6 +1353,7 @@ def ops_delete_route(route_id: str, db: Session = Depends(get_db), user: User =
     r.active = False
     log_audit(db, user.id, "route.deactivate", "route", r.id, {})
     db.commit()
+    response_cache.invalidate(response_cache.ROUTES)
     return {"ok": True}
 
 # -------------------------
@@ -1305,6 +1389,7 @@ def set_fx_rate(usdToTzs: int, db: Session = Depends(get_db), user: User = Depen
         rate = set_usd_to_tzs_rate(db, usdToTzs)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    response_cache.invalidate(response_cache.FX)
     log_audit(db, user.id, "settings.fx_rate", "setting", "USD_TO_TZS", {"usdToTzs": rate})
     return {"usdToTzs": rate}
 
@@ -1342,6 +1427,7 @@ def ops_reset_all(seed: bool = True,
     if seed:
         from app.seed import run as seed_run
         seed_run()
+    response_cache.invalidate(response_cache.ORIGINS, response_cache.ROUTES, response_cache.FX)
     return {"ok": True, "seeded": seed}
 
 
@@ -1388,6 +1474,7 @@ def ops_create_location(body: LocationIn, db: Session = Depends(get_db), user: U
     subs_csv = ",".join((body.subs or [])[:1])  # single sub: take first only
     l = Location(id=str(uuid.uuid4()), region=region, code=code, name=name, subs_csv=subs_csv, active=bool(body.active))
     db.add(l); db.commit()
+    response_cache.invalidate(response_cache.ORIGINS)
     return {"id": l.id}
 
 @router.patch("/ops/locations/{loc_id}")
@@ -1403,6 +1490,7 @@ def ops_patch_location(loc_id: str, body: LocationPatch, db: Session = Depends(g
     if body.subs is not None: l.subs_csv = ",".join((body.subs or [])[:1])
     if body.active is not None: l.active = bool(body.active)
     db.commit()
+    response_cache.invalidate(response_cache.ORIGINS)
     return {"ok": True}
 
 @router.delete("/ops/locations/{loc_id}")
@@ -1416,4 +1504,5 @@ def ops_delete_location(loc_id: str, db: Session = Depends(get_db), user: User =
         if in_use:
             raise HTTPException(status_code=400, detail="Cannot delete location: it is referenced by routes (from_label).")
     db.delete(l); db.commit()
+    response_cache.invalidate(response_cache.ORIGINS)
     return {"ok": True}
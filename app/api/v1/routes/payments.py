@@ -53,7 +53,7 @@ def _confirm_booking_paid_from_webhook(db: Session, booking_ref: str, provider_r
         p.status = "paid"
         p.provider_ref = provider_ref or p.provider_ref
 
-    log_audit(db, actor_user_id=provider, action="payment_paid_webhook", entity_type="booking", entity_id=b.booking_ref, details={"status": status, **details})
+    log_audit(db, actor_user_id=provider, action="payment_paid_webhook", entity_type="booking", entity_id=b.booking_ref, details={"status": status, **details}, sync=True)
     _notify_pilot_if_assigned(db, b)
     _generate_ticket_for_booking(db, b)
     send_booking_confirmation_and_ticket(db, b.booking_ref)
@@ -7,41 +7,19 @@ from app.api.deps import require_roles
 from app.models.user import User
 from app.models.pilot import PilotAssignment
 from app.models.booking import Booking
-from app.models.time_entry import TimeEntry
-from app.models.route import Route
 from app.services.audit_service import log_audit
 from app.services.email_service import queue_email
+from app.services.pilot_service import FEED_SCOPES, assignment_feed
 
 router = APIRouter(tags=["pilot"])
 
 @router.get("/pilot/assignments")
-def my_assignments(db: Session = Depends(get_db), me: User = Depends(require_roles("pilot"))):
-    assigns = db.query(PilotAssignment).filter(PilotAssignment.pilot_user_id == me.id).order_by(PilotAssignment.created_at.desc()).all()
-    items = []
-    for a in assigns:
-        te = db.get(TimeEntry, a.time_entry_id)
-        route = db.get(Route, te.route_id) if te and te.route_id else None
-        bookings = db.query(Booking).filter(Booking.time_entry_id == a.time_entry_id).order_by(Booking.created_at.asc()).all()
-        items.append({
-            "assignmentId": a.id,
-            "timeEntryId": a.time_entry_id,
-            "status": a.status,
-            "createdAt": a.created_at.isoformat(),
-            "completedAt": a.completed_at.isoformat() if a.completed_at else None,
-            "dateStr": te.date_str if te else None,
-            "start": te.start if te else None,
-            "end": te.end if te else None,
-            "from_label": route.from_label if route else None,
-            "to_label": route.to_label if route else None,
-            "routeLabel": (f"{route.from_label} → {route.to_label}") if route and route.from_label and route.to_label else None,
-            "bookings": [{
-                "bookingRef": b.booking_ref,
-                "status": b.status,
-                "paymentStatus": b.payment_status,
-                "pax": b.pax,
-            } for b in bookings]
-        })
-    return {"items": items}
+def my_assignments(scope: str = "upcoming", days: int = 30, limit: int = 50, offset: int = 0,
+                   db: Session = Depends(get_db), me: User = Depends(require_roles("pilot"))):
+    """Assigned flights in a date window (upcoming: next `days` days from today; past: previous `days` days), paged, with manifests."""
+    if scope not in FEED_SCOPES:
+        raise HTTPException(status_code=400, detail=f"scope must be one of {', '.join(FEED_SCOPES)}")
+    return assignment_feed(db, me.id, scope=scope, days=days, limit=limit, offset=offset)
 
 @router.post("/pilot/assignments/{assignment_id}/accept")
 def accept_assignment(assignment_id: str, db: Session = Depends(get_db), me: User = Depends(require_roles("pilot"))):
@@ -1,36 +1,28 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from app.db.session import get_db
+from app.core import response_cache
 from app.models.route import Route
-from app.models.location import Location
-from app.models.time_entry import TimeEntry
 from app.schemas.ops_payload import PublicRouteOut
 from app.services.ops_payload_service import build_ops_payload, to_ops_b64url
+from app.services.availability_service import parse_date, public_slots_query, calendar_min_price_query, slot_dates_query
 from app.services.settings_service import get_usd_to_tzs_rate
+from app.services.origin_index import DAR_ES_SALAAM_AIRPORT, get_origin_index, normalize_from_label
 
 router = APIRouter(tags=["public"])
 
 
-def _normalize_from_label(from_label: str) -> str:
-    """Map customer-facing origin names to route from_label (e.g. Nungwi -> Zanzibar Nungwi)."""
-    t = (from_label or "").strip()
-    if t.lower() == "nungwi":
-        return "Zanzibar Nungwi"
-    return t
-
-
 def _dar_es_salaam_airport_excluded_weekdays():
     """Weekdays when no flights originate from Dar es Salaam Airport (Tuesday=1, Sunday=6)."""
     return (1, 6)  # Tuesday, Sunday
 
 
 @router.get("/public/fx-rate")
-def get_public_fx_rate(db: Session = Depends(get_db)):
+def get_public_fx_rate(request: Request, db: Session = Depends(get_db)):
     """Public TZS per USD rate for customer-facing price display."""
-    return {"usdToTzs": get_usd_to_tzs_rate(db)}
+    return response_cache.cached_json_response(request, response_cache.FX, lambda: {"usdToTzs": get_usd_to_tzs_rate(db)})
 
 
 def _time_entry_price_usd(t) -> int:
@@ -41,43 +33,23 @@ def _time_entry_price_usd(t) -> int:
     return t.price_usd
 
 
-def _region_from_name(name: str) -> str:
-    """Derive DAR | ZANZIBAR | OTHER from location name (dropdown value)."""
-    n = (name or "").strip().lower()
-    if "zanzibar" in n:
-        return "ZANZIBAR"
-    if "other" in n:
-        return "OTHER"
-    return "DAR"
-
-
 @router.get("/public/origins")
-def list_origins(db: Session = Depends(get_db)):
+def list_origins(request: Request, db: Session = Depends(get_db)):
     """List booking origins: one per location (first sub). label=Name Sub; value=sub for Other, else label."""
-    locations = db.query(Location).filter(Location.active == True).order_by(Location.name.asc()).all()
-    origins = []
-    seen = set()
-    for loc in locations:
-        name = (loc.name or "").strip()
-        subs = loc.subs
-        if not name or not subs:
-            continue
-        sub = (subs[0] or "").strip() if subs else ""
-        if not sub:
-            continue
-        region_group = _region_from_name(name)
-        label = f"{name} {sub}".strip()
-        if not label or label in seen:
-            continue
-        seen.add(label)
-        value = sub if region_group == "OTHER" else label
-        origins.append({"label": label, "region": region_group, "sub": sub, "value": value})
-    return {"origins": origins}
+    return response_cache.cached_json_response(request, response_cache.ORIGINS, lambda: _build_origins(db))
+
+
+def _build_origins(db: Session) -> dict:
+    return {"origins": get_origin_index(db).origins}
 
 
 @router.get("/public/routes", response_model=list[PublicRouteOut])
-def list_routes(db: Session = Depends(get_db)):
+def list_routes(request: Request, db: Session = Depends(get_db)):
     """List active routes. Use the returned `id` as `route_id` for ops-link and time-entries."""
+    return response_cache.cached_json_response(request, response_cache.ROUTES, lambda: _build_routes(db))
+
+
+def _build_routes(db: Session) -> list[PublicRouteOut]:
     items = db.query(Route).filter(Route.active == True).all()
     return [
         PublicRouteOut(
@@ -126,43 +98,18 @@ def calendar_availability(
         raise HTTPException(status_code=400, detail="Invalid date range")
     pax = max(1, min(99, pax))
 
-    from_trim = _normalize_from_label(from_label)
-    routes = db.query(Route.id).filter(
-        Route.active == True,
-        func.lower(Route.from_label) == from_trim.lower(),
-    ).all()
-    route_ids = [r.id for r in routes]
+    from_trim = normalize_from_label(from_label)
+    route_ids = list(get_origin_index(db).route_ids(from_trim))
     if not route_ids:
         return {}
 
+    # Dar es Salaam Airport: no flights on Tuesday or Sunday
+    excluded = _dar_es_salaam_airport_excluded_weekdays() if from_trim.lower() == DAR_ES_SALAAM_AIRPORT else ()
     out = {}
-    current = start_dt
-    while current <= end_dt:
-        date_str = current.strftime("%Y-%m-%d")
-        entries = (
-            db.query(TimeEntry)
-            .filter(
-                TimeEntry.route_id.in_(route_ids),
-                TimeEntry.date_str == date_str,
-                TimeEntry.visibility == "PUBLIC",
-                TimeEntry.status == "PUBLISHED",
-                TimeEntry.seats_available >= pax,
-            )
-            .all()
-        )
-        if entries:
-            # Dar es Salaam Airport: no flights on Tuesday or Sunday
-            if from_trim.lower() == "dar es salaam airport":
-                wd = current.weekday()
-                if wd in _dar_es_salaam_airport_excluded_weekdays():
-                    pass  # do not add this date
-                else:
-                    min_usd = min(_time_entry_price_usd(t) for t in entries)
-                    out[date_str] = {"minPriceUSD": min_usd}
-            else:
-                min_usd = min(_time_entry_price_usd(t) for t in entries)
-                out[date_str] = {"minPriceUSD": min_usd}
-        current += timedelta(days=1)
+    for day, min_usd in calendar_min_price_query(db, route_ids, start_dt, end_dt, min_seats=pax).all():
+        if day.weekday() in excluded:
+            continue
+        out[day.isoformat()] = {"minPriceUSD": min_usd}
     return out
 
 
@@ -172,34 +119,16 @@ def list_dates_with_slots(
     db: Session = Depends(get_db),
 ):
     """Return dates that have at least one slot (time entry) for the given origin. Useful to see which dates are currently in the DB."""
-    from_trim = _normalize_from_label(from_label)
-    routes = db.query(Route.id).filter(
-        Route.active == True,
-        func.lower(Route.from_label) == from_trim.lower(),
-    ).all()
-    route_ids = [r.id for r in routes]
+    from_trim = normalize_from_label(from_label)
+    route_ids = list(get_origin_index(db).route_ids(from_trim))
     if not route_ids:
         return {"from_label": from_trim, "dates": []}
-    rows = (
-        db.query(TimeEntry.date_str)
-        .filter(
-            TimeEntry.route_id.in_(route_ids),
-            TimeEntry.visibility == "PUBLIC",
-            TimeEntry.status == "PUBLISHED",
-            TimeEntry.seats_available > 0,
-        )
-        .distinct()
-        .order_by(TimeEntry.date_str.asc())
-        .all()
-    )
-    dates = [r[0] for r in rows]
+    days = [r[0] for r in slot_dates_query(db, route_ids).all()]
     # Apply same rules as calendar: Dar es Salaam Airport has no flights on Tuesday or Sunday
-    if from_trim.lower() == "dar es salaam airport":
+    if from_trim.lower() == DAR_ES_SALAAM_AIRPORT:
         excluded = _dar_es_salaam_airport_excluded_weekdays()
-        dates = [
-            d for d in dates
-            if datetime.strptime(d, "%Y-%m-%d").date().weekday() not in excluded
-        ]
+        days = [d for d in days if d.weekday() not in excluded]
+    dates = [d.isoformat() for d in days]
     return {"from_label": from_trim, "dates": dates}
 
 
@@ -211,43 +140,28 @@ def list_time_entries(
     db: Session = Depends(get_db),
 ):
     """List slots for a date. Provide either route_id or from_label (origin); from_label returns slots from all routes with that origin."""
+    day = parse_date(dateStr)
+    index = get_origin_index(db)
     if route_id:
         route_ids = [route_id]
     elif from_label:
-        from_trim = _normalize_from_label(from_label)
+        from_trim = normalize_from_label(from_label)
         # Dar es Salaam Airport: no flights on Tuesday or Sunday
-        if from_trim.lower() == "dar es salaam airport":
-            try:
-                dt = datetime.strptime(dateStr, "%Y-%m-%d").date()
-                if dt.weekday() in _dar_es_salaam_airport_excluded_weekdays():
-                    return {"items": []}
-            except ValueError:
-                pass
-        routes = db.query(Route.id).filter(
-            Route.active == True,
-            func.lower(Route.from_label) == from_trim.lower(),
-        ).all()
-        route_ids = [r.id for r in routes]
+        if day and from_trim.lower() == DAR_ES_SALAAM_AIRPORT:
+            if day.weekday() in _dar_es_salaam_airport_excluded_weekdays():
+                return {"items": []}
+        route_ids = list(index.route_ids(from_trim))
         if not route_ids:
             return {"items": []}
     else:
         raise HTTPException(status_code=400, detail="Provide route_id or from_label")
+    if day is None:
+        return {"items": []}
 
-    q = (
-        db.query(TimeEntry)
-        .filter(
-            TimeEntry.route_id.in_(route_ids),
-            TimeEntry.date_str == dateStr,
-            TimeEntry.visibility == "PUBLIC",
-            TimeEntry.status == "PUBLISHED",
-            TimeEntry.seats_available > 0,
-        )
-        .order_by(TimeEntry.start.asc())
-        .all()
-    )
+    q = public_slots_query(db, route_ids, day).all()
     items_out = []
     for t in q:
-        route = db.get(Route, t.route_id) if t.route_id else None
+        labels = index.route_labels.get(t.route_id) if t.route_id else None
         item = {
             "id": t.id,
             "start": t.start,
@@ -262,8 +176,7 @@ def list_time_entries(
             "flightNo": t.flight_no,
             "cabin": t.cabin,
         }
-        if route:
-            item["from_label"] = route.from_label
-            item["to_label"] = route.to_label
+        if labels:
+            item["from_label"], item["to_label"] = labels
         items_out.append(item)
     return {"items": items_out}
@@ -13,8 +13,31 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
 
+    # Password hashing (PBKDF2-SHA256). Changing rounds rehashes each user's password on their next login.
+    PASSWORD_HASH_ROUNDS: int = 29000
+    PASSWORD_HASH_WORKERS: int = 4  # dedicated threads for hash/verify so logins don't starve the request threadpool
+
     DATABASE_URL: str
 
+    # Container startup (app/startup.py): migrations, seed and legacy cleanup run only when their inputs
+    # changed, by one replica at a time under a Postgres advisory lock; the others wait for it.
+    DB_WAIT_TIMEOUT: int = 60  # seconds to wait for Postgres to accept connections
+    STARTUP_LOCK_TIMEOUT: int = 900  # seconds to wait for another replica's migrations
+    STARTUP_FORCE: bool = False  # rerun every step even if its fingerprint is unchanged
+
+    # Prometheus /metrics (off by default: it exposes business gauges). With several uvicorn workers set
+    # PROMETHEUS_MULTIPROC_DIR to an empty writable dir.
+    METRICS_ENABLED: bool = False
+    METRICS_TOKEN: str = ""  # /metrics requires "Authorization: Bearer <token>"; without a token it answers 401
+    METRICS_PUBLIC: bool = False  # explicit opt-out: serve /metrics without a token (e.g. private network only)
+    PROMETHEUS_MULTIPROC_DIR: str = ""
+
+    # SQL profiler / N+1 detector. ENABLED profiles every request; HEADER allows opt-in per request with "X-SQL-Profile: 1".
+    SQL_PROFILER_ENABLED: bool = False
+    SQL_PROFILER_HEADER: bool = False
+    SQL_PROFILER_N_PLUS_ONE: int = 5  # same normalized statement this many times in one request = N+1 suspect
+    SQL_PROFILER_HISTORY: int = 100   # reports kept in memory per worker
+
     @field_validator("DATABASE_URL", mode="after")
     @classmethod
     def normalize_database_url(cls, v: str) -> str:
@@ -24,6 +47,35 @@ class Settings(BaseSettings):
         return v
     REDIS_URL: str = "redis://localhost:6379/0"
 
+    # Response cache for public reference data (/public/origins, /public/routes, /public/fx-rate).
+    # Shared tier in REDIS_URL; invalidated by the ops/admin endpoints that change the data.
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_TTL_SECONDS: int = 300  # server-side lifetime of an entry
+    RESPONSE_CACHE_MAX_AGE: int = 60  # Cache-Control max-age sent to browsers/CDNs
+
+    # Audit log: records are written in the caller's transaction unless the call opts in with sync=False.
+    # buffered = those opted-in records are queued per process and written in batches by a background
+    # thread after the caller's commit; sync = every record goes through the caller's transaction.
+    AUDIT_SINK: str = "buffered"
+    AUDIT_BATCH_SIZE: int = 200  # flush as soon as this many records are queued
+    AUDIT_FLUSH_INTERVAL_MS: int = 500  # ... or after this long
+    AUDIT_BUFFER_MAX: int = 50000  # oldest records are dropped (and logged) beyond this while the DB is unreachable
+
+    # audit_logs / email_logs are partitioned by month; expired partitions are exported to
+    # <target>/<table>/<partition>.csv.gz and dropped by the daily maintenance job. 0 = keep forever.
+    AUDIT_LOG_RETENTION_MONTHS: int = 24
+    EMAIL_LOG_RETENTION_MONTHS: int = 6
+    # Durable archive target: local | s3. Empty = none, and expired partitions are kept instead of dropped.
+    LOG_ARCHIVE_BACKEND: str = ""
+    LOG_ARCHIVE_DIR: str = ""  # local: absolute path of a mounted volume (docker-compose: /archive)
+    LOG_ARCHIVE_S3_BUCKET: str = ""  # s3: empty = S3_BUCKET_NAME (same endpoint and credentials as tickets)
+    LOG_ARCHIVE_S3_PREFIX: str = "log-archive"
+    LOG_PARTITIONS_AHEAD: int = 3  # months of partitions created in advance
+    EMAIL_RETRY_WINDOW_DAYS: int = 7  # the email queue only retries messages this recent
+
+    # Periodic Celery jobs take a Redis lease lock so runs never overlap (app/core/job_lock.py).
+    JOB_LOCKS_ENABLED: bool = True
+
     SMTP_HOST: str = "localhost"
     SMTP_PORT: int = 25
     SMTP_USERNAME: str = ""
@@ -36,14 +88,27 @@ class Settings(BaseSettings):
     CLIENT_BASE_URL: str = ""  # e.g. https://flysunbird.co.tz
     API_PUBLIC_URL: str = ""  # e.g. https://api.flysunbird.co.tz - for ticket QR code (scan → PDF)
 
-    # Ticket storage
+    # Ticket storage. Backend: local | gcs | s3; empty = gcs when bucket + credentials are set, else local.
+    TICKET_STORAGE_BACKEND: str = ""
     TICKET_LOCAL_DIR: str = "./data/tickets"
+    TICKET_LOCAL_SHARDED: bool = True  # new local tickets go to <dir>/<ab>/<cd>/<ref>.pdf
     GCS_BUCKET_NAME: str = ""
     GOOGLE_APPLICATION_CREDENTIALS: str = ""
+    TICKET_SIGNED_URL_TTL_SECONDS: int = 1200  # GCS signed download URLs (cached while >25% of this remains)
+    # S3-compatible ticket storage (AWS S3, MinIO, ...). Empty endpoint = AWS; empty keys = default AWS credential chain.
+    S3_ENDPOINT_URL: str = ""
+    S3_BUCKET_NAME: str = ""
+    S3_REGION: str = ""
+    S3_ACCESS_KEY_ID: str = ""
+    S3_SECRET_ACCESS_KEY: str = ""
+    S3_MAX_POOL_CONNECTIONS: int = 20
+    S3_MULTIPART_THRESHOLD_MB: int = 8
 
     # Ticket PDF branding (optional). Paths can be absolute or relative to project root. Empty = no logo.
     TICKET_HEADER_LOGO_PATH: str = ""   # e.g. app/assets/ticket_header_logo.png
     TICKET_FOOTER_LOGO_PATH: str = ""   # e.g. app/assets/ticket_footer_logo.png
+    # QR code drawn as vector rectangles (crisp, small). False = embed a PNG image as before.
+    TICKET_QR_VECTOR: bool = True
 
     # Selcom (Tanzania: mobile money, cards). Vendor = Till Number from Selcom.
     SELCOM_BASE_URL: str = "https://apigw.selcommobile.com/v1"
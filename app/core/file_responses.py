@@ -0,0 +1,129 @@
+"""
+Local file responses with a content-hash ETag, conditional GET (304) and single byte ranges (206).
+
+Starlette's FileResponse (0.38) sends neither Accept-Ranges nor a content-based ETag, so
+repeated downloads of the same ticket always transfer the whole file.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from functools import lru_cache
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response, StreamingResponse
+
+_CHUNK = 64 * 1024
+
+
+@lru_cache(maxsize=4096)
+def _file_digest(path: str, mtime_ns: int, size: int) -> str:
+    h = hashlib.md5(usedforsecurity=False)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_etag(path: str, st: os.stat_result | None = None) -> str:
+    """Strong ETag from the file's MD5, computed once per (path, mtime, size)."""
+    st = st or os.stat(path)
+    return f'"{_file_digest(path, st.st_mtime_ns, st.st_size)}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    tags = [t.strip() for t in header.split(",")]
+    return any(t.removeprefix("W/") == etag for t in tags)
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None | bool:
+    """(start, end inclusive) for one satisfiable range; None to ignore the header; False if unsatisfiable."""
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None  # other units and multipart ranges: serve the full file
+    first, _, last = spec.strip().partition("-")
+    try:
+        if first == "":
+            length = int(last)
+            if length <= 0:
+                return False
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return False
+    return start, min(end, size - 1)
+
+
+def _iter_range(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(_CHUNK, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def conditional_file_response(
+    request: Request,
+    path: str,
+    *,
+    media_type: str,
+    filename: str | None = None,
+    disposition: str = "attachment",
+    cache_control: str = "private, no-cache",
+) -> Response:
+    """Serve `path` honouring If-None-Match / If-Modified-Since, Range and If-Range."""
+    st = os.stat(path)
+    etag = file_etag(path, st)
+    headers = {
+        "etag": etag,
+        "last-modified": formatdate(st.st_mtime, usegmt=True),
+        "cache-control": cache_control,
+        "accept-ranges": "bytes",
+    }
+    if filename:
+        headers["content-disposition"] = f'{disposition}; filename="{filename}"'
+
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        if _etag_matches(inm, etag):
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        try:
+            if int(st.st_mtime) <= parsedate_to_datetime(request.headers["if-modified-since"]).timestamp():
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and request.method == "GET" and (if_range is None or if_range.strip() == etag):
+        rng = _parse_range(range_header, st.st_size)
+        if rng is False:
+            return Response(status_code=416, headers={**headers, "content-range": f"bytes */{st.st_size}"})
+        if rng is not None:
+            start, end = rng
+            length = end - start + 1
+            headers["content-range"] = f"bytes {start}-{end}/{st.st_size}"
+            headers["content-length"] = str(length)
+            return StreamingResponse(
+                _iter_range(path, start, length), status_code=206, media_type=media_type, headers=headers
+            )
+
+    headers.pop("content-disposition", None)
+    return FileResponse(
+        path,
+        media_type=media_type,
+        headers=headers,
+        filename=filename,
+        content_disposition_type=disposition,
+        stat_result=st,
+    )
@@ -0,0 +1,142 @@
+"""
+Redis lease locks for periodic Celery jobs. They keep a job from running twice at once, whether
+a run takes longer than its schedule or two beat instances overlap during a deploy.
+
+@singleton_job(name, lease_seconds, overrun_after) wraps a task body:
+
+- A run starts by taking flysunbird:joblock:<name> with SET NX PX and a random token. If the key
+  is already held, another run is in progress, so this run is skipped and returns
+  {"skipped": True, ...}.
+- While the run lasts, a heartbeat thread extends the lease every lease_seconds / 3, but only
+  while the key still holds this run's token. A long run keeps its lock; if a worker is killed,
+  its lock expires within one lease.
+- At the end the key is deleted, again only if it still holds this run's token.
+- If Redis is unreachable, the run is skipped (fail closed). The broker is the same Redis, so
+  beat retries soon, and a missed run is cheaper than one that double-sends emails.
+
+Counters for each job live in the Redis hash flysunbird:jobstats:<name>: runs, skipped,
+overruns (runs longer than overrun_after, usually the schedule interval), lost (the lease
+expired while the run was still going), plus the last duration and finish time. Workers run in
+other containers, so the API's /metrics reads these counters from Redis (app/core/metrics.py).
+"""
+import functools
+import logging
+import threading
+import time
+import uuid
+
+from app.core.config import settings
+from app.core.redis_client import get_redis, mark_down
+
+logger = logging.getLogger(__name__)
+
+LOCK_PREFIX = "flysunbird:joblock:"
+STATS_PREFIX = "flysunbird:jobstats:"
+
+# Compare-and-renew / compare-and-delete: only the holder of the token may touch the lock
+_RENEW = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+_RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+
+class LeaseLock:
+    def __init__(self, r, name: str, lease_seconds: float):
+        self.r = r
+        self.name = name
+        self.key = LOCK_PREFIX + name
+        self.token = uuid.uuid4().hex
+        self.lease_ms = max(int(lease_seconds * 1000), 1000)
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def acquire(self) -> bool:
+        if not self.r.set(self.key, self.token, nx=True, px=self.lease_ms):
+            return False
+        self._thread = threading.Thread(target=self._heartbeat, name=f"joblock-{self.name}", daemon=True)
+        self._thread.start()
+        return True
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.lease_ms / 3000):
+            try:
+                if not self.r.eval(_RENEW, 1, self.key, self.token, self.lease_ms):
+                    self.lost.set()
+                    logger.error("job %s lost its lock (lease expired); another run may start", self.name)
+                    return
+            except Exception as e:
+                # Keep trying: the lease still has up to two thirds of its time left
+                logger.warning("job %s: lock renewal failed (%s)", self.name, e)
+
+    def release(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        try:
+            if not self.r.eval(_RELEASE, 1, self.key, self.token):
+                self.lost.set()
+        except Exception as e:
+            logger.warning("job %s: lock release failed (%s); it expires within %ss", self.name, e, self.lease_ms / 1000)
+
+
+def _record(r, name: str, **incr) -> None:
+    try:
+        with r.pipeline(transaction=False) as p:
+            for field, n in incr.items():
+                if field.startswith("last_"):
+                    p.hset(STATS_PREFIX + name, field, n)
+                elif n:
+                    p.hincrby(STATS_PREFIX + name, field, int(n))
+            p.execute()
+    except Exception as e:
+        logger.warning("job %s: stats not recorded (%s)", name, e)
+
+
+def singleton_job(name: str, lease_seconds: float = 60, overrun_after: float | None = None):
+    """Run the wrapped function only if no other run of `name` holds the lease (see module docstring)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            if not settings.JOB_LOCKS_ENABLED:
+                return fn(*args, **kwargs)
+            r = get_redis()
+            lock = LeaseLock(r, name, lease_seconds) if r is not None else None
+            try:
+                acquired = lock is not None and lock.acquire()
+            except Exception as e:
+                mark_down(e)
+                lock, acquired = None, False
+            if lock is None:
+                logger.warning("job %s skipped: lock store unavailable", name)
+                return {"skipped": True, "reason": "lock_unavailable"}
+            if not acquired:
+                logger.info("job %s skipped: previous run still in progress", name)
+                _record(r, name, skipped=1)
+                return {"skipped": True, "reason": "already_running"}
+
+            started = time.monotonic()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                lock.release()
+                duration = time.monotonic() - started
+                overrun = overrun_after is not None and duration > overrun_after
+                if overrun:
+                    logger.warning("job %s overran: %.1fs (schedule %ss)", name, duration, overrun_after)
+                _record(
+                    r, name, runs=1, overruns=int(overrun), lost=int(lock.lost.is_set()),
+                    last_duration_seconds=round(duration, 3), last_finished_at=int(time.time()),
+                )
+        return run
+    return decorator
+
+
+def job_stats(r) -> dict[str, dict[str, float]]:
+    """{job name: counters} for every job that has recorded a run or a skip, plus running=0/1."""
+    out: dict[str, dict[str, float]] = {}
+    for key in r.scan_iter(match=STATS_PREFIX + "*", count=100):
+        key = key.decode() if isinstance(key, bytes) else key
+        name = key[len(STATS_PREFIX):]
+        raw = r.hgetall(key)
+        out[name] = {(k.decode() if isinstance(k, bytes) else k): float(v) for k, v in raw.items()}
+        out[name]["running"] = float(bool(r.exists(LOCK_PREFIX + name)))
+    return out
@@ -0,0 +1,296 @@
+"""
+Prometheus metrics: HTTP latency per route template, in-flight requests, SQL query counts and
+durations (SQLAlchemy engine events), and business gauges computed at scrape time.
+
+Multiple uvicorn workers: set PROMETHEUS_MULTIPROC_DIR to an empty, writable directory (wiped on
+start, see entrypoint.sh). Each worker then writes its samples there and /metrics aggregates all of
+them; without it the endpoint reports the current process only.
+"""
+import logging
+import os
+import time
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import settings
+
+# prometheus_client picks its value backend at import time, so the env var must be set first
+if settings.PROMETHEUS_MULTIPROC_DIR:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", settings.PROMETHEUS_MULTIPROC_DIR)
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily  # noqa: E402
+from sqlalchemy import event, func  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+MULTIPROCESS = bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+# Paths not worth timing (scrapes themselves)
+_SKIP_PATHS = {"/metrics"}
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed, by route template", ["route"])
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement latency by statement type",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "SQL statements per HTTP request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds",
+    "Total SQL time per HTTP request",
+    ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+
+class _RequestDbStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+# Mutable per-request holder; sync endpoints run in a threadpool that copies the context, so
+# queries issued there update the same object.
+_request_db_stats: ContextVar[_RequestDbStats | None] = ContextVar("request_db_stats", default=None)
+
+
+def _operation(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[0].upper() if statement and statement.strip() else "OTHER"
+    return word if word in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH") else "OTHER"
+
+
+def instrument_engine(engine) -> None:
+    """Count and time every statement executed through `engine`."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_metrics_query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        DB_QUERY_LATENCY.labels(_operation(statement)).observe(elapsed)
+        stats = _request_db_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+
+
+def route_template(scope) -> str:
+    """Matched route path (e.g. /api/v1/bookings/{booking_ref}) to keep label cardinality bounded."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    if path is None:
+        return "<unmatched>"
+    if route.__class__.__name__ == "Mount":
+        return "<static>"
+    return path
+
+
+class PrometheusMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware overhead) recording request metrics."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") in _SKIP_PATHS:
+            await self.app(scope, receive, send)
+            return
+        method = scope.get("method", "GET")
+        status = {"code": 500}
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        stats = _RequestDbStats()
+        token = _request_db_stats.set(stats)
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_progress.dec()
+            _request_db_stats.reset(token)
+            route = route_template(scope)
+            REQUEST_LATENCY.labels(method, route, str(status["code"])).observe(elapsed)
+            if stats.queries:
+                DB_QUERIES.labels(route).inc(stats.queries)
+            DB_QUERIES_PER_REQUEST.labels(route).observe(stats.queries)
+            DB_TIME_PER_REQUEST.labels(route).observe(stats.seconds)
+
+
+# -------------------------
+# Business gauges (computed at scrape time, cached briefly so frequent scrapes stay cheap)
+# -------------------------
+_BUSINESS_TTL_SECONDS = 15
+
+
+class BusinessCollector:
+    def __init__(self):
+        self._cache: tuple[float, list] | None = None
+
+    def _read(self) -> list:
+        from app.db.session import SessionLocal
+        from app.models.booking import Booking
+        from app.models.email_log import EmailLog
+        from app.models.time_entry import TimeEntry
+
+        now = datetime.now(timezone.utc)
+        db = SessionLocal()
+        try:
+            holds = (
+                db.query(func.count(Booking.id))
+                .filter(
+                    Booking.status.in_(["PENDING_PAYMENT", "DRAFT"]),
+                    Booking.hold_expires_at != None,  # noqa: E711
+                    Booking.hold_expires_at > now,
+                )
+                .scalar() or 0
+            )
+            seats = (
+                db.query(func.coalesce(func.sum(TimeEntry.seats_available), 0))
+                .filter(
+                    TimeEntry.flight_date == now.date(),
+                    TimeEntry.visibility == "PUBLIC",
+                    TimeEntry.status == "PUBLISHED",
+                )
+                .scalar() or 0
+            )
+            # Recent partitions only, like the email queue itself
+            since = now - timedelta(days=max(settings.EMAIL_RETRY_WINDOW_DAYS, 1))
+            emails = (
+                db.query(EmailLog.status, func.count(EmailLog.id))
+                .filter(EmailLog.created_at >= since)
+                .group_by(EmailLog.status)
+                .all()
+            )
+        finally:
+            db.close()
+
+        g_holds = GaugeMetricFamily("flysunbird_pending_holds", "Bookings holding seats (pending payment, hold not expired)")
+        g_holds.add_metric([], int(holds))
+        g_seats = GaugeMetricFamily("flysunbird_seats_available_today", "Seats available on today's public, published slots")
+        g_seats.add_metric([], int(seats))
+        g_email = GaugeMetricFamily("flysunbird_email_queue", "Email log rows by status (last EMAIL_RETRY_WINDOW_DAYS days)", labels=["status"])
+        for status, n in emails:
+            g_email.add_metric([status or "unknown"], int(n))
+        return [g_holds, g_seats, g_email]
+
+    def describe(self):
+        # Without describe() the registry calls collect() on register, i.e. a DB query at import
+        return []
+
+    def collect(self):
+        now = time.monotonic()
+        if self._cache is None or now - self._cache[0] > _BUSINESS_TTL_SECONDS:
+            try:
+                self._cache = (now, self._read())
+            except Exception as e:
+                logger.warning("business metrics unavailable: %s", e)
+                return []
+        return self._cache[1]
+
+
+_business = BusinessCollector()
+if not MULTIPROCESS:
+    REGISTRY.register(_business)
+
+
+# -------------------------
+# Periodic job runs (counters kept in Redis by app/core/job_lock.py: workers run elsewhere)
+# -------------------------
+class JobCollector:
+    def describe(self):
+        # As above: keep registration (at import) from connecting to Redis
+        return []
+
+    def collect(self):
+        from app.core.job_lock import job_stats
+        from app.core.redis_client import get_redis, mark_down
+
+        r = get_redis()
+        if r is None:
+            return []
+        try:
+            stats = job_stats(r)
+        except Exception as e:
+            mark_down(e)
+            return []
+        runs = CounterMetricFamily("flysunbird_job_runs", "Periodic job runs that held the lock", labels=["job"])
+        skipped = CounterMetricFamily("flysunbird_job_skipped", "Runs skipped because a previous run still held the lock", labels=["job"])
+        overruns = CounterMetricFamily("flysunbird_job_overruns", "Runs that took longer than their schedule interval", labels=["job"])
+        lost = CounterMetricFamily("flysunbird_job_lock_lost", "Runs whose lock lease expired before they finished", labels=["job"])
+        duration = GaugeMetricFamily("flysunbird_job_last_duration_seconds", "Duration of the last finished run", labels=["job"])
+        running = GaugeMetricFamily("flysunbird_job_running", "1 while a run holds the job lock", labels=["job"])
+        for job, s in sorted(stats.items()):
+            runs.add_metric([job], s.get("runs", 0))
+            skipped.add_metric([job], s.get("skipped", 0))
+            overruns.add_metric([job], s.get("overruns", 0))
+            lost.add_metric([job], s.get("lost", 0))
+            if "last_duration_seconds" in s:
+                duration.add_metric([job], s["last_duration_seconds"])
+            running.add_metric([job], s.get("running", 0))
+        return [runs, skipped, overruns, lost, duration, running]
+
+
+_jobs = JobCollector()
+if not MULTIPROCESS:
+    REGISTRY.register(_jobs)
+
+
+def render_latest() -> tuple[bytes, str]:
+    """Prometheus text exposition for this process, or for all workers in multiprocess mode."""
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_business)
+        registry.register(_jobs)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges from the multiprocess directory (call on shutdown)."""
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(os.getpid())
@@ -0,0 +1,53 @@
+"""
+Shared Redis client for the API and worker processes (caches, job locks). Celery keeps its own connections.
+
+get_redis() returns None while Redis is unreachable so callers can degrade (e.g. serve from the
+in-memory cache tier only); after a failure it is not retried for a short cool-down.
+"""
+import logging
+import threading
+import time
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_RETRY_AFTER_SECONDS = 30
+
+_client = None
+_down_until = 0.0
+_lock = threading.Lock()
+
+
+def _connect():
+    import redis  # type: ignore
+
+    url = settings.REDIS_URL
+    kwargs = {"socket_timeout": 0.5, "socket_connect_timeout": 0.5, "health_check_interval": 30}
+    if url.strip().lower().startswith("rediss://"):
+        kwargs["ssl_cert_reqs"] = None  # same as Celery (Upstash and other managed TLS endpoints)
+    return redis.Redis.from_url(url, **kwargs)
+
+
+def get_redis():
+    """Process-wide redis.Redis (thread-safe, pooled), or None if unavailable."""
+    global _client
+    if not settings.REDIS_URL or time.monotonic() < _down_until:
+        return None
+    if _client is None:
+        with _lock:
+            if _client is None:
+                try:
+                    _client = _connect()
+                except Exception as e:
+                    mark_down(e)
+                    return None
+    return _client
+
+
+def mark_down(error: Exception) -> None:
+    """Record a Redis failure; get_redis() returns None until the cool-down passes."""
+    global _down_until
+    if time.monotonic() >= _down_until:
+        logger.warning("redis unavailable (%s); retrying in %ss", error, _RETRY_AFTER_SECONDS)
+    _down_until = time.monotonic() + _RETRY_AFTER_SECONDS
@@ -0,0 +1,162 @@
+"""
+Versioned response cache for public reference data: origins (locations), routes and the FX rate.
+
+Each namespace has a version number kept in Redis; cached bodies are stored under keys that
+include it, so invalidate() (called by the ops/admin endpoints that change the data) makes every
+worker miss on its next request without deleting anything. Two tiers: a per-process dict, then
+Redis (shared by workers and replicas). Without Redis the cache still works per process, and
+entries expire after at most _NO_REDIS_LOCAL_TTL seconds so other workers catch up.
+
+Responses carry a content-hash ETag and Cache-Control, and If-None-Match is answered with 304.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+from fastapi.encoders import jsonable_encoder
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.core.config import settings
+from app.core.redis_client import get_redis, mark_down
+
+logger = logging.getLogger(__name__)
+
+ORIGINS = "origins"
+ROUTES = "routes"
+FX = "fx"
+
+_KEY_PREFIX = "fsb:respcache"
+_VERSION_RECHECK_SECONDS = 1.0  # how long a worker trusts its last read of a namespace version
+_NO_REDIS_LOCAL_TTL = 30
+
+_lock = threading.Lock()
+_local: dict[tuple[str, str], tuple[str, bytes, str, float]] = {}  # (ns, variant) -> (version, body, etag, expires)
+_versions: dict[str, tuple[str | None, int, float]] = {}  # ns -> (Redis version or None, local bumps, read at)
+_local_bumps: dict[str, int] = {}  # in-process invalidations; only for the per-process tier, never in Redis keys
+
+
+def _version_key(ns: str) -> str:
+    return f"{_KEY_PREFIX}:ver:{ns}"
+
+
+def _read_versions(ns: str) -> tuple[str | None, int]:
+    """(Redis version, or None if Redis is unreachable; this process's invalidation count) for `ns`."""
+    now = time.monotonic()
+    with _lock:
+        cached = _versions.get(ns)
+        if cached and now - cached[2] < _VERSION_RECHECK_SECONDS:
+            return cached[0], cached[1]
+        local = _local_bumps.get(ns, 0)
+    shared = None
+    r = get_redis()
+    if r is not None:
+        try:
+            shared = (r.get(_version_key(ns)) or b"0").decode()
+        except Exception as e:
+            mark_down(e)
+    with _lock:
+        _versions[ns] = (shared, local, now)
+    return shared, local
+
+
+def current_version(ns: str) -> str:
+    """Version of `ns` as seen by this process (Redis version plus local invalidations); for in-process caches."""
+    shared, local = _read_versions(ns)
+    return f"{shared or '-'}.{local}"
+
+
+def local_ttl() -> int:
+    """Lifetime of per-process derived data: the full TTL with Redis, short without (no cross-worker invalidation)."""
+    ttl = max(1, settings.RESPONSE_CACHE_TTL_SECONDS)
+    return ttl if get_redis() is not None else min(ttl, _NO_REDIS_LOCAL_TTL)
+
+
+def invalidate(*namespaces: str) -> None:
+    """Bump the version of each namespace (locally and in Redis); call after the change is committed."""
+    with _lock:
+        for ns in namespaces:
+            _local_bumps[ns] = _local_bumps.get(ns, 0) + 1
+            _versions.pop(ns, None)
+            for key in [k for k in _local if k[0] == ns]:
+                del _local[key]
+    r = get_redis()
+    if r is not None:
+        try:
+            pipe = r.pipeline(transaction=False)
+            for ns in namespaces:
+                pipe.incr(_version_key(ns))
+            pipe.execute()
+        except Exception as e:
+            mark_down(e)
+
+
+def _encode(data: Any) -> bytes:
+    # Same encoding as FastAPI's JSONResponse
+    return json.dumps(jsonable_encoder(data), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _etag(ns: str, body: bytes) -> str:
+    return f'"{ns}-{hashlib.sha1(body).hexdigest()[:20]}"'
+
+
+def get_or_build(ns: str, build: Callable[[], Any], variant: str = "") -> tuple[bytes, str, str]:
+    """(JSON body, ETag, tier: local | redis | miss) for the current version of `ns`."""
+    shared, local = _read_versions(ns)
+    version = f"{shared or '-'}.{local}"
+    now = time.monotonic()
+    with _lock:
+        hit = _local.get((ns, variant))
+    if hit and hit[0] == version and hit[3] > now:
+        return hit[1], hit[2], "local"
+
+    ttl = max(1, settings.RESPONSE_CACHE_TTL_SECONDS)
+    # Redis entries are keyed on the shared version only, so every worker and replica reads the same key
+    entry_key = f"{_KEY_PREFIX}:{ns}:{shared}:{variant}"
+    r = get_redis() if shared is not None else None
+    body = None
+    tier = "miss"
+    if r is not None:
+        try:
+            body = r.get(entry_key)
+        except Exception as e:
+            mark_down(e)
+            r = None
+    if body is not None:
+        tier = "redis"
+    else:
+        body = _encode(build())
+        if r is not None:
+            try:
+                r.set(entry_key, body, ex=ttl)
+            except Exception as e:
+                mark_down(e)
+                r = None
+    etag = _etag(ns, body)
+    expires = now + (ttl if r is not None else min(ttl, _NO_REDIS_LOCAL_TTL))
+    with _lock:
+        _local[(ns, variant)] = (version, body, etag, expires)
+    return body, etag, tier
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    return header.strip() == "*" or etag in (t.strip().removeprefix("W/") for t in header.split(","))
+
+
+def cached_json_response(request: Request, ns: str, build: Callable[[], Any], variant: str = "") -> Response:
+    """JSON response for `build()` served from the cache, with ETag / Cache-Control and 304 support."""
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return Response(content=_encode(build()), media_type="application/json")
+    body, etag, tier = get_or_build(ns, build, variant)
+    headers = {
+        "etag": etag,
+        "cache-control": f"public, max-age={max(0, settings.RESPONSE_CACHE_MAX_AGE)}",
+        "x-cache": tier.upper(),
+    }
+    inm = request.headers.get("if-none-match")
+    if inm and _etag_matches(inm, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
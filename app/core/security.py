@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 
 from jose import jwt
@@ -6,18 +8,60 @@ from passlib.context import CryptContext
 from app.core.config import settings
 
 # PBKDF2 avoids bcrypt backend/version issues and the 72-byte bcrypt input limit.
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# min/max rounds = configured rounds, so hashes made with other parameters are flagged for rehash on login.
+_rounds = max(1000, int(settings.PASSWORD_HASH_ROUNDS))
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=_rounds,
+    pbkdf2_sha256__min_rounds=_rounds,
+    pbkdf2_sha256__max_rounds=_rounds,
+)
 ALGO = "HS256"
 
+# Stored instead of a hash for accounts created without a password (e.g. customers at checkout).
+# Never matches any password, so these accounts cannot log in until a password is set.
+UNUSABLE_PASSWORD = "!"
+
+# hashlib's PBKDF2 releases the GIL, so a small dedicated thread pool bounds concurrent hashing
+# without tying up the threads FastAPI uses for regular (sync) endpoints.
+_password_executor = ThreadPoolExecutor(
+    max_workers=max(1, int(settings.PASSWORD_HASH_WORKERS)),
+    thread_name_prefix="password-hash",
+)
+
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def is_password_usable(password_hash: str | None) -> bool:
+    return bool(password_hash) and not password_hash.startswith(UNUSABLE_PASSWORD)
+
+
 def verify_password(password: str, password_hash: str) -> bool:
+    if not is_password_usable(password_hash):
+        return False
     return pwd_context.verify(password, password_hash)
 
 
+def verify_and_update_password(password: str, password_hash: str) -> tuple[bool, str | None]:
+    """Verify password; also return a fresh hash when the stored one uses outdated parameters."""
+    if not is_password_usable(password_hash):
+        return False, None
+    return pwd_context.verify_and_update(password, password_hash)
+
+
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, hash_password, password)
+
+
+async def verify_and_update_password_async(password: str, password_hash: str) -> tuple[bool, str | None]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, verify_and_update_password, password, password_hash)
+
+
 def create_access_token(subject: str, expires_minutes: int | None = None) -> str:
     if expires_minutes is None:
         expires_minutes = settings.ACCESS_TOKEN_EXPIRE_MINUTES
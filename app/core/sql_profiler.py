@@ -0,0 +1,195 @@
+"""
+Opt-in per-request SQL profiler and N+1 detector.
+
+A request is profiled when SQL_PROFILER_ENABLED is set, or when it sends "X-SQL-Profile: 1" and
+SQL_PROFILER_HEADER is allowed. Every statement it runs is recorded with its timing and grouped by
+normalized text (literals and IN-lists collapsed), so the same query issued in a loop shows up as
+one group with a high count. Profiled responses carry a Server-Timing header and an
+X-SQL-Profile-Id; the full report is kept in memory (per worker) and served by
+GET /api/v1/admin/debug/sql-profiles/{id}.
+"""
+import logging
+import re
+import time
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from threading import Lock
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-sql-profile"
+MAX_STATEMENTS = 500  # per report; groups still count everything
+
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:%\([^)]*\)s|\?|\$\d+|'[^']*'|[-\d.]+)\s*,?)+\)", re.IGNORECASE)
+_POSTCOMPILE = re.compile(r"\(?__\[POSTCOMPILE_[^\]]+\]\)?")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w%])-?\d+(?:\.\d+)?\b")
+_PARAM_SUFFIX = re.compile(r"%\(([a-zA-Z_]+?)(?:_\d+)+\)s")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Collapse literals, bind names and IN-lists so repeats of one query compare equal."""
+    s = _POSTCOMPILE.sub("(...)", statement)
+    s = _IN_LIST.sub("IN (...)", s)
+    s = _STRING.sub("?", s)
+    s = _NUMBER.sub("?", s)
+    s = _PARAM_SUFFIX.sub(r"%(\1)s", s)
+    return _SPACE.sub(" ", s).strip()
+
+
+class RequestProfile:
+    __slots__ = ("statements", "query_count", "db_seconds", "_groups")
+
+    def __init__(self):
+        self.statements: list[tuple[str, float, int]] = []  # (sql, seconds, rowcount)
+        self.query_count = 0
+        self.db_seconds = 0.0
+        self._groups: dict[str, list] = {}  # normalized sql -> [count, total seconds, max seconds]
+
+    def record(self, statement: str, seconds: float, rowcount: int) -> None:
+        self.query_count += 1
+        self.db_seconds += seconds
+        if len(self.statements) < MAX_STATEMENTS:
+            self.statements.append((statement, seconds, rowcount))
+        g = self._groups.setdefault(normalize_sql(statement), [0, 0.0, 0.0])
+        g[0] += 1
+        g[1] += seconds
+        g[2] = max(g[2], seconds)
+
+    def groups(self) -> list[dict]:
+        out = [
+            {"statement": sql, "count": n, "totalMs": round(total * 1000, 3), "maxMs": round(mx * 1000, 3)}
+            for sql, (n, total, mx) in self._groups.items()
+        ]
+        return sorted(out, key=lambda g: (-g["count"], -g["totalMs"]))
+
+
+_current: ContextVar[RequestProfile | None] = ContextVar("sql_profile", default=None)
+
+_reports: "OrderedDict[str, dict]" = OrderedDict()
+_reports_lock = Lock()
+
+
+def _store(report: dict) -> None:
+    with _reports_lock:
+        _reports[report["id"]] = report
+        while len(_reports) > max(1, settings.SQL_PROFILER_HISTORY):
+            _reports.popitem(last=False)
+
+
+def get_report(profile_id: str) -> dict | None:
+    with _reports_lock:
+        return _reports.get(profile_id)
+
+
+def list_reports() -> list[dict]:
+    """Most recent first, without statement lists."""
+    with _reports_lock:
+        items = list(_reports.values())
+    keys = ("id", "method", "path", "route", "status", "totalMs", "dbMs", "queryCount", "nPlusOne")
+    return [{k: r[k] for k in keys} | {"nPlusOne": len(r["nPlusOne"])} for r in reversed(items)]
+
+
+def instrument_engine(engine) -> None:
+    """Record statements of profiled requests executed through `engine`."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("_profiler_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        profile = _current.get()
+        starts = conn.info.get("_profiler_start")
+        if profile is None or not starts:
+            return
+        profile.record(statement, time.perf_counter() - starts.pop(), getattr(cursor, "rowcount", -1))
+
+
+def _wants_profile(scope) -> bool:
+    if settings.SQL_PROFILER_ENABLED:
+        return True
+    if not settings.SQL_PROFILER_HEADER:
+        return False
+    for name, value in scope.get("headers") or []:
+        if name == PROFILE_HEADER:
+            return value.strip().lower() in (b"1", b"true", b"yes")
+    return False
+
+
+def _route_path(scope) -> str | None:
+    return getattr(scope.get("route"), "path", None)
+
+
+class SqlProfilerMiddleware:
+    """Pure ASGI middleware; does nothing for requests that are not profiled."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope) or scope.get("path", "").startswith("/api/v1/admin/debug/"):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        profile_id = uuid.uuid4().hex[:16]
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                total_ms = (time.perf_counter() - start) * 1000
+                timing = (
+                    f'db;dur={profile.db_seconds * 1000:.1f};desc="{profile.query_count} queries", '
+                    f"app;dur={total_ms:.1f}"
+                )
+                headers = list(message.get("headers") or [])
+                headers.append((b"server-timing", timing.encode("latin-1")))
+                headers.append((b"x-sql-profile-id", profile_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = _current.set(profile)
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            _current.reset(token)
+            self._finish(scope, profile, profile_id, status["code"], time.perf_counter() - start)
+
+    @staticmethod
+    def _finish(scope, profile: RequestProfile, profile_id: str, status: int, seconds: float) -> None:
+        groups = profile.groups()
+        threshold = max(2, settings.SQL_PROFILER_N_PLUS_ONE)
+        suspects = [g for g in groups if g["count"] >= threshold]
+        report = {
+            "id": profile_id,
+            "method": scope.get("method"),
+            "path": scope.get("path"),
+            "route": _route_path(scope),
+            "status": status,
+            "totalMs": round(seconds * 1000, 3),
+            "dbMs": round(profile.db_seconds * 1000, 3),
+            "queryCount": profile.query_count,
+            "nPlusOne": suspects,
+            "groups": groups,
+            "statements": [
+                {"sql": sql, "ms": round(s * 1000, 3), "rows": rows} for sql, s, rows in profile.statements
+            ],
+            "truncated": profile.query_count > len(profile.statements),
+        }
+        _store(report)
+        if suspects:
+            logger.warning(
+                "possible N+1 in %s %s (profile %s): %s",
+                report["method"], report["route"] or report["path"], profile_id,
+                "; ".join(f'{g["count"]}x {g["statement"][:120]}' for g in suspects),
+            )
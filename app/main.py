@@ -5,7 +5,7 @@ from pathlib import Path
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse, JSONResponse
+from fastapi.responses import RedirectResponse, JSONResponse, Response
 
 from app.core.config import settings
 from app.api.v1.api import api_router
@@ -38,6 +38,34 @@ else:
         allow_headers=["*"],
     )
 
+if settings.METRICS_ENABLED:
+    from app.core import metrics
+    from app.db.session import engine
+
+    metrics.instrument_engine(engine)
+    app.add_middleware(metrics.PrometheusMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics(request: Request):
+        authorized = settings.METRICS_PUBLIC or (
+            settings.METRICS_TOKEN and request.headers.get("authorization") == f"Bearer {settings.METRICS_TOKEN}"
+        )
+        if not authorized:
+            return JSONResponse(status_code=401, content={"detail": "Unauthorized"})
+        body, content_type = metrics.render_latest()
+        return Response(content=body, media_type=content_type)
+
+    @app.on_event("shutdown")
+    def _metrics_shutdown():
+        metrics.mark_process_dead()
+
+if settings.SQL_PROFILER_ENABLED or settings.SQL_PROFILER_HEADER:
+    from app.core import sql_profiler
+    from app.db.session import engine
+
+    sql_profiler.instrument_engine(engine)
+    app.add_middleware(sql_profiler.SqlProfilerMiddleware)
+
 app.include_router(api_router)
 
 
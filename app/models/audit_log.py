@@ -1,15 +1,23 @@
-from sqlalchemy import String, DateTime, Text
+from sqlalchemy import String, DateTime, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime, timezone
 from app.db.session import Base
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    # Partitioned by month on created_at (app/services/log_partitions.py); the key is part of the primary key
+    __table_args__ = (
+        # Entity timelines (booking detail); also serves entity_type-only filters
+        Index("ix_audit_logs_entity_created", "entity_type", "entity_id", "created_at"),
+        # details_json @> '{...}' filters (GET /ops/audit)
+        Index("ix_audit_logs_details", "details_json", postgresql_using="gin", postgresql_ops={"details_json": "jsonb_path_ops"}),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     actor_user_id: Mapped[str] = mapped_column(String(36), index=True)
     action: Mapped[str] = mapped_column(String(80), index=True)  # e.g. booking.mark_paid
-    entity_type: Mapped[str] = mapped_column(String(40), index=True)  # booking, time_entry, payment, cancellation
+    entity_type: Mapped[str] = mapped_column(String(40))  # booking, time_entry, payment, cancellation
     entity_id: Mapped[str] = mapped_column(String(36), index=True)
-    details_json: Mapped[str] = mapped_column(Text, default="{}")
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    details_json: Mapped[dict] = mapped_column(JSONB, default=dict)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True, default=lambda: datetime.now(timezone.utc))
@@ -34,4 +34,4 @@ class Booking(Base):
 
     referral_code: Mapped[str | None] = mapped_column(String(100), nullable=True, index=True)  # partner referral (e.g. FSB-XXX)
 
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
@@ -1,10 +1,14 @@
-from sqlalchemy import String, DateTime, Text
+from sqlalchemy import String, DateTime, Text, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime, timezone
 from app.db.session import Base
 
 class EmailLog(Base):
     __tablename__ = "email_logs"
+    # Partitioned by month on created_at (app/services/log_partitions.py); the key is part of the primary key
+    __table_args__ = (
+        Index("ix_email_logs_pending", "created_at", postgresql_where=text("status IN ('queued', 'failed')")),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
     to_email: Mapped[str] = mapped_column(String(320), index=True)
@@ -13,5 +17,5 @@ class EmailLog(Base):
     status: Mapped[str] = mapped_column(String(30), default="queued")  # queued, sent, failed
     related_booking_ref: Mapped[str] = mapped_column(String(20), default="")
     attach_ticket_booking_ref: Mapped[str | None] = mapped_column(String(20), nullable=True)  # when set, retry sends ticket PDF
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True, default=lambda: datetime.now(timezone.utc))
     sent_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -1,6 +1,6 @@
-from sqlalchemy import String, Integer, Boolean, DateTime
+from sqlalchemy import String, Integer, Boolean, DateTime, Date
 from sqlalchemy.orm import Mapped, mapped_column
-from datetime import datetime, timezone
+from datetime import datetime, timezone, date
 from app.db.session import Base
 
 class SlotRule(Base):
@@ -19,4 +19,6 @@ class SlotRule(Base):
     cabin: Mapped[str] = mapped_column(String(30), default="Economy")
     active: Mapped[bool] = mapped_column(Boolean, default=True)
     horizon_days: Mapped[int] = mapped_column(Integer, default=90)
+    # High-water mark: slots exist for every matching day up to and including this date (None = never generated)
+    generated_through: Mapped[date | None] = mapped_column(Date, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
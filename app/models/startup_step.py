@@ -0,0 +1,13 @@
+from sqlalchemy import String, Integer, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime, timezone
+from app.db.session import Base
+
+class StartupStep(Base):
+    """Last completed run of a container startup step (app/startup.py) and the inputs it ran with."""
+    __tablename__ = "startup_steps"
+
+    step: Mapped[str] = mapped_column(String(40), primary_key=True)  # schema, seed, legacy_cleanup
+    fingerprint: Mapped[str] = mapped_column(String(64))
+    duration_ms: Mapped[int] = mapped_column(Integer, default=0)
+    completed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
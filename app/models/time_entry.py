@@ -1,21 +1,29 @@
-from sqlalchemy import String, Date, Integer, DateTime, UniqueConstraint, Boolean
+from sqlalchemy import String, Date, Time, Integer, DateTime, UniqueConstraint, Boolean, Index, FetchedValue
 from sqlalchemy.orm import Mapped, mapped_column
-from datetime import datetime, timezone
+from datetime import date, time, datetime, timezone
 from app.db.session import Base
 
 class TimeEntry(Base):
     __tablename__ = "time_entries"
     __table_args__ = (
         UniqueConstraint("route_id","date_str","start", name="uq_time_entry_route_date_start"),
+        Index(
+            "ix_time_entries_route_date_public", "route_id", "flight_date", "visibility", "status",
+            postgresql_include=["seats_available", "departure_time", "price_usd", "base_price_usd", "override_price_usd"],
+        ),
+        Index("ix_time_entries_date_departure", "flight_date", "departure_time"),
     )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True)
-    route_id: Mapped[str] = mapped_column(String(36), index=True)
+    route_id: Mapped[str] = mapped_column(String(36))  # indexed via ix_time_entries_route_date_public
 
     # UI fields (must map to OPS payload)
     date_str: Mapped[str] = mapped_column(String(10), index=True)  # YYYY-MM-DD
     start: Mapped[str] = mapped_column(String(5))  # HH:MM
     end: Mapped[str] = mapped_column(String(5))    # HH:MM
+    # Native copies of date_str/start, maintained by a DB trigger (see migration 20261019_native_dates); read-only here
+    flight_date: Mapped[date | None] = mapped_column(Date, nullable=True, server_default=FetchedValue(), server_onupdate=FetchedValue())
+    departure_time: Mapped[time | None] = mapped_column(Time, nullable=True, server_default=FetchedValue(), server_onupdate=FetchedValue())
     price_usd: Mapped[int] = mapped_column(Integer)
     price_tzs: Mapped[int] = mapped_column(Integer, nullable=True)
     seats_available: Mapped[int] = mapped_column(Integer)
@@ -23,6 +31,7 @@ class TimeEntry(Base):
     cabin: Mapped[str] = mapped_column(String(30), default="Economy")
     aircraft_type: Mapped[str | None] = mapped_column(String(80), nullable=True)
     departure_location: Mapped[str | None] = mapped_column(String(120), nullable=True)
+    slot_rule_id: Mapped[str | None] = mapped_column(String(36), nullable=True, index=True)  # set when generated from a SlotRule
 
     # Booking-aligned controls
     visibility: Mapped[str] = mapped_column(String(12), default="PUBLIC")  # PUBLIC|HIDDEN
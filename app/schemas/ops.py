@@ -86,6 +86,38 @@ class CancellationOut(BaseModel):
     createdAt: str
     decidedAt: Optional[str] = None
 
+class FlightMoveIn(BaseModel):
+    """Move the active bookings of a flight (or only booking_refs) to another time entry."""
+    target_time_entry_id: str
+    booking_refs: List[str] = Field(default_factory=list, description="Empty = every active booking on the flight")
+    reason: str = ""
+    notify: bool = True
+
+class FlightCancelIn(BaseModel):
+    """Cancel the active bookings of a flight. refund: none | full (paid bookings get their total refunded)."""
+    booking_refs: List[str] = Field(default_factory=list, description="Empty = every active booking on the flight")
+    reason: str = ""
+    refund: str = Field(default="none", pattern="^(none|full)$")
+    close_slot: bool = True
+    notify: bool = True
+
+class FlightRetimeIn(BaseModel):
+    """Change the departure of a flight; its bookings stay on it and get new tickets."""
+    start: str = Field(pattern=r"^([01]\d|2[0-3]):[0-5]\d$", description="HH:MM")
+    end: str = Field(pattern=r"^([01]\d|2[0-3]):[0-5]\d$", description="HH:MM")
+    date_str: Optional[str] = Field(default=None, pattern=r"^\d{4}-\d{2}-\d{2}$", description="YYYY-MM-DD; default = unchanged")
+    reason: str = ""
+    notify: bool = True
+
+class FlightBulkResult(BaseModel):
+    ok: bool = True
+    timeEntryId: str
+    bookingRefs: List[str] = Field(default_factory=list)
+    pax: int = 0
+    targetTimeEntryId: Optional[str] = None
+    emailsQueued: int = 0
+    ticketsQueued: int = 0
+
 class DashboardSeriesPoint(BaseModel):
     date: str
     value: int
@@ -99,6 +131,8 @@ class WeeklyPlanLeg(BaseModel):
     end: str = Field(description="HH:MM arrival")
     duration_minutes: int = Field(ge=1, le=300, description="Flight duration")
 
+MAX_PLAN_WEEKS = 26  # cap on weeks per weekly-plan import (API and scheduled job)
+
 class WeeklyPlanImportRequest(BaseModel):
     """Import a weekly operations plan: create routes (if needed) and time entries for the given week."""
     week_start_date: str = Field(description="Monday of the week YYYY-MM-DD")
@@ -107,6 +141,7 @@ class WeeklyPlanImportRequest(BaseModel):
     default_price_usd: int = 298
     default_capacity: int = 3
     flight_no_prefix: str = "FSB"
+    weeks: int = Field(default=1, ge=1, le=MAX_PLAN_WEEKS, description="Number of consecutive weeks to plan from week_start_date")
 
 class WeeklyPlanImportResponse(BaseModel):
     routes_created: int = 0
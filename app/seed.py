@@ -99,9 +99,19 @@ def run(db=None):
         # slot rules = 5H-FSA weekly plan from weekly_plan_service (0=Mon..6=Sun, stored as-is)
         from app.services.weekly_plan_service import DEFAULT_PLAN_5H_FSA_LEGS, _resolve_label, get_or_create_route
         tzs_rate = 2450
-        # Remove ALL slot rules so only 5H-FSA schedule remains (no legacy 30-min “all days” or other routes)
-        db.query(SlotRule).delete(synchronize_session=False)
+        # Only the 5H-FSA schedule remains (no legacy 30-min "all days" or other routes). Rules are matched by
+        # (route, day, start) and updated in place, so their ids, generated_through and the slot_rule_id of
+        # slots generated from them stay valid across restarts; rules not in the plan are removed.
         # Slots (time entries) are created only by Ops via Fill slots (daily). We do not delete them in seed so Ops-created slots persist across restarts.
+        from app.services.slot_materializer import apply_rule_edit, schedule_snapshot
+        existing_rules = {}
+        stale_rules = []
+        for rule in db.query(SlotRule).order_by(SlotRule.created_at, SlotRule.id).all():
+            key = (rule.route_id, rule.days_of_week, rule.times)
+            if key in existing_rules:
+                stale_rules.append(rule)
+            else:
+                existing_rules[key] = rule
         for leg in DEFAULT_PLAN_5H_FSA_LEGS:
             from_label = _resolve_label(leg["from_code"])
             to_label = _resolve_label(leg["to_code"])
@@ -111,22 +121,29 @@ def run(db=None):
             if not route:
                 continue
             db.flush()
-            db.add(
-                SlotRule(
-                    id=str(uuid.uuid4()),
-                    route_id=route.id,
-                    days_of_week=str(leg["day_of_week"]),
-                    times=leg["start"],
-                    duration_minutes=leg["duration_minutes"],
-                    price_usd=298,
-                    price_tzs=298 * tzs_rate,
-                    capacity=3,
-                    flight_no_prefix="FSB",
-                    cabin="Economy",
-                    active=True,
-                    horizon_days=120,
-                )
+            values = dict(
+                route_id=route.id,
+                days_of_week=str(leg["day_of_week"]),
+                times=leg["start"],
+                duration_minutes=leg["duration_minutes"],
+                price_usd=298,
+                price_tzs=298 * tzs_rate,
+                capacity=3,
+                flight_no_prefix="FSB",
+                cabin="Economy",
+                active=True,
+                horizon_days=120,
             )
+            rule = existing_rules.pop((route.id, values["days_of_week"], values["times"]), None)
+            if rule is None:
+                db.add(SlotRule(id=str(uuid.uuid4()), **values))
+                continue
+            previous = schedule_snapshot(rule)
+            for k, v in values.items():
+                setattr(rule, k, v)
+            apply_rule_edit(db, rule, previous)
+        for rule in [*existing_rules.values(), *stale_rules]:
+            db.delete(rule)
         # Classify all routes into Dar es Salaam vs Zanzibar (main_region) from origin
         for r in db.query(Route).all():
             r.main_region = get_main_region_for_label(r.from_label)
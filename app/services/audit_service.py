@@ -1,14 +1,243 @@
-import uuid, json
+"""
+Audit log writer.
+
+log_audit() records an action inside the caller's transaction (sync, the default), so the audit
+row commits or rolls back with the change. High-volume, low-value actions can opt in with
+sync=False to a per-process buffer that a background thread writes in multi-row INSERTs on its
+own connection; AUDIT_SINK=sync sends those through the transaction as well.
+
+Buffered records follow the caller's session: if it has uncommitted writes, the record is queued
+when that transaction commits and dropped if it rolls back, so the log never shows a change that
+did not happen. Records logged after the commit are queued straight away. A buffered record the
+database rejects is logged and dropped, so never buffer an action that must be on record.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
 from datetime import datetime, timezone
+
+from sqlalchemy import event, insert
+from sqlalchemy.exc import DBAPIError, DisconnectionError, OperationalError, TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import Session
+
+from app.core.config import settings
 from app.models.audit_log import AuditLog
 
-def log_audit(db: Session, actor_user_id: str, action: str, entity_type: str, entity_id: str, details: dict | None = None):
-    db.add(AuditLog(
-        id=str(uuid.uuid4()),
-        actor_user_id=actor_user_id,
-        action=action,
-        entity_type=entity_type,
-        entity_id=entity_id,
-        details_json=json.dumps(details or {}, ensure_ascii=False),
-    ))
+logger = logging.getLogger(__name__)
+
+_PENDING = "audit_pending"  # Session.info key: records waiting for the session's commit
+_WROTE = "audit_tx_wrote"  # Session.info key: the current transaction has flushed changes
+
+
+def _record(actor_user_id: str, action: str, entity_type: str, entity_id: str, details: dict | None) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "actor_user_id": actor_user_id,
+        "action": action,
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "details_json": details or {},
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+def _is_connection_error(e: Exception) -> bool:
+    """Errors worth retrying the same rows for later (database unreachable), as opposed to a bad record."""
+    if isinstance(e, (OperationalError, DisconnectionError, PoolTimeoutError)):
+        return True
+    return isinstance(e, DBAPIError) and e.connection_invalidated
+
+
+class AuditBuffer:
+    """Process-wide queue of audit rows flushed by a daemon thread (by size or interval)."""
+
+    def __init__(self, batch_size: int, interval: float, max_size: int):
+        self.batch_size = max(1, batch_size)
+        self.interval = max(0.05, interval)
+        self.max_size = max(self.batch_size, max_size)
+        self._rows: deque[dict] = deque()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._pid = None
+        self.dropped = 0
+
+    def add(self, rows: list[dict]) -> None:
+        with self._cond:
+            self._rows.extend(rows)
+            overflow = len(self._rows) - self.max_size
+            for _ in range(max(0, overflow)):
+                self._rows.popleft()
+            if overflow > 0:
+                self.dropped += overflow
+                logger.error("audit buffer full: dropped %s oldest record(s)", overflow)
+            if len(self._rows) >= self.batch_size:
+                self._cond.notify()
+        self._ensure_thread()
+
+    def _ensure_thread(self) -> None:
+        # Started lazily and again after a fork (Celery prefork, gunicorn) since threads do not survive it
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._cond:
+            if self._pid != os.getpid() or self._thread is None or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if len(self._rows) < self.batch_size:
+                    self._cond.wait(self.interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("audit flush failed; will retry")
+                time.sleep(self.interval)
+
+    def flush(self) -> int:
+        """
+        Write everything queued so far. On a connection error the batch is put back (in order) and
+        the error raised, so the writer retries later. Any other failure (a bad record, e.g. a value
+        too long for its column) retries the batch row by row and drops, with a log, the rows that
+        still fail, so one record cannot block the queue.
+        """
+        from app.db.session import engine
+
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._cond:
+                    batch = [self._rows.popleft() for _ in range(min(len(self._rows), 1000))]
+                if not batch:
+                    return written
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(insert(AuditLog), batch)
+                except Exception as e:
+                    if _is_connection_error(e):
+                        self._put_back(batch)
+                        raise
+                    logger.warning("audit batch of %s failed (%s); retrying row by row", len(batch), e)
+                    written += self._insert_one_by_one(engine, batch)
+                    continue
+                written += len(batch)
+
+    def _insert_one_by_one(self, engine, batch: list[dict]) -> int:
+        written = 0
+        for i, row in enumerate(batch):
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(AuditLog), [row])
+            except Exception as e:
+                if _is_connection_error(e):
+                    self._put_back(batch[i:])
+                    raise
+                self.dropped += 1
+                logger.error(
+                    "audit record dropped (%s %s %r): %s", row.get("action"), row.get("entity_type"), row.get("entity_id"), e,
+                )
+                continue
+            written += 1
+        return written
+
+    def _put_back(self, rows: list[dict]) -> None:
+        with self._cond:
+            self._rows.extendleft(reversed(rows))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+_buffer = AuditBuffer(
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    interval=settings.AUDIT_FLUSH_INTERVAL_MS / 1000,
+    max_size=settings.AUDIT_BUFFER_MAX,
+)
+
+
+def flush_audit_buffer() -> int:
+    """Write queued audit records now (shutdown, tests, scripts). Returns the number written."""
+    return _buffer.flush()
+
+
+@atexit.register
+def _flush_at_exit() -> None:
+    try:
+        flush_audit_buffer()
+    except Exception:
+        logger.exception("audit flush at exit failed; %s record(s) lost", len(_buffer))
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_wrote(session, flush_context) -> None:
+    session.info[_WROTE] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _queue_pending(session) -> None:
+    session.info.pop(_WROTE, None)
+    rows = session.info.pop(_PENDING, None)
+    if rows:
+        _buffer.add(rows)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session) -> None:
+    session.info.pop(_WROTE, None)
+    session.info.pop(_PENDING, None)
+
+
+def log_audit(db: Session, actor_user_id: str, action: str, entity_type: str, entity_id: str, details: dict | None = None, *, sync: bool = True):
+    record = _record(actor_user_id, action, entity_type, entity_id, details)
+    if sync or settings.AUDIT_SINK == "sync":
+        db.add(AuditLog(**record))
+        return
+    if db.new or db.dirty or db.deleted or db.info.get(_WROTE):
+        db.info.setdefault(_PENDING, []).append(record)
+    else:
+        _buffer.add([record])
+
+
+def log_audit_many(db: Session, actor_user_id: str, action: str, entity_type: str, entries: list[tuple[str, dict | None]], *, sync: bool = True):
+    """log_audit() for many entities at once: entries are (entity_id, details); sync rows go in as one multi-row INSERT."""
+    records = [_record(actor_user_id, action, entity_type, entity_id, details) for entity_id, details in entries]
+    if not records:
+        return
+    if sync or settings.AUDIT_SINK == "sync":
+        db.execute(insert(AuditLog), records)
+        return
+    if db.new or db.dirty or db.deleted or db.info.get(_WROTE):
+        db.info.setdefault(_PENDING, []).extend(records)
+    else:
+        _buffer.add(records)
+
+
+def search_audit(
+    db: Session,
+    entity_type: str | None = None,
+    entity_id: str | None = None,
+    action: str | None = None,
+    actor: str | None = None,
+    details: dict | None = None,
+    limit: int = 100,
+    offset: int = 0,
+) -> list[AuditLog]:
+    """Newest first. `details` matches by JSONB containment (details_json @> details, GIN-indexed)."""
+    q = db.query(AuditLog)
+    if entity_type:
+        q = q.filter(AuditLog.entity_type == entity_type)
+    if entity_id:
+        q = q.filter(AuditLog.entity_id == entity_id)
+    if action:
+        q = q.filter(AuditLog.action == action)
+    if actor:
+        q = q.filter(AuditLog.actor_user_id == actor)
+    if details:
+        q = q.filter(AuditLog.details_json.contains(details))
+    return q.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(min(max(limit, 1), 500)).offset(max(offset, 0)).all()
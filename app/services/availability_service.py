@@ -0,0 +1,67 @@
+"""
+Public availability queries over time entries.
+
+Filters use the native flight_date / departure_time columns so they match the composite index
+ix_time_entries_route_date_public (route_id, flight_date, visibility, status) INCLUDE (seats, prices).
+The builders are shared by the public endpoints and scripts/explain_hot_queries.py, so the
+EXPLAIN regression checks exercise exactly the SQL the API runs.
+"""
+from datetime import date, datetime
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.time_entry import TimeEntry
+
+# override > base > price, where 0 means "not set" (same rule as the per-slot price in the API)
+effective_price_usd = func.coalesce(
+    func.nullif(TimeEntry.override_price_usd, 0),
+    func.nullif(TimeEntry.base_price_usd, 0),
+    TimeEntry.price_usd,
+)
+
+
+def parse_date(date_str: str) -> date | None:
+    """YYYY-MM-DD -> date, or None when malformed."""
+    try:
+        return datetime.strptime((date_str or "").strip(), "%Y-%m-%d").date()
+    except ValueError:
+        return None
+
+
+def _public_filters(route_ids, min_seats: int) -> list:
+    return [
+        TimeEntry.route_id.in_(route_ids),
+        TimeEntry.visibility == "PUBLIC",
+        TimeEntry.status == "PUBLISHED",
+        TimeEntry.seats_available >= min_seats,
+    ]
+
+
+def public_slots_query(db: Session, route_ids, day: date, min_seats: int = 1):
+    """Bookable slots on one day for the given routes, ordered by departure."""
+    return (
+        db.query(TimeEntry)
+        .filter(TimeEntry.flight_date == day, *_public_filters(route_ids, min_seats))
+        .order_by(TimeEntry.departure_time.asc(), TimeEntry.start.asc())
+    )
+
+
+def calendar_min_price_query(db: Session, route_ids, start: date, end: date, min_seats: int = 1):
+    """(flight_date, min effective USD price) per day in [start, end] with at least one bookable slot."""
+    return (
+        db.query(TimeEntry.flight_date, func.min(effective_price_usd))
+        .filter(TimeEntry.flight_date.between(start, end), *_public_filters(route_ids, min_seats))
+        .group_by(TimeEntry.flight_date)
+        .order_by(TimeEntry.flight_date.asc())
+    )
+
+
+def slot_dates_query(db: Session, route_ids):
+    """Distinct days with at least one bookable slot for the given routes."""
+    return (
+        db.query(TimeEntry.flight_date)
+        .filter(TimeEntry.flight_date.isnot(None), *_public_filters(route_ids, 1))
+        .distinct()
+        .order_by(TimeEntry.flight_date.asc())
+    )
@@ -0,0 +1,120 @@
+"""
+Booking detail for the ops console in two queries.
+
+The first loads the booking with its time entry, route and booker (outer joins), with passengers
+and payments aggregated into JSON arrays by correlated subqueries and the audit entry count. The
+second reads the most recent page of the audit timeline via ix_audit_logs_entity_created.
+"""
+from sqlalchemy import func, literal_column, select
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.orm import Session
+
+from app.models.audit_log import AuditLog
+from app.models.booking import Booking
+from app.models.passenger import Passenger
+from app.models.payment import Payment
+from app.models.route import Route
+from app.models.time_entry import TimeEntry
+from app.models.user import User
+
+AUDIT_PAGE_DEFAULT = 50
+AUDIT_PAGE_MAX = 500
+
+_EMPTY_JSON_ARRAY = literal_column("'[]'::json")
+
+
+def _json_array(columns: dict, order_by, where):
+    obj = func.json_build_object(*[x for key, col in columns.items() for x in (key, col)])
+    return select(func.coalesce(func.json_agg(aggregate_order_by(obj, *order_by)), _EMPTY_JSON_ARRAY)).where(where).scalar_subquery()
+
+
+def _audit_filter(booking_ref: str):
+    return (AuditLog.entity_type == "booking", AuditLog.entity_id == booking_ref)
+
+
+def audit_page(db: Session, booking_ref: str, limit: int = AUDIT_PAGE_DEFAULT, offset: int = 0) -> list[dict]:
+    """Audit entries of a booking, newest first, skipping `offset`; returned oldest first."""
+    limit = min(max(limit, 1), AUDIT_PAGE_MAX)
+    rows = (
+        db.query(AuditLog.created_at, AuditLog.action, AuditLog.actor_user_id, AuditLog.details_json)
+        .filter(*_audit_filter(booking_ref))
+        .order_by(AuditLog.created_at.desc(), AuditLog.id.desc())
+        .limit(limit)
+        .offset(max(offset, 0))
+        .all()
+    )
+    return [{
+        "at": a.created_at.isoformat(),
+        "action": a.action,
+        "actor": a.actor_user_id,
+        "details": a.details_json,
+    } for a in reversed(rows)]
+
+
+def load_booking_detail(db: Session, booking_ref: str, audit_limit: int = AUDIT_PAGE_DEFAULT) -> dict | None:
+    passengers = _json_array(
+        {
+            "first": Passenger.first, "last": Passenger.last, "phone": Passenger.phone, "gender": Passenger.gender,
+            "dob": Passenger.dob, "nationality": Passenger.nationality, "idType": Passenger.id_type,
+            "idNumber": Passenger.id_number,
+        },
+        (Passenger.created_at.asc(), Passenger.id.asc()),
+        Passenger.booking_id == Booking.id,
+    )
+    payments = _json_array(
+        {
+            "provider": Payment.provider, "status": Payment.status, "amountUSD": Payment.amount_usd,
+            "currency": Payment.currency, "providerRef": Payment.provider_ref, "createdAt": Payment.created_at,
+        },
+        (Payment.created_at.desc(),),
+        Payment.booking_id == Booking.id,
+    )
+    audit_total = (
+        select(func.count(AuditLog.id))
+        .where(AuditLog.entity_type == "booking", AuditLog.entity_id == Booking.booking_ref)
+        .scalar_subquery()
+    )
+    row = (
+        db.query(
+            Booking, TimeEntry, Route.from_label, Route.to_label, User.email, User.full_name,
+            passengers.label("passengers"), payments.label("payments"), audit_total.label("audit_total"),
+        )
+        .outerjoin(TimeEntry, TimeEntry.id == Booking.time_entry_id)
+        .outerjoin(Route, Route.id == TimeEntry.route_id)
+        .outerjoin(User, User.id == Booking.user_id)
+        .filter(Booking.booking_ref == booking_ref)
+        .first()
+    )
+    if row is None:
+        return None
+    b, te = row.Booking, row.TimeEntry
+    audit = audit_page(db, b.booking_ref, audit_limit) if row.audit_total else []
+    return {
+        "bookingRef": b.booking_ref,
+        "status": b.status,
+        "paymentStatus": b.payment_status,
+        "pax": b.pax,
+        "holdExpiresAt": b.hold_expires_at.isoformat() if b.hold_expires_at else None,
+        "createdAt": b.created_at.isoformat(),
+        "from": row.from_label,
+        "to": row.to_label,
+        "dateStr": te.date_str if te else None,
+        "contactEmail": row.email,
+        "contactName": row.full_name,
+        "referralCode": getattr(b, "referral_code", None),
+        "timeEntry": {
+            "id": te.id if te else b.time_entry_id,
+            "routeId": te.route_id if te else None,
+            "dateStr": te.date_str if te else None,
+            "start": te.start if te else None,
+            "end": te.end if te else None,
+            "priceUSD": te.price_usd if te else None,
+            "seatsAvailable": te.seats_available if te else None,
+            "flightNo": te.flight_no if te else None,
+            "cabin": te.cabin if te else None,
+        },
+        "passengers": row.passengers,
+        "payments": row.payments,
+        "audit": audit,
+        "auditTotal": int(row.audit_total or 0),
+    }
@@ -1,9 +1,8 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import smtplib
 from email.message import EmailMessage
 from sqlalchemy.orm import Session
 import uuid
-import requests
 
 from app.core.config import settings
 from app.models.email_log import EmailLog
@@ -24,33 +23,28 @@ def queue_email(
     attach_ticket_booking_ref: when set, retries will re-load and attach the ticket PDF for this booking.
     """
     eid = str(uuid.uuid4())
-    db.add(
-        EmailLog(
-            id=eid,
-            to_email=to_email,
-            subject=subject,
-            body=body,
-            status="queued",
-            related_booking_ref=related_booking_ref,
-            attach_ticket_booking_ref=attach_ticket_booking_ref or None,
-        )
+    log = EmailLog(
+        id=eid,
+        to_email=to_email,
+        subject=subject,
+        body=body,
+        status="queued",
+        related_booking_ref=related_booking_ref,
+        attach_ticket_booking_ref=attach_ticket_booking_ref or None,
     )
+    db.add(log)
     db.commit()
 
     sent = False
     try:
         send_email(to_email, subject, body, attachments=attachments or [])
-        log = db.get(EmailLog, eid)
-        if log:
-            log.status = "sent"
-            log.sent_at = datetime.now(timezone.utc)
-            db.commit()
-            sent = True
+        log.status = "sent"
+        log.sent_at = datetime.now(timezone.utc)
+        db.commit()
+        sent = True
     except Exception:
-        log = db.get(EmailLog, eid)
-        if log:
-            log.status = "failed"
-            db.commit()
+        log.status = "failed"
+        db.commit()
         # Worker will retry via process_email_queue
 
     return eid, sent
@@ -80,6 +74,8 @@ def send_email(to_email: str, subject: str, body: str, attachments: list[tuple[s
 
 
 def _send_via_sendgrid(to_email: str, subject: str, body: str, attachments: list[tuple[str, bytes, str]]):
+    import requests
+
     from_email = settings.SENDGRID_FROM_EMAIL or settings.SMTP_FROM
     payload = {
         "personalizations": [{"to": [{"email": to_email}]}],
@@ -112,20 +108,65 @@ def _send_via_sendgrid(to_email: str, subject: str, body: str, attachments: list
 
 
 def process_pending_emails(db: Session, limit: int = 50) -> dict:
-    """Process up to `limit` queued or failed emails; retry send and update status. Returns counts.
+    """Process up to `limit` queued or failed emails from the last EMAIL_RETRY_WINDOW_DAYS; retry send and update status. Returns counts.
     When attach_ticket_booking_ref is set, loads ticket PDF and attaches it on retry."""
-    from app.models.booking import Booking
-    from app.services.ticket_service import load_ticket_pdf_bytes
-
+    # Only the recent partitions are scanned (ix_email_logs_pending); older messages are not retried
+    since = datetime.now(timezone.utc) - timedelta(days=max(settings.EMAIL_RETRY_WINDOW_DAYS, 1))
     pending = (
         db.query(EmailLog)
-        .filter(EmailLog.status.in_(["queued", "failed"]), EmailLog.body.isnot(None), EmailLog.body != "")
+        .filter(
+            EmailLog.created_at >= since,
+            EmailLog.status.in_(["queued", "failed"]),
+            EmailLog.body.isnot(None),
+            EmailLog.body != "",
+        )
         .order_by(EmailLog.created_at.asc())
         .limit(limit)
         .all()
     )
+    return _deliver(db, pending)
+
+
+def queue_email_batch(db: Session, messages: list[dict]) -> list[str]:
+    """Add queued EmailLog rows to the caller's transaction without sending (see deliver_queued_emails).
+
+    messages: dicts with to_email, subject, body and optionally related_booking_ref, attach_ticket_booking_ref.
+    """
+    logs = [
+        EmailLog(
+            id=str(uuid.uuid4()),
+            to_email=m["to_email"],
+            subject=m["subject"],
+            body=m["body"],
+            status="queued",
+            related_booking_ref=m.get("related_booking_ref") or "",
+            attach_ticket_booking_ref=m.get("attach_ticket_booking_ref") or None,
+        )
+        for m in messages
+    ]
+    db.add_all(logs)
+    return [log.id for log in logs]
+
+
+def deliver_queued_emails(db: Session, email_ids: list[str]) -> dict:
+    """Send the given queued emails now (e.g. right after a batch was committed); failures are left for the worker."""
+    if not email_ids:
+        return {"processed": 0, "sent": 0, "failed": 0}
+    logs = (
+        db.query(EmailLog)
+        .filter(EmailLog.id.in_(email_ids), EmailLog.status == "queued")
+        .order_by(EmailLog.created_at.asc())
+        .all()
+    )
+    return _deliver(db, logs)
+
+
+def _deliver(db: Session, logs: list[EmailLog]) -> dict:
+    from app.models.booking import Booking
+    from app.services.ticket_service import load_ticket_pdf_bytes
+
     sent, failed = 0, 0
-    for log in pending:
+    for log in logs:
         attachments: list[tuple[str, bytes, str]] = []
         if getattr(log, "attach_ticket_booking_ref", None):
             ref = (log.attach_ticket_booking_ref or "").strip()
@@ -147,9 +188,9 @@ def process_pending_emails(db: Session, limit: int = 50) -> dict:
         except Exception:
             log.status = "failed"
             failed += 1
-    if pending:
+    if logs:
         db.commit()
-    return {"processed": len(pending), "sent": sent, "failed": failed}
+    return {"processed": len(logs), "sent": sent, "failed": failed}
 
 
 def send_booking_confirmation_and_ticket(db: Session, booking_ref: str) -> bool:
@@ -0,0 +1,287 @@
+"""
+Flight-level bulk operations for disruptions: move, cancel or re-time every booking on a time entry.
+
+Each operation is one transaction. The bookings are locked first, then the time entries, each
+sorted by id (the lock order of inventory_service). Seats are then moved or released once by the total pax, using the conditional, id-ordered updates of
+inventory_service.adjust_seats (the same primitive the single-booking routes and hold expiry
+use), and the bookings are updated with one UPDATE statement. Audit rows and notification emails
+are added to the same transaction as batches.
+
+Ticket regeneration and email delivery happen after the commit, through
+deliver_flight_updates(). dispatch_flight_updates() puts it on the Celery "tickets" queue, or
+runs it in-process if the broker is unreachable. Emails it cannot send stay queued for the
+process_email_queue worker.
+"""
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking
+from app.models.cancellation import Cancellation
+from app.models.route import Route
+from app.models.time_entry import TimeEntry
+from app.models.user import User
+from app.services.audit_service import log_audit, log_audit_many
+from app.services.email_service import deliver_queued_emails, queue_email_batch
+from app.services.inventory_service import release_seats, transfer_seats
+
+logger = logging.getLogger(__name__)
+
+# Bookings in these states are no longer on the flight (both spellings of cancelled are in use)
+INACTIVE_BOOKING_STATUSES = ("CANCELLED", "CANCELED", "EXPIRED", "REFUNDED", "COMPLETED")
+
+
+@dataclass
+class FlightOpResult:
+    time_entry_id: str
+    booking_refs: list[str] = field(default_factory=list)
+    pax: int = 0
+    target_time_entry_id: str | None = None
+    email_ids: list[str] = field(default_factory=list)
+    reticket_booking_ids: list[str] = field(default_factory=list)
+
+
+def _lock_time_entries(db: Session, ids: list[str]) -> dict[str, TimeEntry]:
+    """Lock the given time entries in id order (after the bookings); raises LookupError if one is missing."""
+    wanted = sorted(set(ids))
+    rows = (
+        db.query(TimeEntry)
+        .filter(TimeEntry.id.in_(wanted))
+        .order_by(TimeEntry.id)
+        .with_for_update()
+        .populate_existing()
+        .all()
+    )
+    found = {te.id: te for te in rows}
+    missing = [i for i in wanted if i not in found]
+    if missing:
+        raise LookupError(f"time entry not found: {', '.join(missing)}")
+    return found
+
+
+def _lock_flight_bookings(db: Session, time_entry_id: str, booking_refs: list[str]) -> list[tuple[Booking, str]]:
+    """Active bookings on the flight (optionally only booking_refs), locked in id order, with the booker's email."""
+    q = (
+        db.query(Booking, User.email)
+        .outerjoin(User, User.id == Booking.user_id)
+        .filter(Booking.time_entry_id == time_entry_id, ~Booking.status.in_(INACTIVE_BOOKING_STATUSES))
+    )
+    if booking_refs:
+        q = q.filter(Booking.booking_ref.in_(booking_refs))
+    rows = q.order_by(Booking.id).with_for_update(of=Booking).all()
+    if booking_refs:
+        missing = sorted(set(booking_refs) - {b.booking_ref for b, _ in rows})
+        if missing:
+            raise LookupError(f"not active bookings on this flight: {', '.join(missing)}")
+    return rows
+
+
+def _flight_label(db: Session, te: TimeEntry) -> str:
+    route = db.get(Route, te.route_id) if te.route_id else None
+    where = f" {route.from_label} → {route.to_label}" if route else ""
+    return f"{te.date_str} {te.start}–{te.end}{where}"
+
+
+def _reason_line(reason: str) -> str:
+    return f"\nReason: {reason}" if reason else ""
+
+
+def move_flight_bookings(
+    db: Session, actor_user_id: str, time_entry_id: str, target_time_entry_id: str,
+    booking_refs: list[str] | None = None, reason: str = "", notify: bool = True,
+) -> FlightOpResult:
+    if target_time_entry_id == time_entry_id:
+        raise ValueError("target is the same flight")
+    rows = _lock_flight_bookings(db, time_entry_id, booking_refs or [])
+    entries = _lock_time_entries(db, [time_entry_id, target_time_entry_id])
+    source, target = entries[time_entry_id], entries[target_time_entry_id]
+    result = FlightOpResult(time_entry_id=time_entry_id, target_time_entry_id=target_time_entry_id)
+    if not rows:
+        return result
+
+    total = sum(int(b.pax or 1) for b, _ in rows)
+    transfer_seats(db, source.id, target.id, total)  # NotEnoughSeats (a ValueError) if the target is short
+
+    ids = [b.id for b, _ in rows]
+    paid_ids = [b.id for b, _ in rows if b.payment_status == "paid"]
+    db.execute(update(Booking).where(Booking.id.in_(ids)).values(time_entry_id=target.id), execution_options={"synchronize_session": False})
+    if paid_ids:
+        # Tickets show the flight time: regenerated after commit
+        db.execute(
+            update(Booking).where(Booking.id.in_(paid_ids)).values(ticket_status="none", ticket_object_key=None),
+            execution_options={"synchronize_session": False},
+        )
+
+    result.booking_refs = [b.booking_ref for b, _ in rows]
+    result.pax = total
+    result.reticket_booking_ids = paid_ids
+    log_audit_many(db, actor_user_id, "booking.move", "booking", [
+        (b.booking_ref, {"from": source.id, "target": target.id, "reason": reason, "bulk": True}) for b, _ in rows
+    ], sync=True)
+    log_audit(db, actor_user_id, "time_entry.bulk_move", "time_entry", source.id,
+              {"target": target.id, "bookings": len(rows), "pax": total, "reason": reason})
+    if notify:
+        label = _flight_label(db, target)
+        result.email_ids = queue_email_batch(db, [{
+            "to_email": email,
+            "subject": f"FlySunbird: your flight has changed • {b.booking_ref}",
+            "body": (
+                f"Your booking {b.booking_ref} has been moved to another flight: {label}."
+                f"{_reason_line(reason)}\n\n"
+                + ("Your updated ticket is attached." if b.payment_status == "paid" else "Please contact us if this time does not suit you.")
+            ),
+            "related_booking_ref": b.booking_ref,
+            "attach_ticket_booking_ref": b.booking_ref if b.payment_status == "paid" else None,
+        } for b, email in rows if email])
+    return result
+
+
+def cancel_flight_bookings(
+    db: Session, actor_user_id: str, time_entry_id: str, booking_refs: list[str] | None = None,
+    reason: str = "", refund: str = "none", close_slot: bool = True, notify: bool = True,
+) -> FlightOpResult:
+    rows = _lock_flight_bookings(db, time_entry_id, booking_refs or [])
+    te = _lock_time_entries(db, [time_entry_id])[time_entry_id]
+    result = FlightOpResult(time_entry_id=time_entry_id)
+    if close_slot:
+        te.status = "CLOSED"
+    if not rows:
+        return result
+
+    total = sum(int(b.pax or 1) for b, _ in rows)
+    release_seats(db, {te.id: total})
+    now = datetime.now(timezone.utc)
+    refunds = {b.id: (int(b.total_usd or 0) if refund == "full" and b.payment_status == "paid" else 0) for b, _ in rows}
+
+    ids = [b.id for b, _ in rows]
+    refunded_ids = [i for i, amt in refunds.items() if amt > 0]
+    db.execute(update(Booking).where(Booking.id.in_(ids)).values(status="CANCELLED"), execution_options={"synchronize_session": False})
+    if refunded_ids:
+        db.execute(
+            update(Booking).where(Booking.id.in_(refunded_ids)).values(payment_status="refunded"),
+            execution_options={"synchronize_session": False},
+        )
+    db.add_all([
+        Cancellation(
+            id=str(uuid.uuid4()),
+            booking_id=b.id,
+            booking_ref=b.booking_ref,
+            requested_by_user_id=actor_user_id,
+            reason=reason or "ops_flight_cancel",
+            status="approved",
+            refund_amount_usd=refunds[b.id],
+            decided_by_user_id=actor_user_id,
+            decided_at=now,
+        )
+        for b, _ in rows
+    ])
+
+    result.booking_refs = [b.booking_ref for b, _ in rows]
+    result.pax = total
+    log_audit_many(db, actor_user_id, "booking.cancel", "booking", [
+        (b.booking_ref, {"flight": te.id, "refund": refunds[b.id], "reason": reason, "bulk": True}) for b, _ in rows
+    ], sync=True)
+    log_audit(db, actor_user_id, "time_entry.bulk_cancel", "time_entry", te.id,
+              {"bookings": len(rows), "pax": total, "refund": refund, "closed": close_slot, "reason": reason})
+    if notify:
+        label = _flight_label(db, te)
+        result.email_ids = queue_email_batch(db, [{
+            "to_email": email,
+            "subject": f"FlySunbird: booking cancelled • {b.booking_ref}",
+            "body": (
+                f"We are sorry: your flight {label} has been cancelled and booking {b.booking_ref} is cancelled."
+                f"{_reason_line(reason)}\n\n"
+                + (f"A refund of USD {refunds[b.id]} is being processed." if refunds[b.id] else "Please contact us to rebook or arrange a refund.")
+            ),
+            "related_booking_ref": b.booking_ref,
+        } for b, email in rows if email])
+    return result
+
+
+def retime_flight(
+    db: Session, actor_user_id: str, time_entry_id: str, start: str, end: str,
+    date_str: str | None = None, reason: str = "", notify: bool = True,
+) -> FlightOpResult:
+    rows = _lock_flight_bookings(db, time_entry_id, [])
+    te = _lock_time_entries(db, [time_entry_id])[time_entry_id]
+    new_date = date_str or te.date_str
+    clash = (
+        db.query(TimeEntry.id)
+        .filter(TimeEntry.route_id == te.route_id, TimeEntry.date_str == new_date, TimeEntry.start == start, TimeEntry.id != te.id)
+        .first()
+    )
+    if clash:
+        raise ValueError(f"another flight on this route already departs {new_date} {start}")
+    before = {"date_str": te.date_str, "start": te.start, "end": te.end}
+    te.date_str, te.start, te.end = new_date, start, end
+    try:
+        db.flush()
+    except IntegrityError:
+        # Lost a race with another re-time or a new slot at the same time (uq_time_entry_route_date_start)
+        raise ValueError(f"another flight on this route already departs {new_date} {start}")
+
+    result = FlightOpResult(time_entry_id=time_entry_id, booking_refs=[b.booking_ref for b, _ in rows],
+                            pax=sum(int(b.pax or 1) for b, _ in rows))
+    paid_ids = [b.id for b, _ in rows if b.payment_status == "paid"]
+    if paid_ids:
+        db.execute(
+            update(Booking).where(Booking.id.in_(paid_ids)).values(ticket_status="none", ticket_object_key=None),
+            execution_options={"synchronize_session": False},
+        )
+    result.reticket_booking_ids = paid_ids
+    log_audit(db, actor_user_id, "time_entry.retime", "time_entry", te.id,
+              {"before": before, "after": {"date_str": new_date, "start": start, "end": end}, "bookings": len(rows), "reason": reason})
+    log_audit_many(db, actor_user_id, "booking.retime", "booking", [
+        (b.booking_ref, {"flight": te.id, "before": before, "start": start, "date_str": new_date, "bulk": True}) for b, _ in rows
+    ], sync=True)
+    if notify and rows:
+        label = _flight_label(db, te)
+        result.email_ids = queue_email_batch(db, [{
+            "to_email": email,
+            "subject": f"FlySunbird: new departure time • {b.booking_ref}",
+            "body": (
+                f"The departure of your flight (booking {b.booking_ref}) has changed. New schedule: {label}."
+                f"{_reason_line(reason)}\n\n"
+                + ("Your updated ticket is attached." if b.payment_status == "paid" else "Please contact us if this time does not suit you.")
+            ),
+            "related_booking_ref": b.booking_ref,
+            "attach_ticket_booking_ref": b.booking_ref if b.payment_status == "paid" else None,
+        } for b, email in rows if email])
+    return result
+
+
+def deliver_flight_updates(booking_ids: list[str], email_ids: list[str]) -> None:
+    """After commit: regenerate the tickets of `booking_ids`, then send `email_ids` (which attach them)."""
+    from app.api.v1.routes.payments import _generate_ticket_for_booking
+    from app.db.session import SessionLocal
+
+    db = SessionLocal()
+    try:
+        for b in db.query(Booking).filter(Booking.id.in_(booking_ids)).order_by(Booking.booking_ref).all() if booking_ids else []:
+            try:
+                _generate_ticket_for_booking(db, b)
+            except Exception:
+                db.rollback()
+                logger.exception("ticket regeneration failed for %s", b.booking_ref)
+        deliver_queued_emails(db, email_ids)
+    finally:
+        db.close()
+
+
+def dispatch_flight_updates(booking_ids: list[str], email_ids: list[str], run_locally) -> None:
+    """Queue deliver_flight_updates on the tickets queue; if the broker is down, hand it to run_locally (e.g. BackgroundTasks.add_task)."""
+    from app.tasks.celery_app import celery
+    from app.tasks.jobs import deliver_flight_updates as deliver_task
+
+    try:
+        with celery.connection_for_write() as conn:
+            conn.ensure_connection(max_retries=0)  # fail fast: the request is waiting
+            deliver_task.apply_async(args=[booking_ids, email_ids], connection=conn, retry=False)
+    except Exception as e:
+        logger.warning("broker unavailable (%s); delivering flight updates in-process", e)
+        run_locally(deliver_flight_updates, booking_ids, email_ids)
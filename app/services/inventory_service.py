@@ -0,0 +1,187 @@
+"""
+Bulk inventory writes for time entries (slots).
+
+Slot fill, weekly-plan import and slot generation all create many time entries at once.
+Instead of one existence query per slot, callers build the rows in memory, prefetch the
+existing (route_id, date_str, start) keys for the whole batch in one query, and insert the
+new rows with INSERT ... ON CONFLICT DO NOTHING against uq_time_entry_route_date_start
+(so a concurrent fill of the same slot is skipped instead of failing the batch).
+Cleanup of unused slots is likewise a batched, set-based DELETE rather than per-row ORM deletes.
+
+Seat counts change through adjust_seats() and the helpers built on it: transfer_seats() for
+moves and release_seats() for cancellation and expiry. Each change is a single conditional
+UPDATE (seats_available - n only where seats_available >= n), so a slot cannot be oversold
+without first reading and locking the row. When a transaction touches several slots, the
+updates go in time-entry id order, so two moves in opposite directions take their row locks in
+the same order and cannot deadlock. The lock order is: bookings first (by id), then time entries
+(by id). Callers that lock bookings do that before changing seats.
+"""
+from collections import Counter
+import uuid
+from typing import Iterable
+
+from sqlalchemy import tuple_, exists, select, delete, func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking
+from app.models.time_entry import TimeEntry
+
+# Rows per INSERT statement / keys per existence query (keeps bind parameters well under Postgres limits)
+BATCH_SIZE = 500
+
+SlotKey = tuple[str, str, str]  # (route_id, date_str, start)
+
+
+def _chunks(items: list, size: int = BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def slot_key(row: dict) -> SlotKey:
+    return (row["route_id"], row["date_str"], row["start"])
+
+
+def existing_slot_keys(db: Session, keys: Iterable[SlotKey]) -> set[SlotKey]:
+    """Return which of the given (route_id, date_str, start) keys already exist (one query per batch)."""
+    keys = list(set(keys))
+    found: set[SlotKey] = set()
+    for chunk in _chunks(keys):
+        rows = (
+            db.query(TimeEntry.route_id, TimeEntry.date_str, TimeEntry.start)
+            .filter(tuple_(TimeEntry.route_id, TimeEntry.date_str, TimeEntry.start).in_(chunk))
+            .all()
+        )
+        found.update((r[0], r[1], r[2]) for r in rows)
+    return found
+
+
+def insert_time_entries(db: Session, rows: list[dict]) -> list[str]:
+    """
+    Insert time entry rows (dicts of TimeEntry columns), skipping any whose key already exists.
+    Existing keys are prefetched in one query; duplicates within `rows` keep the first occurrence.
+    Returns the ids actually inserted. Runs in the caller's transaction (no commit).
+    """
+    if not rows:
+        return []
+    existing = existing_slot_keys(db, (slot_key(r) for r in rows))
+    new_rows = []
+    seen: set[SlotKey] = set()
+    for r in rows:
+        key = slot_key(r)
+        if key in existing or key in seen:
+            continue
+        seen.add(key)
+        new_rows.append({"id": r.get("id") or str(uuid.uuid4()), **{k: v for k, v in r.items() if k != "id"}})
+    if not new_rows:
+        return []
+    # ORM bulk insert: rows sharing the same keys go out as one multi-row INSERT (column defaults applied)
+    stmt = (
+        pg_insert(TimeEntry)
+        .on_conflict_do_nothing(constraint="uq_time_entry_route_date_start")
+        .returning(TimeEntry.id)
+    )
+    inserted: list[str] = []
+    for chunk in _chunks(new_rows):
+        inserted.extend(db.execute(stmt, chunk).scalars().all())
+    return inserted
+
+
+
+def delete_unused_slots(
+    db: Session,
+    *,
+    route_ids=None,
+    date_strs: list[str] | None = None,
+    batch_size: int = 5000,
+    dry_run: bool = False,
+    progress=None,
+) -> int:
+    """
+    Delete time entries that have no bookings, set-based:
+    DELETE ... WHERE id IN (SELECT ... WHERE NOT EXISTS (SELECT 1 FROM bookings ...) LIMIT batch_size).
+
+    Runs in bounded batches, committing after each one so locks and WAL stay small on large inventories.
+    route_ids (list or subquery) / date_strs narrow the scope. dry_run only counts matching slots.
+    progress(deleted_so_far) is called after each batch. Returns the number deleted (or that would be).
+    """
+    conds = [~exists().where(Booking.time_entry_id == TimeEntry.id)]
+    if route_ids is not None:
+        conds.append(TimeEntry.route_id.in_(route_ids))
+    if date_strs:
+        conds.append(TimeEntry.date_str.in_(date_strs))
+    if dry_run:
+        return int(db.query(func.count(TimeEntry.id)).filter(*conds).scalar() or 0)
+
+    batch_size = max(1, int(batch_size))
+    batch_ids = (
+        select(TimeEntry.id)
+        .where(*conds)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    stmt = delete(TimeEntry).where(TimeEntry.id.in_(batch_ids)).execution_options(synchronize_session=False)
+    total = 0
+    while True:
+        deleted = db.execute(stmt).rowcount or 0
+        db.commit()
+        total += deleted
+        if progress:
+            progress(total)
+        if deleted < batch_size:
+            return total
+
+
+class NotEnoughSeats(ValueError):
+    def __init__(self, time_entry_id: str, requested: int):
+        super().__init__(f"not enough seats on time entry {time_entry_id} ({requested} requested)")
+        self.time_entry_id = time_entry_id
+        self.requested = requested
+
+
+def adjust_seats(db: Session, deltas: dict[str, int] | Iterable[tuple[str, int]]) -> dict[str, int]:
+    """
+    Apply seat changes per time entry (positive = release, negative = take) in the caller's
+    transaction. Returns the new seats_available of each changed entry.
+
+    Changes to the same entry are summed, then applied in id order, one conditional UPDATE per
+    entry. A take raises NotEnoughSeats if the entry has fewer seats free, or LookupError if the
+    entry does not exist. The caller must roll back on either error, because earlier updates
+    were already applied. A release to an entry that no longer exists is ignored. Session
+    objects for the entries are updated in place.
+    """
+    total: Counter[str] = Counter()
+    for te_id, n in (deltas.items() if isinstance(deltas, dict) else deltas):
+        if te_id:
+            total[te_id] += int(n)
+    seats: dict[str, int] = {}
+    for te_id in sorted(total):
+        n = total[te_id]
+        if n == 0:
+            continue
+        stmt = update(TimeEntry).where(TimeEntry.id == te_id)
+        if n < 0:
+            stmt = stmt.where(TimeEntry.seats_available >= -n)
+        row = db.execute(
+            stmt.values(seats_available=TimeEntry.seats_available + n).returning(TimeEntry.seats_available)
+        ).first()
+        if row is None:
+            if n > 0:
+                continue
+            if db.query(exists().where(TimeEntry.id == te_id)).scalar():
+                raise NotEnoughSeats(te_id, -n)
+            raise LookupError(f"time entry not found: {te_id}")
+        seats[te_id] = row[0]
+    return seats
+
+
+def transfer_seats(db: Session, from_time_entry_id: str | None, to_time_entry_id: str, n: int) -> dict[str, int]:
+    """Move n seats' worth of bookings between slots: release n on the source, take n on the target."""
+    return adjust_seats(db, [(from_time_entry_id, n), (to_time_entry_id, -n)])
+
+
+def release_seats(db: Session, pax_by_time_entry: dict[str, int] | Iterable[tuple[str, int]]) -> dict[str, int]:
+    """Give seats back (cancellation, expiry); pairs for the same slot are summed into one UPDATE."""
+    pairs = pax_by_time_entry.items() if isinstance(pax_by_time_entry, dict) else pax_by_time_entry
+    return adjust_seats(db, [(te_id, abs(int(n))) for te_id, n in pairs])
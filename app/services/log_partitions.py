@@ -0,0 +1,221 @@
+"""
+Monthly range partitions of audit_logs and email_logs (by created_at), and their retention.
+
+Each table has one partition per month, named <table>_pYYYYMM, plus <table>_default for rows
+outside every monthly range (only used if maintenance falls behind). maintain_log_partitions()
+runs daily from Celery beat:
+
+- creates the partitions for the current month and LOG_PARTITIONS_AHEAD months ahead, moving any
+  rows for those months out of the default partition first;
+- archives partitions that ended more than <retention> months ago: the rows are exported with COPY,
+  the row count is checked and the file is stored on a durable target (LOG_ARCHIVE_BACKEND: a
+  mounted volume at LOG_ARCHIVE_DIR, or the S3-compatible bucket used for tickets). Only then is
+  the partition detached and dropped, in its own transaction. Without a durable target expired
+  partitions are kept. Retention 0 keeps everything.
+
+Restore an archive with:
+    gunzip -c audit_logs_p202401.csv.gz | psql -c "\\copy audit_logs FROM STDIN WITH (FORMAT csv, HEADER)"
+"""
+import csv
+import gzip
+import logging
+import os
+import re
+import shutil
+import tempfile
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLES = ("audit_logs", "email_logs")
+
+_PARTITION_RE = re.compile(r"^(?P<table>[a-z_]+)_p(?P<year>\d{4})(?P<month>\d{2})$")
+
+
+class ArchiveTargetUnavailable(RuntimeError):
+    """No durable place to put archives; expired partitions must not be dropped."""
+
+
+def _retention_months(table: str) -> int:
+    return {
+        "audit_logs": settings.AUDIT_LOG_RETENTION_MONTHS,
+        "email_logs": settings.EMAIL_LOG_RETENTION_MONTHS,
+    }[table]
+
+
+def month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, n: int) -> date:
+    y, m = divmod(d.year * 12 + d.month - 1 + n, 12)
+    return date(y, m + 1, 1)
+
+
+def _utc(d: date) -> str:
+    return datetime(d.year, d.month, d.day, tzinfo=timezone.utc).isoformat()
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month.year:04d}{month.month:02d}"
+
+
+@dataclass
+class Partition:
+    name: str
+    month: date  # first day of the month it holds
+
+
+def list_partitions(conn: Connection, table: str) -> list[Partition]:
+    """Monthly partitions of `table`, oldest first (the default partition is not included)."""
+    rows = conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = :table
+    """), {"table": table}).scalars().all()
+    parts = []
+    for name in rows:
+        m = _PARTITION_RE.match(name)
+        if m and m.group("table") == table:
+            parts.append(Partition(name, date(int(m.group("year")), int(m.group("month")), 1)))
+    return sorted(parts, key=lambda p: p.month)
+
+
+def create_month_partition(conn: Connection, table: str, month: date) -> bool:
+    """Create the partition for `month` if missing; rows already in the default partition for that month are moved into it."""
+    name = partition_name(table, month)
+    exists = conn.execute(text("SELECT to_regclass(:n) IS NOT NULL"), {"n": name}).scalar()
+    if exists:
+        return False
+    lo, hi = _utc(month), _utc(add_months(month, 1))
+    default = f"{table}_default"
+    has_default = conn.execute(text("SELECT to_regclass(:n) IS NOT NULL"), {"n": default}).scalar()
+    if has_default:
+        conn.execute(text(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE"))
+        conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS)"))
+        moved = conn.execute(text(f"""
+            WITH moved AS (
+                DELETE FROM {default} WHERE created_at >= :lo AND created_at < :hi RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+        """), {"lo": lo, "hi": hi}).rowcount
+        conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES FROM ('{lo}') TO ('{hi}')"))
+        if moved:
+            logger.warning("moved %s row(s) from %s into %s", moved, default, name)
+    else:
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{lo}') TO ('{hi}')"))
+    logger.info("created partition %s", name)
+    return True
+
+
+def _store_local(src: str, table: str, name: str) -> str:
+    out_dir = os.path.join(settings.LOG_ARCHIVE_DIR, table)
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"{name}.csv.gz")
+    tmp = path + ".tmp"
+    shutil.copyfile(src, tmp)
+    with open(tmp, "rb") as fh:
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def _store_s3(src: str, table: str, name: str) -> str:
+    from app.services.ticket_storage import get_ticket_storage
+
+    client = get_ticket_storage("s3").client()
+    bucket = settings.LOG_ARCHIVE_S3_BUCKET or settings.S3_BUCKET_NAME
+    key = f"{settings.LOG_ARCHIVE_S3_PREFIX.strip('/')}/{table}/{name}.csv.gz"
+    client.upload_file(src, bucket, key, ExtraArgs={"ContentType": "application/gzip"})
+    stored = client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+    if stored != os.path.getsize(src):
+        raise RuntimeError(f"s3://{bucket}/{key} has {stored} bytes, expected {os.path.getsize(src)}")
+    return f"s3://{bucket}/{key}"
+
+
+def archive_store():
+    """store(path, table, partition) -> location for LOG_ARCHIVE_BACKEND; raises ArchiveTargetUnavailable if not durable."""
+    backend = (settings.LOG_ARCHIVE_BACKEND or "").strip().lower()
+    if backend == "local":
+        archive_dir = settings.LOG_ARCHIVE_DIR or ""
+        # Must be a provisioned (mounted) directory: a path created inside the container is lost on redeploy
+        if not os.path.isabs(archive_dir) or not os.path.isdir(archive_dir):
+            raise ArchiveTargetUnavailable(f"LOG_ARCHIVE_DIR {archive_dir!r} is not an existing absolute directory (mount a volume)")
+        return _store_local
+    if backend == "s3":
+        if not (settings.LOG_ARCHIVE_S3_BUCKET or settings.S3_BUCKET_NAME):
+            raise ArchiveTargetUnavailable("LOG_ARCHIVE_S3_BUCKET / S3_BUCKET_NAME is not set")
+        return _store_s3
+    raise ArchiveTargetUnavailable("LOG_ARCHIVE_BACKEND is not set (local | s3)")
+
+
+def archive_partition(engine: Engine, table: str, part: Partition, store) -> str:
+    """
+    Export a partition, verify the row count, store the file with `store`, then detach and drop the
+    partition; all in one transaction of its own, committed before the next partition is touched.
+    """
+    fd, tmp = tempfile.mkstemp(prefix=f"{part.name}.", suffix=".csv.gz")
+    os.close(fd)
+    try:
+        with engine.begin() as conn:
+            # Block writes to the partition so the export and the drop see the same rows
+            conn.execute(text(f"LOCK TABLE {part.name} IN SHARE MODE"))
+            expected = conn.execute(text(f"SELECT count(*) FROM {part.name}")).scalar()
+            with gzip.open(tmp, "wb") as fh, conn.connection.cursor() as cur:
+                cur.copy_expert(f"COPY (SELECT * FROM {part.name} ORDER BY created_at) TO STDOUT WITH (FORMAT csv, HEADER)", fh)
+            with gzip.open(tmp, "rt", encoding="utf-8", newline="") as fh:
+                written = sum(1 for _ in csv.reader(fh)) - 1
+            if written != expected:
+                raise RuntimeError(f"archive of {part.name} has {written} rows, expected {expected}; partition kept")
+            location = store(tmp, table, part.name)
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {part.name}"))
+            conn.execute(text(f"DROP TABLE {part.name}"))
+    finally:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+    logger.info("archived %s (%s rows) to %s", part.name, expected, location)
+    return location
+
+
+def maintain_log_partitions(engine: Engine, today: date | None = None, archive: bool = True) -> dict:
+    """
+    Create upcoming partitions and archive expired ones for every partitioned log table. Each
+    partition is created or archived in its own transaction, so one failure never undoes the others.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    current = month_start(today)
+    result = {}
+    for table in PARTITIONED_TABLES:
+        created, archived, kept = [], [], []
+        for i in range(max(settings.LOG_PARTITIONS_AHEAD, 0) + 1):
+            month = add_months(current, i)
+            with engine.begin() as conn:
+                if create_month_partition(conn, table, month):
+                    created.append(partition_name(table, month))
+        retention = _retention_months(table)
+        if archive and retention > 0:
+            cutoff = add_months(current, -retention)  # partitions whose month ended before this are expired
+            with engine.connect() as conn:
+                expired = [p for p in list_partitions(conn, table) if add_months(p.month, 1) <= cutoff]
+            if expired:
+                try:
+                    store = archive_store()
+                except ArchiveTargetUnavailable as e:
+                    logger.error("%s: %s expired partition(s) kept: %s", table, len(expired), e)
+                    store = None
+                    kept = [p.name for p in expired]
+                if store is not None:
+                    for part in expired:
+                        archive_partition(engine, table, part, store)
+                        archived.append(part.name)
+        result[table] = {"created": created, "archived": archived, "kept": kept}
+    return result
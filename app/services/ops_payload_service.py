@@ -1,19 +1,15 @@
 import base64, json
 from sqlalchemy.orm import Session
 from app.models.route import Route
-from app.models.time_entry import TimeEntry
 from app.services.settings_service import get_usd_to_tzs_rate
+from app.services.availability_service import parse_date, public_slots_query
 
 def build_ops_payload(db: Session, route_id: str, date_str: str, currency: str = "USD") -> dict:
     route = db.get(Route, route_id)
     if not route or not getattr(route,'active', True):
         raise ValueError("route not found")
-    q = (
-        db.query(TimeEntry)
-        .filter(TimeEntry.route_id == route_id, TimeEntry.date_str == date_str, TimeEntry.visibility == "PUBLIC", TimeEntry.status == "PUBLISHED", TimeEntry.seats_available > 0)
-        .order_by(TimeEntry.start.asc())
-        .all()
-    )
+    day = parse_date(date_str)
+    q = public_slots_query(db, [route_id], day).all() if day else []
     slots = [{
         "id": r.id,
         "start": r.start,
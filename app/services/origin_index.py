@@ -0,0 +1,109 @@
+"""
+In-process origin index for the public booking endpoints.
+
+Built from locations and routes in two queries and kept per worker: the /public/origins list,
+origin label -> normalized key -> active route ids, and route id -> (from, to) labels. It is rebuilt
+when the origins or routes version of app.core.response_cache changes (i.e. after the ops/admin
+endpoints that edit locations or routes), or after response_cache.local_ttl() at the latest.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+
+from sqlalchemy.orm import Session
+
+from app.core import response_cache
+from app.models.location import Location
+from app.models.route import Route
+
+# Customer-facing origin names that differ from route from_label
+_ORIGIN_ALIASES = {"nungwi": "Zanzibar Nungwi"}
+
+DAR_ES_SALAAM_AIRPORT = "dar es salaam airport"
+
+
+def normalize_from_label(from_label: str) -> str:
+    """Map customer-facing origin names to route from_label (e.g. Nungwi -> Zanzibar Nungwi)."""
+    t = (from_label or "").strip()
+    return _ORIGIN_ALIASES.get(t.lower(), t)
+
+
+def origin_key(from_label: str) -> str:
+    """Case-insensitive lookup key of an origin (same matching as lower(from_label) = lower(label))."""
+    return normalize_from_label(from_label).lower()
+
+
+def region_from_name(name: str) -> str:
+    """Derive DAR | ZANZIBAR | OTHER from location name (dropdown value)."""
+    n = (name or "").strip().lower()
+    if "zanzibar" in n:
+        return "ZANZIBAR"
+    if "other" in n:
+        return "OTHER"
+    return "DAR"
+
+
+@dataclass
+class OriginIndex:
+    version: tuple[str, str]
+    built_at: float
+    origins: list[dict] = field(default_factory=list)
+    route_ids_by_key: dict[str, tuple[str, ...]] = field(default_factory=dict)  # active routes only
+    route_labels: dict[str, tuple[str, str]] = field(default_factory=dict)  # every route: id -> (from, to)
+
+    def route_ids(self, from_label: str) -> tuple[str, ...]:
+        return self.route_ids_by_key.get(origin_key(from_label), ())
+
+
+def _build(db: Session, version: tuple[str, str]) -> OriginIndex:
+    index = OriginIndex(version=version, built_at=time.monotonic())
+
+    seen = set()
+    locations = (
+        db.query(Location.name, Location.subs_csv)
+        .filter(Location.active == True)  # noqa: E712
+        .order_by(Location.name.asc())
+        .all()
+    )
+    for name, subs_csv in locations:
+        name = (name or "").strip()
+        subs = [s.strip() for s in (subs_csv or "").split(",") if s.strip()]
+        if not name or not subs:
+            continue
+        sub = subs[0]
+        region_group = region_from_name(name)
+        label = f"{name} {sub}".strip()
+        if label in seen:
+            continue
+        seen.add(label)
+        value = sub if region_group == "OTHER" else label
+        index.origins.append({"label": label, "region": region_group, "sub": sub, "value": value})
+
+    by_key: dict[str, list[str]] = {}
+    for route_id, from_label, to_label, active in db.query(Route.id, Route.from_label, Route.to_label, Route.active).all():
+        index.route_labels[route_id] = (from_label, to_label)
+        if active:
+            by_key.setdefault((from_label or "").lower(), []).append(route_id)
+    index.route_ids_by_key = {k: tuple(v) for k, v in by_key.items()}
+    return index
+
+
+_index: OriginIndex | None = None
+_lock = threading.Lock()
+
+
+def get_origin_index(db: Session) -> OriginIndex:
+    """Current index for this worker, rebuilt if locations/routes changed since it was built."""
+    global _index
+    version = (response_cache.current_version(response_cache.ORIGINS), response_cache.current_version(response_cache.ROUTES))
+    index = _index
+    max_age = response_cache.local_ttl()
+    if index is not None and index.version == version and time.monotonic() - index.built_at < max_age:
+        return index
+    with _lock:
+        index = _index
+        if index is None or index.version != version or time.monotonic() - index.built_at >= max_age:
+            index = _index = _build(db, version)
+    return index
@@ -1,5 +1,4 @@
 """Resolve partner referral code via the PHP partners app API."""
-import requests
 from typing import Any
 
 def get_partner_by_code(base_url: str, code: str, timeout: float = 5.0) -> dict[str, Any] | None:
@@ -12,6 +11,8 @@ def get_partner_by_code(base_url: str, code: str, timeout: float = 5.0) -> dict[
     url_base = (base_url or "").strip().rstrip("/")
     url = f"{url_base}/api/partner-by-code.php"
     try:
+        import requests
+
         r = requests.get(url, params={"code": code.strip()}, timeout=timeout)
         if r.status_code != 200:
             return None
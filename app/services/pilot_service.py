@@ -0,0 +1,138 @@
+"""
+Pilot assignment feed: a date window of a pilot's flights, one page at a time, with the manifest
+(bookings, passenger names, total pax) of each flight.
+
+Built from a fixed number of queries whatever the page size or the pilot's history: a count, the
+page of assignments joined to their time entry and route, the bookings of those flights, and
+their passengers.
+"""
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking
+from app.models.passenger import Passenger
+from app.models.pilot import PilotAssignment
+from app.models.route import Route
+from app.models.time_entry import TimeEntry
+
+FEED_SCOPES = ("upcoming", "past")
+MAX_FEED_DAYS = 366
+MAX_FEED_LIMIT = 200
+
+# Bookings that no longer fly; listed on the flight but left out of the manifest
+_NOT_FLYING = ("CANCELLED", "CANCELED", "REFUNDED", "EXPIRED")
+
+
+def _window(scope: str, days: int, today: date) -> tuple[date, date]:
+    days = min(max(days, 1), MAX_FEED_DAYS)
+    if scope == "past":
+        return today - timedelta(days=days), today - timedelta(days=1)
+    return today, today + timedelta(days=days)
+
+
+def assignment_feed(
+    db: Session,
+    pilot_user_id: str,
+    scope: str = "upcoming",
+    days: int = 30,
+    limit: int = 50,
+    offset: int = 0,
+    today: date | None = None,
+) -> dict:
+    """Page of the pilot's assignments whose flight date is in the window (upcoming: today..+days, past: -days..yesterday)."""
+    today = today or datetime.now(timezone.utc).date()
+    start, end = _window(scope, days, today)
+    limit = min(max(limit, 1), MAX_FEED_LIMIT)
+    offset = max(offset, 0)
+
+    base = (
+        db.query(PilotAssignment)
+        .join(TimeEntry, TimeEntry.id == PilotAssignment.time_entry_id)
+        .filter(PilotAssignment.pilot_user_id == pilot_user_id, TimeEntry.flight_date.between(start, end))
+    )
+    total = base.count()
+    if scope == "past":
+        order = (TimeEntry.flight_date.desc(), TimeEntry.departure_time.desc(), PilotAssignment.id)
+    else:
+        order = (TimeEntry.flight_date.asc(), TimeEntry.departure_time.asc(), PilotAssignment.id)
+    rows = (
+        base.outerjoin(Route, Route.id == TimeEntry.route_id)
+        .with_entities(
+            PilotAssignment.id, PilotAssignment.time_entry_id, PilotAssignment.status,
+            PilotAssignment.created_at, PilotAssignment.completed_at,
+            TimeEntry.date_str, TimeEntry.start, TimeEntry.end, TimeEntry.flight_no, TimeEntry.aircraft_type,
+            Route.from_label, Route.to_label,
+        )
+        .order_by(*order)
+        .limit(limit)
+        .offset(offset)
+        .all()
+    )
+
+    te_ids = list({r.time_entry_id for r in rows})
+    bookings_by_te: dict[str, list] = {}
+    passengers_by_booking: dict[str, list] = {}
+    if te_ids:
+        bookings = (
+            db.query(Booking.id, Booking.time_entry_id, Booking.booking_ref, Booking.status, Booking.payment_status, Booking.pax)
+            .filter(Booking.time_entry_id.in_(te_ids))
+            .order_by(Booking.created_at.asc())
+            .all()
+        )
+        for b in bookings:
+            bookings_by_te.setdefault(b.time_entry_id, []).append(b)
+        flying_ids = [b.id for b in bookings if b.status not in _NOT_FLYING]
+        if flying_ids:
+            passengers = (
+                db.query(Passenger.booking_id, Passenger.first, Passenger.last)
+                .filter(Passenger.booking_id.in_(flying_ids))
+                .order_by(Passenger.created_at.asc(), Passenger.id.asc())
+                .all()
+            )
+            for p in passengers:
+                passengers_by_booking.setdefault(p.booking_id, []).append(p)
+
+    items = []
+    for r in rows:
+        bookings = bookings_by_te.get(r.time_entry_id, [])
+        manifest = []
+        total_pax = 0
+        for b in bookings:
+            if b.status in _NOT_FLYING:
+                continue
+            total_pax += int(b.pax or 0)
+            for p in passengers_by_booking.get(b.id, []):
+                manifest.append({"bookingRef": b.booking_ref, "name": f"{p.first or ''} {p.last or ''}".strip()})
+        items.append({
+            "assignmentId": r.id,
+            "timeEntryId": r.time_entry_id,
+            "status": r.status,
+            "createdAt": r.created_at.isoformat() if r.created_at else None,
+            "completedAt": r.completed_at.isoformat() if r.completed_at else None,
+            "dateStr": r.date_str,
+            "start": r.start,
+            "end": r.end,
+            "flightNo": r.flight_no,
+            "aircraftType": r.aircraft_type,
+            "from_label": r.from_label,
+            "to_label": r.to_label,
+            "routeLabel": f"{r.from_label} → {r.to_label}" if r.from_label and r.to_label else None,
+            "bookings": [{
+                "bookingRef": b.booking_ref,
+                "status": b.status,
+                "paymentStatus": b.payment_status,
+                "pax": b.pax,
+            } for b in bookings],
+            "totalPax": total_pax,
+            "manifest": manifest,
+        })
+    return {
+        "scope": scope,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "items": items,
+    }
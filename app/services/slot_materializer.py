@@ -0,0 +1,159 @@
+"""
+Incremental slot generation from SlotRule.
+
+Each rule keeps a high-water mark (SlotRule.generated_through). A run only materializes the days
+that entered the rule's horizon since the previous run, builds the rows in memory and writes them
+with one bulk insert (inventory_service.insert_time_entries). Editing a rule (apply_rule_edit)
+touches only its own future, unbooked slots, in the caller's transaction: price/capacity/cabin
+changes update them in place, anything else regenerates the window it had already materialized.
+"""
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from sqlalchemy import exists
+from sqlalchemy.orm import Session
+
+from app.models.booking import Booking
+from app.models.route import Route
+from app.models.slot_rule import SlotRule
+from app.models.time_entry import TimeEntry
+from app.services.inventory_service import insert_time_entries
+from app.services.settings_service import get_usd_to_tzs_rate
+
+# SlotRule fields that change which slots a rule produces or what they contain
+SCHEDULE_FIELDS = (
+    "route_id", "days_of_week", "times", "duration_minutes", "price_usd", "price_tzs",
+    "capacity", "flight_no_prefix", "cabin", "active", "horizon_days",
+)
+# Fields whose change only alters the content of existing slots (UPDATE in place, no regeneration)
+IN_PLACE_FIELDS = ("price_usd", "price_tzs", "capacity", "cabin")
+
+
+def _end_time(start_hhmm: str, dur_min: int) -> str:
+    hh, mm = map(int, start_hhmm.split(":"))
+    total = hh * 60 + mm + dur_min
+    total %= 1440
+    eh, em = divmod(total, 60)
+    return f"{eh:02d}:{em:02d}"
+
+
+def _rule_days(r: SlotRule) -> set[int]:
+    return {int(x) for x in (r.days_of_week or "").split(",") if x.strip().isdigit()}
+
+
+def _rule_times(r: SlotRule) -> list[str]:
+    return [t.strip() for t in (r.times or "").split(",") if t.strip()]
+
+
+def pending_window(r: SlotRule, today: date) -> tuple[date, date] | None:
+    """Days [start, end] of the rule's horizon not generated yet, or None if up to date."""
+    end = today + timedelta(days=max(0, int(r.horizon_days or 0)) - 1)
+    start = today
+    if r.generated_through and r.generated_through >= today:
+        start = r.generated_through + timedelta(days=1)
+    if start > end:
+        return None
+    return start, end
+
+
+def build_rule_rows(r: SlotRule, start: date, end: date, usd_to_tzs: int) -> list[dict]:
+    """Time entry rows for one rule over [start, end] (inclusive)."""
+    days = _rule_days(r)
+    times = _rule_times(r)
+    price_tzs = r.price_tzs if r.price_tzs is not None else int(r.price_usd * usd_to_tzs)
+    rows = []
+    d = start
+    while d <= end:
+        if not days or d.weekday() in days:
+            date_str = d.isoformat()
+            for t in times:
+                rows.append({
+                    "route_id": r.route_id,
+                    "date_str": date_str,
+                    "start": t,
+                    "end": _end_time(t, r.duration_minutes),
+                    "price_usd": r.price_usd,
+                    "price_tzs": price_tzs,
+                    "seats_available": r.capacity,
+                    "flight_no": f"{r.flight_no_prefix}{d.strftime('%m%d')}",
+                    "cabin": r.cabin,
+                    "slot_rule_id": r.id,
+                })
+        d += timedelta(days=1)
+    return rows
+
+
+def materialize_slot_rules(db: Session, today: date | None = None) -> dict:
+    """Generate slots for the newly entered horizon days of every active rule. Commits."""
+    today = today or datetime.now(timezone.utc).date()
+    rules = db.query(SlotRule).filter(SlotRule.active == True).all()
+    if not rules:
+        return {"rules": 0, "created": 0}
+    route_ids = {rid for (rid,) in db.query(Route.id).filter(Route.id.in_({r.route_id for r in rules})).all()}
+    usd_to_tzs = get_usd_to_tzs_rate(db)
+
+    rows: list[dict] = []
+    advanced = 0
+    for r in rules:
+        if r.route_id not in route_ids:
+            continue
+        window = pending_window(r, today)
+        if not window:
+            continue
+        rows.extend(build_rule_rows(r, window[0], window[1], usd_to_tzs))
+        r.generated_through = window[1]
+        advanced += 1
+    created = insert_time_entries(db, rows)
+    db.commit()
+    return {"rules": advanced, "candidates": len(rows), "created": len(created)}
+
+
+def schedule_snapshot(r: SlotRule) -> SimpleNamespace:
+    """The rule's SCHEDULE_FIELDS as they are now; pass to apply_rule_edit after editing the rule."""
+    return SimpleNamespace(**{k: getattr(r, k) for k in SCHEDULE_FIELDS})
+
+
+def apply_rule_edit(db: Session, r: SlotRule, previous: SimpleNamespace, today: date | None = None) -> dict:
+    """
+    Bring the rule's future, unbooked slots (slot_rule_id == r.id) in line with its edited values.
+    `previous` is schedule_snapshot() taken before the edit. Price, capacity and cabin changes update
+    the slots in place; other changes delete them and regenerate, right away, the days the rule had
+    already materialized (none if it is now inactive). Booked slots are kept as-is. Does not commit.
+    """
+    changed = {k for k in SCHEDULE_FIELDS if getattr(previous, k) != getattr(r, k)}
+    if not changed:
+        return {"updated": 0, "deleted": 0, "created": 0}
+    today = today or datetime.now(timezone.utc).date()
+    owned_future_unbooked = (
+        TimeEntry.slot_rule_id == r.id,
+        TimeEntry.date_str >= today.isoformat(),
+        ~exists().where(Booking.time_entry_id == TimeEntry.id),
+    )
+    usd_to_tzs = get_usd_to_tzs_rate(db)
+
+    if changed <= set(IN_PLACE_FIELDS):
+        updated = (
+            db.query(TimeEntry)
+            .filter(*owned_future_unbooked)
+            .update(
+                {
+                    TimeEntry.price_usd: r.price_usd,
+                    TimeEntry.price_tzs: r.price_tzs if r.price_tzs is not None else int(r.price_usd * usd_to_tzs),
+                    TimeEntry.seats_available: r.capacity,
+                    TimeEntry.cabin: r.cabin,
+                },
+                synchronize_session=False,
+            )
+        )
+        return {"updated": updated, "deleted": 0, "created": 0}
+
+    deleted = db.query(TimeEntry).filter(*owned_future_unbooked).delete(synchronize_session=False)
+    through = r.generated_through
+    r.generated_through = None
+    created: list[str] = []
+    if r.active and through and through >= today:
+        end = min(through, today + timedelta(days=max(0, int(r.horizon_days or 0)) - 1))
+        if end >= today and db.get(Route, r.route_id) is not None:
+            created = insert_time_entries(db, build_rule_rows(r, today, end, usd_to_tzs))
+            r.generated_through = end
+    return {"updated": 0, "deleted": deleted, "created": len(created)}
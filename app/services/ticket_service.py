@@ -5,11 +5,8 @@ import math
 import os
 import re
 from datetime import datetime, timezone
-
-import qrcode
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.utils import ImageReader
-from reportlab.pdfgen import canvas
+from functools import lru_cache
+from typing import TYPE_CHECKING
 
 from sqlalchemy.orm import Session
 
@@ -19,6 +16,11 @@ from app.models.time_entry import TimeEntry
 from app.models.route import Route
 from app.models.passenger import Passenger
 from app.models.user import User
+from app.services.ticket_storage import get_ticket_storage
+
+if TYPE_CHECKING:  # reportlab is imported lazily where tickets are rendered
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
 
 
 # Check-in & notes text (exact as per reference PDF)
@@ -56,6 +58,20 @@ def _resolve_ticket_logo_path(which: str) -> str | None:
     return path if os.path.isfile(path) else None
 
 
+@lru_cache(maxsize=4)
+def _logo_image_cached(path: str, mtime: float) -> ImageReader:
+    from reportlab.lib.utils import ImageReader
+
+    reader = ImageReader(path)
+    reader.getRGBData()  # decode now; ImageReader keeps the pixels for every later drawImage
+    return reader
+
+
+def _logo_image(path: str) -> ImageReader:
+    """Decoded logo image, shared across tickets in this process (reloaded when the file changes)."""
+    return _logo_image_cached(path, os.path.getmtime(path))
+
+
 def _draw_flysunbird_header_logo(c: canvas.Canvas, x: float, y_top: float, max_height: float = 32) -> float:
     """Draw FlySunbird logo (wing + 'fly' + 'SunBird' + tagline) with ReportLab. Returns height used."""
     orange = (0.92, 0.55, 0.15)
@@ -93,12 +109,10 @@ def _draw_flysunbird_header_logo(c: canvas.Canvas, x: float, y_top: float, max_h
     return max_height
 
 
-def _draw_flysunbird_footer_design(
+def _draw_flysunbird_footer_artwork(
     c: canvas.Canvas, x_left: float, x_right: float, y_bottom: float, height: float
 ) -> None:
-    """Draw footer: left = sunbird graphic + company/contact/address; right = red/pink/gold triangle pattern."""
-    w = x_right - x_left
-    y_top = y_bottom + height
+    """Vector part of the footer: sunbird graphic (left) and red/pink/gold triangle pattern (right). No text."""
     c.saveState()
 
     # ---- Left: bird graphic (simplified sunbird on branch) ----
@@ -128,35 +142,37 @@ def _draw_flysunbird_footer_design(
     p.close()
     c.drawPath(p, stroke=0, fill=1)
 
-    # ---- Left: company and contact text ----
-    tx = x_left
-    ty = y_bottom + height - 38
-    c.setFillColorRGB(0, 0, 0)
-    c.setFont("Helvetica-Bold", 8)
-    company = getattr(settings, "TICKET_FOOTER_COMPANY", "") or "Premier Air Limited t/a flySunBird"
-    c.drawString(tx, ty, company[:50])
-    c.setFont("Helvetica", 7)
-    email = getattr(settings, "TICKET_FOOTER_EMAIL", "") or "booking@flysunbird.com"
-    c.drawString(tx, ty - 8, f"Email: {email}"[:45])
-    phone = getattr(settings, "TICKET_FOOTER_PHONE", "") or "+255 (0) 795 777 777"
-    c.drawString(tx, ty - 16, f"Mobile: {phone}"[:45])
-    # Map pin (small yellow diamond/circle)
-    c.setFillColorRGB(0.98, 0.88, 0.35)
-    c.circle(tx + 4, ty - 26, 3, fill=1, stroke=0)
-    addr1 = getattr(settings, "TICKET_FOOTER_ADDRESS_LINE1", "") or "3rd Floor, De Ocean Plaza, Masaki."
-    addr2 = getattr(settings, "TICKET_FOOTER_ADDRESS_LINE2", "") or "Dar es Salaam, United Republic of Tanzania"
-    c.setFillColorRGB(0, 0, 0)
-    c.drawString(tx + 10, ty - 25, addr1[:48])
-    c.drawString(tx + 10, ty - 32, addr2[:48])
-
     # ---- Right: tessellating triangles (red, pink, gold, white) fading to top-left ----
+    # Triangles never overlap, so all triangles of one colour go into a single path (4 fills total)
+    for color, triangles in zip(_FOOTER_TRIANGLE_COLORS, _footer_triangles(x_left, x_right, y_bottom, height)):
+        p = c.beginPath()
+        for (ax, ay), (bx2, by2), (cx, cy) in triangles:
+            p.moveTo(ax, ay)
+            p.lineTo(bx2, by2)
+            p.lineTo(cx, cy)
+            p.close()
+        c.setFillColorRGB(*color)
+        # No stroke to avoid seams; fill only.
+        c.drawPath(p, stroke=0, fill=1)
+    c.restoreState()
+
+
+_FOOTER_TRIANGLE_COLORS = (
+    (0.6, 0.12, 0.2),  # red
+    (0.88, 0.55, 0.6),  # pink
+    (0.92, 0.72, 0.4),  # gold
+    (1.0, 1.0, 1.0),  # white
+)
+
+
+@lru_cache(maxsize=8)
+def _footer_triangles(x_left: float, x_right: float, y_bottom: float, height: float) -> tuple[tuple, ...]:
+    """Triangle vertices of the footer pattern, one tuple per colour; computed once per process and geometry."""
+    w = x_right - x_left
+    y_top = y_bottom + height
     side = 7
     h_tri = side * math.sqrt(3) / 2
-    red = (0.6, 0.12, 0.2)
-    pink = (0.88, 0.55, 0.6)
-    gold = (0.92, 0.72, 0.4)
-    white = (1.0, 1.0, 1.0)
-    colors = [red, pink, gold, white]
+    buckets: list[list] = [[] for _ in _FOOTER_TRIANGLE_COLORS]
     # Pattern fills right portion; start from right edge
     x0 = x_right - (w * 0.45)
     y0 = y_bottom
@@ -170,25 +186,55 @@ def _draw_flysunbird_footer_design(
             nx = (x - x_left) / w if w > 0 else 0
             ny = (y0 - y_bottom) / height if height > 0 else 0
             t = max(0, min(1, 1.0 - 0.5 * nx - 0.5 * ny))
-            idx = min(3, int(t * 4))
-            c.setFillColorRGB(*colors[idx])
-            c.setStrokeColorRGB(*colors[idx])
-            p = c.beginPath()
+            bucket = buckets[min(3, int(t * 4))]
             if row % 2 == 0:
                 # Base-down triangle
-                p.moveTo(x, y0)
-                p.lineTo(x + side, y0)
-                p.lineTo(x + side / 2, y0 + h_tri)
+                bucket.append(((x, y0), (x + side, y0), (x + side / 2, y0 + h_tri)))
             else:
                 # Base-up triangle (base at y0+h_tri, peak at y0)
-                p.moveTo(x, y0 + h_tri)
-                p.lineTo(x + side, y0 + h_tri)
-                p.lineTo(x + side / 2, y0)
-            p.close()
-            # No stroke to avoid seams; fill only.
-            c.drawPath(p, stroke=0, fill=1)
+                bucket.append(((x, y0 + h_tri), (x + side, y0 + h_tri), (x + side / 2, y0)))
         y0 += h_tri
         row += 1
+    return tuple(tuple(b) for b in buckets)
+
+
+def _stamp_footer_artwork(c: canvas.Canvas, x_left: float, x_right: float, y_bottom: float, height: float) -> None:
+    """Place the footer artwork as a Form XObject: drawn once per document, referenced per page."""
+    name = "fsbFooterArt_" + "_".join(f"{v:g}".replace(".", "p").replace("-", "m") for v in (x_left, x_right, y_bottom, height))
+    if not c.hasForm(name):
+        c.beginForm(name)
+        _draw_flysunbird_footer_artwork(c, x_left, x_right, y_bottom, height)
+        c.endForm()
+    c.doForm(name)
+
+
+def _draw_flysunbird_footer_design(
+    c: canvas.Canvas, x_left: float, x_right: float, y_bottom: float, height: float
+) -> None:
+    """Draw footer: left = sunbird graphic + company/contact/address; right = red/pink/gold triangle pattern."""
+    _stamp_footer_artwork(c, x_left, x_right, y_bottom, height)
+
+    # ---- Left: company and contact text (settings-driven, so drawn per ticket) ----
+    c.saveState()
+    tx = x_left
+    ty = y_bottom + height - 38
+    c.setFillColorRGB(0, 0, 0)
+    c.setFont("Helvetica-Bold", 8)
+    company = getattr(settings, "TICKET_FOOTER_COMPANY", "") or "Premier Air Limited t/a flySunBird"
+    c.drawString(tx, ty, company[:50])
+    c.setFont("Helvetica", 7)
+    email = getattr(settings, "TICKET_FOOTER_EMAIL", "") or "booking@flysunbird.com"
+    c.drawString(tx, ty - 8, f"Email: {email}"[:45])
+    phone = getattr(settings, "TICKET_FOOTER_PHONE", "") or "+255 (0) 795 777 777"
+    c.drawString(tx, ty - 16, f"Mobile: {phone}"[:45])
+    # Map pin (small yellow diamond/circle)
+    c.setFillColorRGB(0.98, 0.88, 0.35)
+    c.circle(tx + 4, ty - 26, 3, fill=1, stroke=0)
+    addr1 = getattr(settings, "TICKET_FOOTER_ADDRESS_LINE1", "") or "3rd Floor, De Ocean Plaza, Masaki."
+    addr2 = getattr(settings, "TICKET_FOOTER_ADDRESS_LINE2", "") or "Dar es Salaam, United Republic of Tanzania"
+    c.setFillColorRGB(0, 0, 0)
+    c.drawString(tx + 10, ty - 25, addr1[:48])
+    c.drawString(tx + 10, ty - 32, addr2[:48])
     c.restoreState()
 
 
@@ -199,7 +245,35 @@ def _ticket_url(booking_ref: str) -> str:
     return f"{base}/api/v1/public/bookings/{booking_ref}/ticket"
 
 
+@lru_cache(maxsize=256)
+def _qr_matrix(url: str, border: int) -> tuple[tuple[bool, ...], ...]:
+    """QR modules (True = dark) including the quiet-zone border; cached per URL."""
+    import qrcode
+
+    qr = qrcode.QRCode(version=1, border=border, error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(url)
+    qr.make(fit=True)
+    return tuple(tuple(row) for row in qr.get_matrix())
+
+
+def _qr_dark_runs(matrix: tuple[tuple[bool, ...], ...]):
+    """Yield (row, col, length) for each horizontal run of dark modules."""
+    for r, row in enumerate(matrix):
+        col, n = 0, len(row)
+        while col < n:
+            if not row[col]:
+                col += 1
+                continue
+            start = col
+            while col < n and row[col]:
+                col += 1
+            yield r, start, col - start
+
+
+@lru_cache(maxsize=256)
 def _make_qr_image_bytes(url: str, box_size: int = 3, border: int = 2) -> bytes:
+    import qrcode
+
     qr = qrcode.QRCode(version=1, box_size=box_size, border=border, error_correction=qrcode.constants.ERROR_CORRECT_M)
     qr.add_data(url)
     qr.make(fit=True)
@@ -210,6 +284,25 @@ def _make_qr_image_bytes(url: str, box_size: int = 3, border: int = 2) -> bytes:
     return buf.read()
 
 
+def _draw_qr_vector(c: canvas.Canvas, url: str, x: float, y: float, size: float, border: int = 1) -> None:
+    """Draw the QR code for url as filled rectangles in the size x size box with bottom-left corner (x, y)."""
+    matrix = _qr_matrix(url, border)
+    module = size / len(matrix)
+    c.saveState()
+    c.setFillColorRGB(1, 1, 1)
+    c.rect(x, y, size, size, stroke=0, fill=1)
+    # Work in module units (integer coordinates keep the content stream short). One path for all
+    # dark runs: a single fill, no anti-aliasing seams between modules.
+    c.translate(x, y + size)
+    c.scale(module, -module)
+    p = c.beginPath()
+    for r, col, length in _qr_dark_runs(matrix):
+        p.rect(col, r, length, 1)
+    c.setFillColorRGB(0, 0, 0)
+    c.drawPath(p, stroke=0, fill=1)
+    c.restoreState()
+
+
 def _footer2_experience(k: dict) -> str:
     """Format footer line 2: 'Route -> To • Seats: N • Type duration min'. Use ASCII -> so it never renders as dot."""
     route = f"{k.get('route_from') or ''} -> {k.get('route_to') or ''}".strip()
@@ -399,7 +492,6 @@ def _render_ticket_pdf_from_template(
     # QR code: cover old template QR (same line as "Scan for details") then place new QR there
     try:
         ticket_url = _ticket_url(booking_ref)
-        qr_bytes = _make_qr_image_bytes(ticket_url, box_size=2, border=1)
         qr_rect = fitz.Rect(*_QR_RECT)
         # Generous white rect to fully erase old QR
         qr_erase = fitz.Rect(
@@ -410,20 +502,17 @@ def _render_ticket_pdf_from_template(
         shape.draw_rect(qr_erase)
         shape.finish(fill=(1, 1, 1), color=(1, 1, 1))
         shape.commit()
-        try:
-            page.insert_image(qr_rect, stream=qr_bytes)
-        except Exception:
-            import tempfile
-            with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-                tmp.write(qr_bytes)
-                tmp.flush()
-                try:
-                    page.insert_image(qr_rect, filename=tmp.name)
-                finally:
-                    try:
-                        os.unlink(tmp.name)
-                    except Exception:
-                        pass
+        if settings.TICKET_QR_VECTOR:
+            matrix = _qr_matrix(ticket_url, 1)
+            mw, mh = qr_rect.width / len(matrix), qr_rect.height / len(matrix)
+            shape = page.new_shape()
+            for r, col, length in _qr_dark_runs(matrix):
+                x0, y0 = qr_rect.x0 + col * mw, qr_rect.y0 + r * mh
+                shape.draw_rect(fitz.Rect(x0, y0, x0 + length * mw, y0 + mh))
+            shape.finish(fill=(0, 0, 0), color=None, width=0)
+            shape.commit()
+        else:
+            page.insert_image(qr_rect, stream=_make_qr_image_bytes(ticket_url, box_size=2, border=1))
     except Exception:
         pass
     buf = io.BytesIO()
@@ -454,35 +543,45 @@ def render_ticket_pdf_bytes(
     currency: str = "USD",
 ) -> bytes:
     """Render ticket PDF: from template if ticket_template.pdf exists, else drawn layout."""
+    fields = dict(locals())
     import logging
     log = logging.getLogger(__name__)
-    template_path = _resolve_ticket_template_path()
-    if template_path:
+    if _resolve_ticket_template_path():
         try:
-            return _render_ticket_pdf_from_template(
-                booking_ref=booking_ref,
-                passenger_name=passenger_name,
-                passenger_phone=passenger_phone,
-                booker_email=booker_email,
-                route_from=route_from,
-                route_to=route_to,
-                date_str=date_str,
-                start_time=start_time,
-                end_time=end_time,
-                pax=pax,
-                payment_status=payment_status,
-                flight_no=flight_no,
-                experience=experience,
-                aircraft_type=aircraft_type,
-                departure_location=departure_location,
-                amount_usd=amount_usd,
-                amount_tzs=amount_tzs,
-                currency=currency,
-            )
+            return _render_ticket_pdf_from_template(**fields)
         except Exception as e:
             log.warning("Ticket template render failed, using drawn layout: %s", e)
     else:
         log.debug("Ticket template not found (app/assets/ticket_template.pdf or TICKET_TEMPLATE_PDF_PATH), using drawn layout")
+    return _render_ticket_pdf_drawn(**fields)
+
+
+def _render_ticket_pdf_drawn(
+    *,
+    booking_ref: str,
+    passenger_name: str,
+    passenger_phone: str = "",
+    booker_email: str = "",
+    route_from: str,
+    route_to: str,
+    date_str: str,
+    start_time: str,
+    end_time: str,
+    pax: int,
+    payment_status: str,
+    flight_no: str = "",
+    experience: str = "",
+    aircraft_type: str = "",
+    departure_location: str = "",
+    amount_usd: int = 0,
+    amount_tzs: int = 0,
+    currency: str = "USD",
+) -> bytes:
+    """Drawn layout (reportlab): used when the template is missing or fails."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import ImageReader
+    from reportlab.pdfgen import canvas
+
     buf = io.BytesIO()
     c = canvas.Canvas(buf, pagesize=A4)
     w, h = A4
@@ -495,7 +594,7 @@ def render_ticket_pdf_bytes(
     logo_header_path = _resolve_ticket_logo_path("header")
     if logo_header_path:
         try:
-            img_reader = ImageReader(logo_header_path)
+            img_reader = _logo_image(logo_header_path)
             iw, ih = img_reader.getSize()
             max_logo_h = 36
             scale = min(1.0, max_logo_h / ih) if ih else 1.0
@@ -599,12 +698,14 @@ def render_ticket_pdf_bytes(
     y -= 10
     try:
         ticket_url = _ticket_url(booking_ref)
-        qr_png = _make_qr_image_bytes(ticket_url, box_size=2, border=1)
-        img = ImageReader(io.BytesIO(qr_png))
         qr_size = 80
         qr_x = x_right - qr_size
         qr_y = y - qr_size
-        c.drawImage(img, qr_x, qr_y, width=qr_size, height=qr_size)
+        if settings.TICKET_QR_VECTOR:
+            _draw_qr_vector(c, ticket_url, qr_x, qr_y, qr_size, border=1)
+        else:
+            img = ImageReader(io.BytesIO(_make_qr_image_bytes(ticket_url, box_size=2, border=1)))
+            c.drawImage(img, qr_x, qr_y, width=qr_size, height=qr_size)
     except Exception:
         pass
     y -= 20
@@ -619,7 +720,7 @@ def render_ticket_pdf_bytes(
     logo_footer_path = _resolve_ticket_logo_path("footer")
     if logo_footer_path:
         try:
-            img_reader = ImageReader(logo_footer_path)
+            img_reader = _logo_image(logo_footer_path)
             iw, ih = img_reader.getSize()
             max_footer_h = 24
             scale = min(1.0, max_footer_h / ih) if ih else 1.0
@@ -657,47 +758,15 @@ def render_ticket_pdf_bytes(
 
 
 def store_ticket_pdf(*, booking_ref: str, pdf_bytes: bytes) -> tuple[str, str]:
-    if settings.GCS_BUCKET_NAME and settings.GOOGLE_APPLICATION_CREDENTIALS:
-        try:
-            from google.cloud import storage  # type: ignore
-        except Exception as e:
-            raise RuntimeError("google-cloud-storage is not installed. Install requirements and retry") from e
-        client = storage.Client()
-        bucket = client.bucket(settings.GCS_BUCKET_NAME)
-        object_key = f"tickets/{booking_ref}.pdf"
-        blob = bucket.blob(object_key)
-        blob.upload_from_string(pdf_bytes, content_type="application/pdf")
-        return "gcs", object_key
-    base = settings.TICKET_LOCAL_DIR or "./data/tickets"
-    os.makedirs(base, exist_ok=True)
-    object_key = os.path.join(base, f"{booking_ref}.pdf")
-    with open(object_key, "wb") as f:
-        f.write(pdf_bytes)
-    return "local", object_key
+    """Write to the configured backend; returns (storage name, object key) for the booking."""
+    backend = get_ticket_storage()
+    return backend.name, backend.put(booking_ref, pdf_bytes)
 
 
 def load_ticket_pdf_bytes(*, booking_ref: str, storage: str, object_key: str) -> bytes | None:
     if not object_key:
         return None
     try:
-        if storage == "gcs":
-            if not getattr(settings, "GCS_BUCKET_NAME", None):
-                return None
-            try:
-                from google.cloud import storage  # type: ignore
-            except Exception:
-                return None
-            client = storage.Client()
-            bucket = client.bucket(settings.GCS_BUCKET_NAME)
-            blob = bucket.blob(object_key)
-            return blob.download_as_bytes()
-        path = object_key
-        if not os.path.isabs(path):
-            base = getattr(settings, "TICKET_LOCAL_DIR", None) or "./data/tickets"
-            path = os.path.join(base, os.path.basename(path))
-        if not os.path.isfile(path):
-            return None
-        with open(path, "rb") as f:
-            return f.read()
+        return get_ticket_storage(storage or "local").get_bytes(object_key)
     except Exception:
         return None
@@ -0,0 +1,374 @@
+"""
+Ticket PDF storage behind one interface: a local directory, a Google Cloud Storage bucket, or an
+S3-compatible bucket (AWS S3, MinIO, ...).
+
+Backends are created once per process (get_ticket_storage), so the GCS and S3 clients, with their
+auth sessions and connection pools, are reused across requests. Signed download URLs are cached and
+handed out again while most of their lifetime remains, which keeps check-in bursts (many QR
+scans of the same tickets) from re-signing on every request.
+
+Local tickets are sharded by a hash prefix (<TICKET_LOCAL_DIR>/ab/cd/FSB-XXXX.pdf) so no directory grows
+without bound; keys written by older versions (flat <TICKET_LOCAL_DIR>/FSB-XXXX.pdf) still resolve.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Callable
+
+from app.core.config import settings
+
+# Reuse a cached signed URL only while at least this fraction of its lifetime is left
+_SIGNED_URL_MIN_REMAINING = 0.25
+_SIGNED_URL_CACHE_SIZE = 2048
+
+_SHARDED_KEY = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{2}/[^/]+$")
+
+
+class TicketStorageUnavailable(RuntimeError):
+    """Backend not configured or its client library is missing."""
+
+
+class TicketStorage:
+    name = ""
+
+    def put(self, booking_ref: str, data: bytes) -> str:
+        """Store a ticket PDF; returns the object key to save on the booking."""
+        raise NotImplementedError
+
+    def get_bytes(self, object_key: str) -> bytes | None:
+        raise NotImplementedError
+
+    def exists(self, object_key: str) -> bool:
+        raise NotImplementedError
+
+    def delete(self, object_key: str) -> None:
+        raise NotImplementedError
+
+    def signed_url(self, object_key: str) -> tuple[str, int] | None:
+        """(GET URL, seconds it stays valid) for backends that serve downloads directly, else None."""
+        return None
+
+
+class _SignedUrlCache:
+    def __init__(self, ttl: int, sign: Callable[[str, int], str]):
+        self.ttl = max(60, ttl)
+        self._sign = sign
+        self._lock = threading.Lock()
+        self._urls: OrderedDict[str, tuple[str, float]] = OrderedDict()  # key -> (url, expires monotonic)
+
+    def get(self, object_key: str) -> tuple[str, int]:
+        now = time.monotonic()
+        with self._lock:
+            hit = self._urls.get(object_key)
+            if hit and hit[1] - now >= self.ttl * _SIGNED_URL_MIN_REMAINING:
+                self._urls.move_to_end(object_key)
+                return hit[0], int(hit[1] - now)
+        url = self._sign(object_key, self.ttl)
+        with self._lock:
+            self._urls[object_key] = (url, now + self.ttl)
+            self._urls.move_to_end(object_key)
+            while len(self._urls) > _SIGNED_URL_CACHE_SIZE:
+                self._urls.popitem(last=False)
+        return url, self.ttl
+
+
+def _shard(booking_ref: str) -> str:
+    digest = hashlib.sha1(booking_ref.encode("utf-8")).hexdigest()
+    return f"{digest[:2]}/{digest[2:4]}"
+
+
+class LocalTicketStorage(TicketStorage):
+    """Files under TICKET_LOCAL_DIR. Keys are '<ab>/<cd>/<ref>.pdf' relative to it (or legacy flat paths)."""
+
+    name = "local"
+
+    def __init__(self, base_dir: str, sharded: bool = True):
+        self.base_dir = base_dir or "./data/tickets"
+        self.sharded = sharded
+
+    def key_for(self, booking_ref: str) -> str:
+        if self.sharded:
+            return f"{_shard(booking_ref)}/{booking_ref}.pdf"
+        return os.path.join(self.base_dir, f"{booking_ref}.pdf")
+
+    def path_for(self, object_key: str) -> str:
+        if _SHARDED_KEY.match(object_key):
+            return os.path.join(self.base_dir, *object_key.split("/"))
+        if os.path.isabs(object_key):
+            return object_key
+        return os.path.join(self.base_dir, os.path.basename(object_key))
+
+    def put(self, booking_ref: str, data: bytes) -> str:
+        object_key = self.key_for(booking_ref)
+        path = self.path_for(object_key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file in the same directory and rename over the target: readers (downloads,
+        # email attachments, backups) never see a partially written PDF.
+        fd, tmp = tempfile.mkstemp(prefix=f".{booking_ref}.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        return object_key
+
+    def get_bytes(self, object_key: str) -> bytes | None:
+        path = self.path_for(object_key)
+        if not os.path.isfile(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def exists(self, object_key: str) -> bool:
+        return bool(object_key) and os.path.isfile(self.path_for(object_key))
+
+    def delete(self, object_key: str) -> None:
+        try:
+            os.unlink(self.path_for(object_key))
+        except FileNotFoundError:
+            pass
+
+
+class GcsTicketStorage(TicketStorage):
+    """Objects tickets/<ref>.pdf in GCS_BUCKET_NAME, through one client per process."""
+
+    name = "gcs"
+
+    def __init__(self, bucket_name: str, signed_url_ttl: int):
+        self.bucket_name = bucket_name
+        self._bucket = None
+        self._lock = threading.Lock()
+        self._signed = _SignedUrlCache(signed_url_ttl, self._sign)
+
+    def bucket(self):
+        if self._bucket is None:
+            with self._lock:
+                if self._bucket is None:
+                    try:
+                        from google.cloud import storage  # type: ignore
+                    except Exception as e:
+                        raise TicketStorageUnavailable("google-cloud-storage is not installed") from e
+                    if not self.bucket_name:
+                        raise TicketStorageUnavailable("GCS_BUCKET_NAME is not set")
+                    self._bucket = storage.Client().bucket(self.bucket_name)
+        return self._bucket
+
+    def put(self, booking_ref: str, data: bytes) -> str:
+        object_key = f"tickets/{booking_ref}.pdf"
+        self.bucket().blob(object_key).upload_from_string(data, content_type="application/pdf")
+        return object_key
+
+    def get_bytes(self, object_key: str) -> bytes | None:
+        from google.api_core.exceptions import NotFound  # type: ignore
+
+        try:
+            return self.bucket().blob(object_key).download_as_bytes()
+        except NotFound:
+            return None
+
+    def exists(self, object_key: str) -> bool:
+        return bool(object_key) and self.bucket().blob(object_key).exists()
+
+    def delete(self, object_key: str) -> None:
+        from google.api_core.exceptions import NotFound  # type: ignore
+
+        try:
+            self.bucket().blob(object_key).delete()
+        except NotFound:
+            pass
+
+    def _sign(self, object_key: str, ttl: int) -> str:
+        return self.bucket().blob(object_key).generate_signed_url(expiration=timedelta(seconds=ttl), method="GET")
+
+    def signed_url(self, object_key: str) -> tuple[str, int]:
+        return self._signed.get(object_key)
+
+
+class S3TicketStorage(TicketStorage):
+    """Objects tickets/<ab>/<cd>/<ref>.pdf in an S3-compatible bucket (S3_ENDPOINT_URL for MinIO and co.).
+
+    One boto3 client per process (thread-safe, pooled connections); uploads go through the transfer
+    manager, which switches to concurrent multipart uploads above S3_MULTIPART_THRESHOLD_MB.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        *,
+        bucket_name: str,
+        endpoint_url: str = "",
+        region: str = "",
+        access_key_id: str = "",
+        secret_access_key: str = "",
+        max_pool_connections: int = 20,
+        multipart_threshold_mb: int = 8,
+        signed_url_ttl: int = 1200,
+    ):
+        self.bucket_name = bucket_name
+        self.endpoint_url = endpoint_url or None
+        self.region = region or None
+        self.access_key_id = access_key_id or None
+        self.secret_access_key = secret_access_key or None
+        self.max_pool_connections = max(1, max_pool_connections)
+        self.multipart_threshold = max(5, multipart_threshold_mb) * 1024 * 1024  # S3 minimum part size is 5 MB
+        self._client = None
+        self._transfer_config = None
+        self._lock = threading.Lock()
+        self._signed = _SignedUrlCache(signed_url_ttl, self._sign)
+
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    try:
+                        import boto3  # type: ignore
+                        from boto3.s3.transfer import TransferConfig  # type: ignore
+                        from botocore.config import Config  # type: ignore
+                    except Exception as e:
+                        raise TicketStorageUnavailable("boto3 is not installed") from e
+                    if not self.bucket_name:
+                        raise TicketStorageUnavailable("S3_BUCKET_NAME is not set")
+                    config = Config(
+                        max_pool_connections=self.max_pool_connections,
+                        retries={"max_attempts": 5, "mode": "standard"},
+                        signature_version="s3v4",
+                        # path-style addressing works with MinIO and other endpoints without wildcard DNS
+                        s3={"addressing_style": "path" if self.endpoint_url else "auto"},
+                    )
+                    self._transfer_config = TransferConfig(
+                        multipart_threshold=self.multipart_threshold,
+                        multipart_chunksize=self.multipart_threshold,
+                        max_concurrency=min(8, self.max_pool_connections),
+                    )
+                    self._client = boto3.session.Session().client(
+                        "s3",
+                        endpoint_url=self.endpoint_url,
+                        region_name=self.region,
+                        aws_access_key_id=self.access_key_id,
+                        aws_secret_access_key=self.secret_access_key,
+                        config=config,
+                    )
+        return self._client
+
+    def key_for(self, booking_ref: str) -> str:
+        return f"tickets/{_shard(booking_ref)}/{booking_ref}.pdf"
+
+    def put(self, booking_ref: str, data: bytes) -> str:
+        object_key = self.key_for(booking_ref)
+        client = self.client()
+        client.upload_fileobj(
+            io.BytesIO(data),
+            self.bucket_name,
+            object_key,
+            ExtraArgs={"ContentType": "application/pdf"},
+            Config=self._transfer_config,
+        )
+        return object_key
+
+    def get_bytes(self, object_key: str) -> bytes | None:
+        client = self.client()
+        try:
+            return client.get_object(Bucket=self.bucket_name, Key=object_key)["Body"].read()
+        except client.exceptions.NoSuchKey:
+            return None
+
+    def exists(self, object_key: str) -> bool:
+        from botocore.exceptions import ClientError  # type: ignore
+
+        if not object_key:
+            return False
+        try:
+            self.client().head_object(Bucket=self.bucket_name, Key=object_key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def delete(self, object_key: str) -> None:
+        self.client().delete_object(Bucket=self.bucket_name, Key=object_key)
+
+    def _sign(self, object_key: str, ttl: int) -> str:
+        return self.client().generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket_name, "Key": object_key}, ExpiresIn=ttl
+        )
+
+    def signed_url(self, object_key: str) -> tuple[str, int]:
+        return self._signed.get(object_key)
+
+
+def _local_backend() -> TicketStorage:
+    return LocalTicketStorage(settings.TICKET_LOCAL_DIR, sharded=settings.TICKET_LOCAL_SHARDED)
+
+
+def _gcs_backend() -> TicketStorage:
+    return GcsTicketStorage(settings.GCS_BUCKET_NAME, settings.TICKET_SIGNED_URL_TTL_SECONDS)
+
+
+def _s3_backend() -> TicketStorage:
+    return S3TicketStorage(
+        bucket_name=settings.S3_BUCKET_NAME,
+        endpoint_url=settings.S3_ENDPOINT_URL,
+        region=settings.S3_REGION,
+        access_key_id=settings.S3_ACCESS_KEY_ID,
+        secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+        max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+        multipart_threshold_mb=settings.S3_MULTIPART_THRESHOLD_MB,
+        signed_url_ttl=settings.TICKET_SIGNED_URL_TTL_SECONDS,
+    )
+
+
+_factories: dict[str, Callable[[], TicketStorage]] = {
+    "local": _local_backend,
+    "gcs": _gcs_backend,
+    "s3": _s3_backend,
+}
+_backends: dict[str, TicketStorage] = {}
+_backends_lock = threading.Lock()
+
+
+def register_ticket_storage(name: str, factory: Callable[[], TicketStorage]) -> None:
+    """Add (or replace) a backend; bookings store `name` in ticket_storage to find it again."""
+    with _backends_lock:
+        _factories[name] = factory
+        _backends.pop(name, None)
+
+
+def get_ticket_storage(name: str | None = None) -> TicketStorage:
+    """Process-wide backend by name; default is the one new tickets are written to."""
+    name = name or default_backend_name()
+    backend = _backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                factory = _factories.get(name)
+                if factory is None:
+                    raise TicketStorageUnavailable(f"unknown ticket storage {name!r}")
+                backend = _backends[name] = factory()
+    return backend
+
+
+def default_backend_name() -> str:
+    """TICKET_STORAGE_BACKEND, or gcs when a bucket and credentials are configured, else local."""
+    configured = (settings.TICKET_STORAGE_BACKEND or "").strip().lower()
+    if configured:
+        return configured
+    return "gcs" if settings.GCS_BUCKET_NAME and settings.GOOGLE_APPLICATION_CREDENTIALS else "local"
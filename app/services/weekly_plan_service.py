@@ -13,9 +13,9 @@ from types import SimpleNamespace
 from sqlalchemy.orm import Session
 
 from app.models.route import Route
-from app.models.time_entry import TimeEntry
 from app.schemas.ops import WeeklyPlanImportRequest, WeeklyPlanImportResponse, WeeklyPlanLeg
 from app.services.settings_service import get_usd_to_tzs_rate
+from app.services.inventory_service import insert_time_entries
 
 
 # Location code -> display label (used in routes and UI)
@@ -93,6 +93,41 @@ def get_or_create_route(
     return r, True
 
 
+def get_or_create_routes(db: Session, pairs: List[Tuple[str, str]]) -> Tuple[dict, int]:
+    """Bulk get_or_create_route: one query for all (from_label, to_label) pairs. Returns ({pair: Route}, created)."""
+    pairs = list(dict.fromkeys(pairs))
+    if not pairs:
+        return {}, 0
+    by_pair = {}
+    existing = (
+        db.query(Route)
+        .filter(
+            Route.from_label.in_({p[0] for p in pairs}),
+            Route.to_label.in_({p[1] for p in pairs}),
+        )
+        .all()
+    )
+    for r in existing:
+        by_pair.setdefault((r.from_label, r.to_label), r)
+    created = 0
+    for from_label, to_label in pairs:
+        if (from_label, to_label) in by_pair:
+            continue
+        r = Route(
+            id=str(uuid.uuid4()),
+            from_label=from_label,
+            to_label=to_label,
+            region="Tanzania",
+            main_region=get_main_region_for_label(from_label),
+        )
+        db.add(r)
+        by_pair[(from_label, to_label)] = r
+        created += 1
+    if created:
+        db.flush()
+    return by_pair, created
+
+
 # 5H-FSA preset (0=Mon..6=Sun per schema). Transport legs only; scenic (same-place) legs removed.
 DEFAULT_PLAN_5H_FSA_LEGS = [
     # Monday: transport JNIA→AAKI, transport AAKI→JNIA
@@ -144,11 +179,10 @@ def _end_time(start_hhmm: str, dur_min: int) -> str:
 
 def import_weekly_plan(db: Session, body: WeeklyPlanImportRequest) -> WeeklyPlanImportResponse:
     """
-    Create routes (if needed) and time entries for the given week.
+    Create routes (if needed) and time entries for the given week (or body.weeks consecutive weeks).
     week_start_date is Monday (YYYY-MM-DD). day_of_week in legs: 0=Mon .. 6=Sun.
+    Existing slots (same route/date/start) are skipped; all weeks are written in one bulk insert.
     """
-    routes_created = 0
-    time_entries_created = 0
     errors: List[str] = []
 
     try:
@@ -175,6 +209,7 @@ def import_weekly_plan(db: Session, body: WeeklyPlanImportRequest) -> WeeklyPlan
     tzs_rate = get_usd_to_tzs_rate(db)
     price_tzs = body.default_price_usd * tzs_rate
 
+    resolved = []
     for leg in legs:
         from_label = _resolve_label(leg.from_code)
         to_label = _resolve_label(leg.to_code)
@@ -185,41 +220,31 @@ def import_weekly_plan(db: Session, body: WeeklyPlanImportRequest) -> WeeklyPlan
         if not from_label or not to_label:
             errors.append(f"Unknown code: {leg.from_code} or {leg.to_code}")
             continue
-
-        route, created = get_or_create_route(db, from_label, to_label)
-        if created:
-            routes_created += 1
-        if not route:
-            continue
-
-        # date for this leg: Monday + day_of_week (0=Mon .. 6=Sun)
-        leg_date = week_start + timedelta(days=leg.day_of_week)
-        date_str = leg_date.isoformat()
-        end_time = _end_time(leg.start, leg.duration_minutes)
-
-        existing = (
-            db.query(TimeEntry)
-            .filter_by(route_id=route.id, date_str=date_str, start=leg.start)
-            .first()
-        )
-        if existing:
-            continue
-
-        db.add(
-            TimeEntry(
-                id=str(uuid.uuid4()),
-                route_id=route.id,
-                date_str=date_str,
-                start=leg.start,
-                end=end_time,
-                price_usd=body.default_price_usd,
-                price_tzs=price_tzs,
-                seats_available=body.default_capacity,
-                flight_no=f"{body.flight_no_prefix}{leg_date.strftime('%m%d')}",
-                cabin="Economy",
-            )
-        )
-        time_entries_created += 1
+        resolved.append((leg, from_label, to_label))
+
+    # One route lookup for all legs, then one existence query + bulk insert for all weeks
+    routes, routes_created = get_or_create_routes(db, [(f, t) for _, f, t in resolved])
+    rows = []
+    for week in range(max(1, body.weeks)):
+        monday = week_start + timedelta(days=7 * week)
+        for leg, from_label, to_label in resolved:
+            route = routes.get((from_label, to_label))
+            if not route:
+                continue
+            # date for this leg: Monday + day_of_week (0=Mon .. 6=Sun)
+            leg_date = monday + timedelta(days=leg.day_of_week)
+            rows.append({
+                "route_id": route.id,
+                "date_str": leg_date.isoformat(),
+                "start": leg.start,
+                "end": _end_time(leg.start, leg.duration_minutes),
+                "price_usd": body.default_price_usd,
+                "price_tzs": price_tzs,
+                "seats_available": body.default_capacity,
+                "flight_no": f"{body.flight_no_prefix}{leg_date.strftime('%m%d')}",
+                "cabin": "Economy",
+            })
+    time_entries_created = len(insert_time_entries(db, rows))
 
     return WeeklyPlanImportResponse(
         routes_created=routes_created,
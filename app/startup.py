@@ -0,0 +1,242 @@
+"""
+Container startup: wait for Postgres, then run migrations, the seed and the legacy slot cleanup,
+each only if it has not already run with the same inputs.
+
+Every api, worker and beat container runs this (entrypoint.sh, start_api.py). Each step has a
+fingerprint of its inputs, and startup_steps stores the fingerprint of its last completed run:
+
+- schema: the files in alembic/versions plus the revision in alembic_version, so both a new
+  migration and a manual downgrade count as a change
+- seed: app/seed.py, the weekly plan it installs, the bootstrap admin settings and the migrations
+- legacy_cleanup: the dates in LEGACY_SLOT_DATES
+
+When nothing changed, startup is one read of two small tables. Otherwise the container takes a
+Postgres advisory lock, checks again (another replica may have just finished the work) and runs
+only the steps still pending. Replicas that start meanwhile wait on the lock instead of migrating
+or seeding in parallel, then find every step current.
+
+STARTUP_FORCE=true reruns every step. CLEAN_UNUSED_SLOTS_ON_START=1 also deletes every slot
+without bookings, on each start while it is set (unset it after one run).
+
+    python -m app.startup
+"""
+import hashlib
+import hmac
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.models.startup_step import StartupStep
+
+ROOT = Path(__file__).resolve().parent.parent
+MIGRATIONS_DIR = ROOT / "alembic" / "versions"
+SEED_SOURCES = (ROOT / "app" / "seed.py", ROOT / "app" / "services" / "weekly_plan_service.py")
+
+# Legacy unused slots on specific dates only (Sat Feb 28, Mon Mar 9, Mon Mar 16, Mon Mar 30, Mon Apr 6)
+LEGACY_SLOT_DATES = (
+    "2024-02-28", "2024-03-09", "2024-03-16", "2024-03-30", "2024-04-06",
+    "2025-02-28", "2025-03-09", "2025-03-16", "2025-03-30", "2025-04-06",
+)
+
+STEPS = ("schema", "seed", "legacy_cleanup")
+LOCK_KEY = 0x666C7973756E  # pg_advisory_lock key ("flysun") shared by every replica
+
+
+def _log(msg: str) -> None:
+    print(f"[startup] {msg}", flush=True)
+
+
+def wait_for_db(timeout: float | None = None) -> None:
+    deadline = time.monotonic() + (settings.DB_WAIT_TIMEOUT if timeout is None else timeout)
+    while True:
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return
+        except OperationalError as e:
+            if time.monotonic() > deadline:
+                raise SystemExit(f"[startup] timed out waiting for the database: {e}")
+            time.sleep(1)
+
+
+def _digest(*parts: str | bytes) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        data = part.encode() if isinstance(part, str) else part
+        h.update(len(data).to_bytes(8, "big"))
+        h.update(data)
+    return h.hexdigest()
+
+
+def fingerprints(conn) -> dict[str, str]:
+    """Current fingerprint of each step's inputs (reads alembic_version)."""
+    try:
+        versions = sorted(conn.execute(text("SELECT version_num FROM alembic_version")).scalars())
+    except ProgrammingError:
+        conn.rollback()
+        versions = []
+    migrations = _digest(*(part for f in sorted(MIGRATIONS_DIR.glob("*.py")) for part in (f.name, f.read_bytes())))
+    # Keyed so the stored value says nothing about the admin password
+    admin = hmac.new(
+        settings.SECRET_KEY.encode(), f"{settings.ADMIN_EMAIL}\0{settings.ADMIN_INITIAL_PASSWORD}".encode(), hashlib.sha256,
+    ).hexdigest()
+    return {
+        "schema": _digest(migrations, *versions),
+        "seed": _digest(migrations, admin, *(f.read_bytes() for f in SEED_SOURCES)),
+        "legacy_cleanup": _digest(*LEGACY_SLOT_DATES),
+    }
+
+
+def completed(conn) -> dict[str, str]:
+    """{step: fingerprint of its last completed run}; empty before the startup_steps migration."""
+    try:
+        return dict(conn.execute(select(StartupStep.step, StartupStep.fingerprint)).all())
+    except ProgrammingError:
+        conn.rollback()
+        return {}
+
+
+def pending_steps() -> dict[str, str]:
+    """{step: fingerprint to record} for the steps whose inputs changed since their last run."""
+    with engine.connect() as conn:
+        current, done = fingerprints(conn), completed(conn)
+    return {s: current[s] for s in STEPS if settings.STARTUP_FORCE or done.get(s) != current[s]}
+
+
+def _record(step: str, fingerprint: str, duration_ms: int) -> None:
+    stmt = pg_insert(StartupStep).values(step=step, fingerprint=fingerprint, duration_ms=duration_ms, completed_at=func.now())
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[StartupStep.step],
+        set_={"fingerprint": stmt.excluded.fingerprint, "duration_ms": stmt.excluded.duration_ms, "completed_at": stmt.excluded.completed_at},
+    )
+    with engine.begin() as conn:
+        conn.execute(stmt)
+
+
+@contextmanager
+def startup_lock(timeout: float):
+    """Hold the startup advisory lock (session level, on a dedicated connection) for the block."""
+    conn = engine.connect()
+    acquired = waited = False
+    try:
+        deadline = time.monotonic() + timeout
+        while not conn.execute(select(func.pg_try_advisory_lock(LOCK_KEY))).scalar():
+            conn.rollback()
+            if time.monotonic() > deadline:
+                raise SystemExit(f"[startup] another replica held the startup lock for over {timeout:.0f}s")
+            if not waited:
+                _log("another replica is running startup steps; waiting for it")
+                waited = True
+            time.sleep(0.25)
+        acquired = True
+        # End the transaction so this connection holds no table locks while migrations run
+        conn.commit()
+        yield
+    finally:
+        try:
+            if acquired:
+                conn.execute(select(func.pg_advisory_unlock(LOCK_KEY)))
+                conn.commit()
+        except Exception:
+            conn.invalidate()  # closing the connection releases the lock
+        conn.close()
+
+
+def migrate() -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    cfg = Config(str(ROOT / "alembic.ini"))
+    cfg.set_main_option("script_location", str(ROOT / "alembic"))
+    cfg.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
+    command.upgrade(cfg, "head")
+    # Seed on fresh connections, not ones opened before the schema changed
+    engine.dispose()
+
+
+def seed() -> None:
+    from app.seed import run as run_seed
+
+    db = SessionLocal()
+    try:
+        run_seed(db)
+    finally:
+        db.close()
+
+
+def remove_legacy_slots() -> None:
+    from app.services.inventory_service import delete_unused_slots
+
+    db = SessionLocal()
+    try:
+        n = delete_unused_slots(db, date_strs=list(LEGACY_SLOT_DATES))
+        _log(f"removed {n} legacy slot(s) on {', '.join(LEGACY_SLOT_DATES)}")
+    finally:
+        db.close()
+
+
+def remove_unused_slots() -> None:
+    from app.services.inventory_service import delete_unused_slots
+
+    db = SessionLocal()
+    try:
+        n = delete_unused_slots(db, progress=lambda total: _log(f"... deleted {total}"))
+        _log(f"cleaned {n} unused slot(s)")
+    except Exception as e:
+        db.rollback()
+        _log(f"clean unused slots warning: {e}")
+    finally:
+        db.close()
+
+
+_RUNNERS = {"schema": migrate, "seed": seed, "legacy_cleanup": remove_legacy_slots}
+
+
+def run() -> None:
+    started = time.monotonic()
+    wait_for_db()
+    clean_unused = os.getenv("CLEAN_UNUSED_SLOTS_ON_START") == "1"
+    pending = pending_steps()
+    if not pending and not clean_unused:
+        _log(f"schema, seed and cleanup up to date ({(time.monotonic() - started) * 1000:.0f} ms)")
+        return
+
+    _log(f"pending: {', '.join(pending) or 'none'}; taking the startup lock")
+    with startup_lock(settings.STARTUP_LOCK_TIMEOUT):
+        for step in STEPS:
+            # Re-checked under the lock, one step at a time: the replica that held the lock before
+            # may have done it, and each step's inputs can change with the one before it
+            fingerprint = pending_steps().get(step)
+            if fingerprint is None:
+                _log(f"{step}: up to date")
+                continue
+            t0 = time.monotonic()
+            try:
+                _RUNNERS[step]()
+            except Exception as e:
+                if step != "legacy_cleanup":
+                    raise
+                # Cleanup is best effort; it is retried on the next start
+                _log(f"{step} warning: {e}")
+                continue
+            duration_ms = int((time.monotonic() - t0) * 1000)
+            # The schema fingerprint includes alembic_version, which the migration just changed
+            if step == "schema":
+                with engine.connect() as conn:
+                    fingerprint = fingerprints(conn)["schema"]
+            _record(step, fingerprint, duration_ms)
+            _log(f"{step}: done in {duration_ms} ms")
+        if clean_unused:
+            remove_unused_slots()
+    _log(f"finished in {(time.monotonic() - started):.1f}s")
+
+
+if __name__ == "__main__":
+    run()
@@ -1,6 +1,8 @@
 from urllib.parse import urlparse, urlunparse, parse_qs, urlencode
 
 from celery import Celery
+from celery.schedules import crontab
+from kombu import Exchange, Queue
 from app.core.config import settings
 
 
@@ -28,16 +30,53 @@ celery = Celery(
 
 celery.conf.timezone = "Africa/Dar_es_Salaam"
 
+# Queues, most urgent first. Each can have its own worker (docker compose --profile workers), so
+# a long email backlog or maintenance run never delays hold expiry or tickets:
+#   holds        expire_holds: frees seats every minute; short, must never wait behind anything
+#   tickets      ticket regeneration + notifications after flight-level ops changes
+#   email        queued/failed email retries (SMTP latency, can back up)
+#   maintenance  slot generation, log partitions: long, rare
+# A worker that consumes several queues (the default `worker` service) drains them in this order
+# (queue_order_strategy=priority). On Redis a lower priority number is served first.
+CELERY_QUEUES = ("holds", "tickets", "email", "maintenance")
+
+celery.conf.task_queues = [Queue(name, Exchange(name, type="direct"), routing_key=name) for name in CELERY_QUEUES]
+celery.conf.task_default_queue = "maintenance"
+celery.conf.task_routes = {
+    "app.tasks.jobs.expire_holds": {"queue": "holds", "priority": 0},
+    "app.tasks.jobs.deliver_flight_updates": {"queue": "tickets", "priority": 3},
+    "app.tasks.jobs.process_email_queue": {"queue": "email", "priority": 6},
+    "app.tasks.jobs.generate_slots": {"queue": "maintenance", "priority": 9},
+    "app.tasks.jobs.maintain_log_partitions": {"queue": "maintenance", "priority": 9},
+}
+celery.conf.broker_transport_options = {
+    "queue_order_strategy": "priority",
+    "priority_steps": list(range(10)),
+    "sep": ":",
+}
+# One message reserved per process: a slow task cannot sit on messages another process could run.
+# Dedicated workers override this per queue with --prefetch-multiplier (see docker-compose.yml).
+celery.conf.worker_prefetch_multiplier = 1
+# Periodic jobs ack on receipt (the next beat run retries anyway); one-off tasks set acks_late.
+celery.conf.task_acks_late = False
+
 # Slots are filled day-by-day by Ops via admin (Fill slots). No automatic slot generation.
 
+# expires: a run still queued when the next one is due is dropped instead of piling up
 celery.conf.beat_schedule = {
     "expire-holds-every-minute": {
         "task": "app.tasks.jobs.expire_holds",
         "schedule": 60.0,
+        "options": {"expires": 55},
     },
     "process-email-queue-every-2-minutes": {
         "task": "app.tasks.jobs.process_email_queue",
         "schedule": 120.0,
         "kwargs": {"limit": 50},
+        "options": {"expires": 115},
+    },
+    "maintain-log-partitions-daily": {
+        "task": "app.tasks.jobs.maintain_log_partitions",
+        "schedule": crontab(hour=3, minute=15),
     },
 }
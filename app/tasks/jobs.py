@@ -1,15 +1,34 @@
+from app.core.job_lock import singleton_job
 from app.tasks.celery_app import celery
 from app.tasks import worker_jobs
 
-@celery.task(name="app.tasks.jobs.expire_holds")
+# Lease: a killed worker's lock frees up within one lease. overrun_after: the beat interval (celery_app) or an alert threshold.
+@celery.task(name="app.tasks.jobs.expire_holds", soft_time_limit=45, time_limit=55)
+@singleton_job("expire_holds", lease_seconds=30, overrun_after=60)
 def expire_holds():
     return worker_jobs.expire_holds()
 
 @celery.task(name="app.tasks.jobs.generate_slots")
+@singleton_job("generate_slots", lease_seconds=120)
 def generate_slots():
     return worker_jobs.generate_slots()
 
 
 @celery.task(name="app.tasks.jobs.process_email_queue")
+@singleton_job("process_email_queue", lease_seconds=60, overrun_after=120)
 def process_email_queue(limit: int = 50):
     return worker_jobs.process_email_queue(limit=limit)
+
+
+@celery.task(name="app.tasks.jobs.maintain_log_partitions")
+@singleton_job("maintain_log_partitions", lease_seconds=300, overrun_after=3600)
+def maintain_log_partitions():
+    return worker_jobs.maintain_log_partitions()
+
+
+@celery.task(name="app.tasks.jobs.deliver_flight_updates", acks_late=True, reject_on_worker_lost=True, ignore_result=True)
+def deliver_flight_updates(booking_ids: list[str], email_ids: list[str]):
+    # Idempotent (tickets already generated and emails already sent are skipped), so redelivery is safe
+    from app.services.flight_ops_service import deliver_flight_updates as deliver
+    deliver(booking_ids, email_ids)
+    return {"tickets": len(booking_ids), "emails": len(email_ids)}
@@ -0,0 +1,515 @@
+"""
+Booking funnel load test / benchmark.
+
+Drives the public funnel end to end against a real API process and a local Postgres:
+origins -> calendar -> time-entries -> create booking -> Selcom create-order -> Selcom webhook
+-> ticket download. Selcom is replaced by a fake HTTP server and email by an SMTP sink, both
+started in-process, so the run is reproducible and never touches real gateways.
+
+Also runs a seat-contention scenario: many concurrent bookings on one slot of small capacity,
+checking that exactly `capacity` succeed and the slot is never oversold.
+
+    DATABASE_URL=postgresql+psycopg2://... python scripts/bench_booking_funnel.py
+    python scripts/bench_booking_funnel.py --users 16 --iterations 10 --workers 2 --json out.json
+    python scripts/bench_booking_funnel.py --baseline bench_baseline.json --max-regression 0.25
+
+Reports p50/p95/p99 latency and throughput per step. Exits 1 when a gate fails (error rate,
+oversell, or p95 regression against --baseline), so it can gate releases. Bench data (routes,
+slots, bookings, users, emails) is tagged with a run id and deleted at the end unless --keep.
+"""
+import argparse
+import base64
+import json
+import os
+import shutil
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import requests  # noqa: E402
+
+FUNNEL_STEPS = ("origins", "calendar", "time_entries", "create_booking", "create_order", "webhook", "ticket")
+BENCH_PHONE = "0712345678"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# -------------------------
+# Fake Selcom gateway + SMTP sink
+# -------------------------
+class _FakeSelcomHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self.latency:
+            time.sleep(self.latency)
+        order_id = body.get("order_id", "")
+        url = f"https://fake-selcom.local/pay/{order_id}"
+        out = json.dumps({
+            "reference": uuid.uuid4().hex[:12],
+            "resultcode": "000",
+            "result": "SUCCESS",
+            "message": "Order creation successful",
+            "data": [{"payment_gateway_url": base64.b64encode(url.encode()).decode()}],
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def log_message(self, *args):
+        pass
+
+
+class _SmtpSinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for smtplib.send_message; counts messages, discards content."""
+
+    def handle(self):
+        self.wfile.write(b"220 bench ESMTP\r\n")
+        in_data = False
+        for line in self.rfile:
+            if in_data:
+                if line.rstrip(b"\r\n") == b".":
+                    in_data = False
+                    self.server.messages += 1
+                    self.wfile.write(b"250 OK\r\n")
+                continue
+            cmd = line[:4].upper()
+            if cmd in (b"EHLO", b"HELO"):
+                self.wfile.write(b"250 bench\r\n")
+            elif cmd == b"DATA":
+                in_data = True
+                self.wfile.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+            elif cmd == b"QUIT":
+                self.wfile.write(b"221 Bye\r\n")
+                return
+            else:
+                self.wfile.write(b"250 OK\r\n")
+
+
+class _SmtpSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    messages = 0
+
+
+def start_fakes(selcom_latency_ms: int):
+    _FakeSelcomHandler.latency = selcom_latency_ms / 1000.0
+    selcom = ThreadingHTTPServer(("127.0.0.1", _free_port()), _FakeSelcomHandler)
+    selcom.daemon_threads = True
+    smtp = _SmtpSink(("127.0.0.1", _free_port()), _SmtpSinkHandler)
+    for srv in (selcom, smtp):
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return selcom, smtp
+
+
+# -------------------------
+# Bench data
+# -------------------------
+class BenchData:
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.origin = f"Bench Origin {run_id}"
+        self.route_id = f"bench-{run_id}-route"
+        self.contention_route_id = f"bench-{run_id}-contention"
+        self.dates: list[str] = []
+        self.contention_slot_id: str | None = None
+
+    def seed(self, days: int, slots_per_day: int, contention_capacity: int) -> None:
+        from app.db.session import SessionLocal
+        from app.models.route import Route
+        from app.services.inventory_service import insert_time_entries
+
+        start = datetime.now(timezone.utc).date() + timedelta(days=1)
+        self.dates = [(start + timedelta(days=i)).isoformat() for i in range(days)]
+        rows = []
+        for d in self.dates:
+            for i in range(slots_per_day):
+                hh = 7 + i * 2
+                rows.append({
+                    "route_id": self.route_id, "date_str": d, "start": f"{hh:02d}:00", "end": f"{hh + 1:02d}:00",
+                    "price_usd": 120 + i * 10, "price_tzs": None, "seats_available": 100000,
+                    "flight_no": f"BENCH{i}", "cabin": "Economy",
+                })
+        self.contention_slot_id = str(uuid.uuid4())
+        rows.append({
+            "id": self.contention_slot_id, "route_id": self.contention_route_id, "date_str": self.dates[0],
+            "start": "12:00", "end": "13:00", "price_usd": 150, "price_tzs": None,
+            "seats_available": contention_capacity, "flight_no": "BENCHC", "cabin": "Economy",
+        })
+        db = SessionLocal()
+        try:
+            db.add(Route(id=self.route_id, from_label=self.origin, to_label="Bench Destination", region="Tanzania", active=True))
+            db.add(Route(id=self.contention_route_id, from_label=f"{self.origin} C", to_label="Bench Destination", region="Tanzania", active=True))
+            db.flush()
+            insert_time_entries(db, rows)
+            db.commit()
+        finally:
+            db.close()
+
+    def contention_state(self) -> tuple[int, int, int]:
+        """(seats_available, bookings on the slot, seats booked) for the contention slot."""
+        from sqlalchemy import func
+        from app.db.session import SessionLocal
+        from app.models.booking import Booking
+        from app.models.time_entry import TimeEntry
+
+        db = SessionLocal()
+        try:
+            seats = db.query(TimeEntry.seats_available).filter(TimeEntry.id == self.contention_slot_id).scalar()
+            n, pax = db.query(func.count(Booking.id), func.coalesce(func.sum(Booking.pax), 0)).filter(
+                Booking.time_entry_id == self.contention_slot_id).one()
+            return int(seats), int(n), int(pax)
+        finally:
+            db.close()
+
+    def cleanup(self) -> None:
+        from sqlalchemy import text
+        from app.db.session import SessionLocal
+
+        db = SessionLocal()
+        params = {"routes": [self.route_id, self.contention_route_id], "email": f"bench+{self.run_id}%"}
+        try:
+            db.execute(text("""
+                CREATE TEMP TABLE _bench_bookings ON COMMIT DROP AS
+                SELECT b.id, b.booking_ref FROM bookings b JOIN time_entries t ON t.id = b.time_entry_id
+                WHERE t.route_id = ANY(:routes)
+            """), params)
+            for stmt in (
+                "DELETE FROM payments WHERE booking_id IN (SELECT id FROM _bench_bookings)",
+                "DELETE FROM passengers WHERE booking_id IN (SELECT id FROM _bench_bookings)",
+                "DELETE FROM email_logs WHERE related_booking_ref IN (SELECT booking_ref FROM _bench_bookings)",
+                "DELETE FROM audit_logs WHERE entity_type = 'booking' AND entity_id IN (SELECT booking_ref FROM _bench_bookings)",
+                "DELETE FROM bookings WHERE id IN (SELECT id FROM _bench_bookings)",
+                "DELETE FROM time_entries WHERE route_id = ANY(:routes)",
+                "DELETE FROM routes WHERE id = ANY(:routes)",
+                "DELETE FROM users WHERE email LIKE :email",
+            ):
+                db.execute(text(stmt), params)
+            db.commit()
+        finally:
+            db.close()
+
+
+# -------------------------
+# API process
+# -------------------------
+def start_api(port: int, workers: int, selcom_port: int, smtp_port: int, ticket_dir: str, quiet: bool = True) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update({
+        "SELCOM_BASE_URL": f"http://127.0.0.1:{selcom_port}/v1",
+        "SELCOM_API_KEY": "bench", "SELCOM_API_SECRET": "bench", "SELCOM_VENDOR": "BENCH",
+        "SMTP_HOST": "127.0.0.1", "SMTP_PORT": str(smtp_port), "SMTP_USERNAME": "", "SENDGRID_API_KEY": "",
+        "API_PUBLIC_URL": f"http://127.0.0.1:{port}", "CLIENT_BASE_URL": "http://127.0.0.1",
+        "TICKET_LOCAL_DIR": ticket_dir, "GCS_BUCKET_NAME": "", "PARTNERS_APP_URL": "",
+        "SQL_PROFILER_ENABLED": "false",
+    })
+    root = os.path.join(os.path.dirname(__file__), "..")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=root, env=env, stdout=subprocess.DEVNULL if quiet else None,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("API process exited during startup")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1).ok:
+                return proc
+        except requests.RequestException:
+            time.sleep(0.3)
+    proc.terminate()
+    raise RuntimeError("API did not become healthy within 60s")
+
+
+# -------------------------
+# Scenarios
+# -------------------------
+class Recorder:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.error_examples: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def timed(self, step: str, fn, *, ok=lambda r: r.ok):
+        t0 = time.perf_counter()
+        try:
+            r = fn()
+        except requests.RequestException as e:
+            r, exc = None, e
+        else:
+            exc = None
+        elapsed = time.perf_counter() - t0
+        good = r is not None and ok(r)
+        with self._lock:
+            if good:
+                self.samples[step].append(elapsed)
+            else:
+                self.errors[step] += 1
+                self.error_examples.setdefault(step, str(exc) if exc else f"{r.status_code} {r.text[:200]}")
+        return r if good else None
+
+
+def run_funnel_user(base: str, data: BenchData, user_no: int, iterations: int, rec: Recorder, pax: int) -> None:
+    s = requests.Session()
+    api = f"{base}/api/v1"
+    for it in range(iterations):
+        date_str = data.dates[(user_no + it) % len(data.dates)]
+        if not rec.timed("origins", lambda: s.get(f"{api}/public/origins", timeout=30)):
+            continue
+        if not rec.timed("calendar", lambda: s.get(f"{api}/public/calendar-availability", timeout=30, params={
+                "from_label": data.origin, "start": data.dates[0], "end": data.dates[-1], "pax": pax})):
+            continue
+        r = rec.timed("time_entries", lambda: s.get(f"{api}/public/time-entries", timeout=30, params={
+            "dateStr": date_str, "from_label": data.origin}), ok=lambda r: r.ok and r.json().get("items"))
+        if not r:
+            continue
+        items = r.json()["items"]
+        slot = items[(user_no + it) % len(items)]
+        email = f"bench+{data.run_id}-{user_no}-{it}@example.com"
+        r = rec.timed("create_booking", lambda: s.post(f"{api}/public/bookings", timeout=30, json={
+            "timeEntryId": slot["id"], "pax": pax, "bookerEmail": email, "bookerName": f"Bench User{user_no}",
+            "passengers": [{"first": "Bench", "last": f"P{i}", "phone": BENCH_PHONE} for i in range(pax)],
+        }))
+        if not r:
+            continue
+        ref = r.json()["bookingRef"]
+        if not rec.timed("create_order", lambda: s.post(f"{api}/public/payments/selcom/create-order", timeout=30,
+                                                        json={"bookingRef": ref, "buyerPhone": BENCH_PHONE})):
+            continue
+        if not rec.timed("webhook", lambda: s.post(f"{api}/webhooks/selcom", timeout=60, json={
+                "order_id": ref, "transid": f"T{uuid.uuid4().hex[:10]}", "reference": ref,
+                "result": "SUCCESS", "resultcode": "000", "payment_status": "COMPLETED"})):
+            continue
+        rec.timed("ticket", lambda: s.get(f"{api}/public/bookings/{ref}/ticket", timeout=60),
+                  ok=lambda r: r.ok and r.content[:4] == b"%PDF")
+
+
+def run_contention(base: str, data: BenchData, clients: int, rec: Recorder) -> dict:
+    """`clients` concurrent single-seat bookings on one slot; only `capacity` may succeed."""
+    barrier = threading.Barrier(clients)
+    results = {"ok": 0, "sold_out": 0, "other": 0}
+    lock = threading.Lock()
+
+    def one(i: int):
+        s = requests.Session()
+        barrier.wait()
+        t0 = time.perf_counter()
+        try:
+            r = s.post(f"{base}/api/v1/public/bookings", timeout=60, json={
+                "timeEntryId": data.contention_slot_id, "pax": 1,
+                "bookerEmail": f"bench+{data.run_id}-c{i}@example.com", "bookerName": "Bench Contender",
+                "passengers": [{"first": "Bench", "last": f"C{i}", "phone": BENCH_PHONE}],
+            })
+            status, text = r.status_code, r.text
+        except requests.RequestException as e:
+            status, text = 0, str(e)
+        elapsed = time.perf_counter() - t0
+        with lock:
+            rec.samples["contention_booking"].append(elapsed)
+            if status == 200:
+                results["ok"] += 1
+            elif status == 400 and "not enough seats" in text:
+                results["sold_out"] += 1
+            else:
+                results["other"] += 1
+                rec.errors["contention_booking"] += 1
+                rec.error_examples.setdefault("contention_booking", f"{status} {text[:200]}")
+
+    threads = [threading.Thread(target=one, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+# -------------------------
+# Reporting / gates
+# -------------------------
+def percentile(sorted_vals: list[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+def summarize(rec: Recorder, wall: float) -> dict:
+    out = {}
+    for step in list(FUNNEL_STEPS) + ["contention_booking"]:
+        vals = sorted(rec.samples.get(step, []))
+        n, errors = len(vals), rec.errors.get(step, 0)
+        if not n and not errors:
+            continue
+        out[step] = {
+            "count": n,
+            "errors": errors,
+            "p50_ms": round(percentile(vals, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(vals, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(vals, 0.99) * 1000, 2),
+            "mean_ms": round(sum(vals) / n * 1000, 2) if n else 0.0,
+            "throughput_rps": round(n / wall, 2) if wall and step != "contention_booking" else None,
+        }
+    return out
+
+
+def print_table(steps: dict) -> None:
+    print(f"{'step':<20}{'count':>7}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+    for step, s in steps.items():
+        rps = "" if s["throughput_rps"] is None else f"{s['throughput_rps']:.1f}"
+        print(f"{step:<20}{s['count']:>7}{s['errors']:>6}{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}{rps:>9}")
+
+
+def check_gates(report: dict, baseline: dict | None, max_regression: float, max_error_rate: float) -> list[str]:
+    failures = []
+    for step, s in report["steps"].items():
+        total = s["count"] + s["errors"]
+        if step != "contention_booking" and total and s["errors"] / total > max_error_rate:
+            failures.append(f"{step}: error rate {s['errors']}/{total} above {max_error_rate:.0%}")
+    c = report.get("contention")
+    if c:
+        if c["oversold"]:
+            failures.append(f"contention: slot oversold ({c})")
+        if c["succeeded"] != c["capacity"] and c["clients"] >= c["capacity"]:
+            failures.append(f"contention: {c['succeeded']} bookings succeeded for capacity {c['capacity']}")
+        if c["other_errors"]:
+            failures.append(f"contention: {c['other_errors']} unexpected errors")
+    for step, base in ((baseline or {}).get("steps") or {}).items():
+        cur = report["steps"].get(step)
+        if not cur or not base.get("p95_ms"):
+            continue
+        limit = base["p95_ms"] * (1 + max_regression)
+        if cur["p95_ms"] > limit:
+            failures.append(f"{step}: p95 {cur['p95_ms']}ms > baseline {base['p95_ms']}ms +{max_regression:.0%}")
+    return failures
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--users", type=int, default=8, help="concurrent funnel users")
+    ap.add_argument("--iterations", type=int, default=5, help="funnel runs per user")
+    ap.add_argument("--pax", type=int, default=1)
+    ap.add_argument("--days", type=int, default=14, help="bookable days seeded")
+    ap.add_argument("--slots-per-day", type=int, default=4)
+    ap.add_argument("--contention-clients", type=int, default=40, help="0 disables the contention scenario")
+    ap.add_argument("--contention-capacity", type=int, default=5)
+    ap.add_argument("--workers", type=int, default=1, help="uvicorn workers for the API under test")
+    ap.add_argument("--base-url", default="", help="use an already running API (must point at the fakes itself)")
+    ap.add_argument("--selcom-latency-ms", type=int, default=0, help="simulated gateway latency")
+    ap.add_argument("--json", dest="json_out", default="", help="write the report as JSON")
+    ap.add_argument("--baseline", default="", help="JSON report of a previous run to compare p95 against")
+    ap.add_argument("--max-regression", type=float, default=0.25, help="allowed p95 growth vs baseline")
+    ap.add_argument("--max-error-rate", type=float, default=0.0)
+    ap.add_argument("--keep", action="store_true", help="keep bench data in the database")
+    ap.add_argument("--api-output", action="store_true", help="show the API process stdout")
+    args = ap.parse_args()
+
+    run_id = uuid.uuid4().hex[:8]
+    data = BenchData(run_id)
+    selcom, smtp = start_fakes(args.selcom_latency_ms)
+    ticket_dir = tempfile.mkdtemp(prefix="bench-tickets-")
+    proc = None
+    try:
+        data.seed(args.days, args.slots_per_day, args.contention_capacity)
+        if args.base_url:
+            base = args.base_url.rstrip("/")
+            print(f"using running API {base}; point SELCOM_BASE_URL at http://127.0.0.1:{selcom.server_address[1]}/v1 "
+                  f"and SMTP at 127.0.0.1:{smtp.server_address[1]}")
+        else:
+            port = _free_port()
+            proc = start_api(port, args.workers, selcom.server_address[1], smtp.server_address[1], ticket_dir,
+                             quiet=not args.api_output)
+            base = f"http://127.0.0.1:{port}"
+        print(f"run {run_id}: {args.users} users x {args.iterations} iterations against {base}")
+
+        rec = Recorder()
+        t0 = time.perf_counter()
+        users = [threading.Thread(target=run_funnel_user, args=(base, data, u, args.iterations, rec, args.pax))
+                 for u in range(args.users)]
+        for t in users:
+            t.start()
+        for t in users:
+            t.join()
+        wall = time.perf_counter() - t0
+
+        contention = None
+        if args.contention_clients > 0:
+            res = run_contention(base, data, args.contention_clients, rec)
+            seats_left, n_bookings, seats_booked = data.contention_state()
+            contention = {
+                "clients": args.contention_clients,
+                "capacity": args.contention_capacity,
+                "succeeded": res["ok"],
+                "sold_out": res["sold_out"],
+                "other_errors": res["other"],
+                "seats_left": seats_left,
+                "bookings_in_db": n_bookings,
+                "oversold": seats_left < 0 or seats_booked > args.contention_capacity or n_bookings != res["ok"],
+            }
+
+        report = {
+            "run_id": run_id,
+            "at": datetime.now(timezone.utc).isoformat(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("json_out", "baseline")},
+            "wall_seconds": round(wall, 3),
+            "funnels_completed": len(rec.samples.get("ticket", [])),
+            "funnels_per_second": round(len(rec.samples.get("ticket", [])) / wall, 2) if wall else 0.0,
+            "emails_received": smtp.messages,
+            "steps": summarize(rec, wall),
+            "contention": contention,
+        }
+        print_table(report["steps"])
+        print(f"funnels completed: {report['funnels_completed']} in {wall:.1f}s ({report['funnels_per_second']}/s), "
+              f"emails: {smtp.messages}")
+        if contention:
+            print(f"contention: {contention}")
+        for step, example in rec.error_examples.items():
+            print(f"first {step} error: {example}")
+
+        baseline = None
+        if args.baseline:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        if args.json_out:
+            with open(args.json_out, "w") as f:
+                json.dump(report, f, indent=2)
+        failures = check_gates(report, baseline, args.max_regression, args.max_error_rate)
+        for msg in failures:
+            print(f"GATE FAILED: {msg}")
+        return 1 if failures else 0
+    finally:
+        if proc:
+            proc.terminate()
+            try:
+                proc.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        selcom.shutdown()
+        smtp.shutdown()
+        if not args.keep:
+            data.cleanup()
+        shutil.rmtree(ticket_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
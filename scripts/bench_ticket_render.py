@@ -0,0 +1,214 @@
+"""
+Ticket rendering microbenchmark and profiling harness.
+
+Times the two PDF paths of app.services.ticket_service (PyMuPDF template overlay and the reportlab
+drawn layout), the drawn footer artwork on its own, and QR generation (PNG and vector, uncached);
+reports PDF sizes. No database or network is needed.
+
+    python scripts/bench_ticket_render.py
+    python scripts/bench_ticket_render.py --iterations 200 --json ticket_bench.json
+    python scripts/bench_ticket_render.py --baseline ticket_bench.json --max-slowdown 1.5
+    python scripts/bench_ticket_render.py --case drawn --profile cprofile --profile-out drawn.prof
+    python scripts/bench_ticket_render.py --case template --profile pyinstrument --profile-out template.html
+
+With --baseline, exits 1 if any case's median is more than --max-slowdown times the baseline
+median (default 1.5, so a change that doubles render time fails).
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+# Settings require these; rendering never connects to the database
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ.setdefault("DATABASE_URL", "postgresql+psycopg2://bench@localhost/bench")
+
+from app.services import ticket_service  # noqa: E402
+
+SAMPLE_TICKET = dict(
+    booking_ref="FSB-BENCH1",
+    passenger_name="Amina Mwakyusa",
+    passenger_phone="+255712345678",
+    booker_email="amina@example.com",
+    route_from="Dar es Salaam Airport",
+    route_to="Zanzibar Airport",
+    date_str="2026-11-02",
+    start_time="09:30",
+    end_time="10:00",
+    pax=2,
+    flight_no="FSB1102",
+    experience="Scenic Flight",
+    aircraft_type="Cessna 208 Caravan",
+    departure_location="Terminal 1",
+    amount_usd=298,
+    amount_tzs=730100,
+    currency="USD",
+)
+
+
+def _ticket(paid: bool) -> dict:
+    return {**SAMPLE_TICKET, "payment_status": "paid" if paid else "unpaid"}
+
+
+def _footer_only() -> bytes:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    ticket_service._draw_flysunbird_footer_design(c, 40, A4[0] - 40, 0, 50)
+    c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def _qr_png_cold(url: str, box_size: int, border: int) -> bytes:
+    # QR helpers are cached per URL; clear them so the case measures a first render
+    ticket_service._make_qr_image_bytes.cache_clear()
+    ticket_service._qr_matrix.cache_clear()
+    return ticket_service._make_qr_image_bytes(url, box_size=box_size, border=border)
+
+
+def _qr_vector_cold(url: str) -> bytes:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+
+    ticket_service._qr_matrix.cache_clear()
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    ticket_service._draw_qr_vector(c, url, 400, 400, 80, border=1)
+    c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def build_cases(paid: bool) -> dict:
+    """name -> zero-arg callable returning bytes."""
+    url = ticket_service._ticket_url(SAMPLE_TICKET["booking_ref"])
+    cases = {
+        "drawn": lambda: ticket_service._render_ticket_pdf_drawn(**_ticket(paid)),
+        "footer_design": _footer_only,
+        "qr_box3": lambda: _qr_png_cold(url, 3, 2),
+        "qr_box2": lambda: _qr_png_cold(url, 2, 1),
+        "qr_vector": lambda: _qr_vector_cold(url),
+    }
+    if ticket_service._resolve_ticket_template_path():
+        cases = {"template": lambda: ticket_service._render_ticket_pdf_from_template(**_ticket(paid)), **cases}
+    return cases
+
+
+def time_case(fn, iterations: int, warmup: int) -> dict:
+    out = b""
+    for _ in range(warmup):
+        out = fn()
+    samples = []
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        out = fn()
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    median = statistics.median(samples)
+    return {
+        "iterations": iterations,
+        "median_ms": round(median * 1000, 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+        "min_ms": round(samples[0] * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "ops_per_s": round(1 / median, 1) if median else None,
+        "output_bytes": len(out or b""),
+    }
+
+
+def profile_case(fn, iterations: int, tool: str, out_path: str) -> None:
+    if tool == "cprofile":
+        import cProfile
+        import pstats
+
+        prof = cProfile.Profile()
+        prof.enable()
+        for _ in range(iterations):
+            fn()
+        prof.disable()
+        if out_path:
+            prof.dump_stats(out_path)
+            print(f"cProfile stats written to {out_path} (view with snakeviz or python -m pstats)")
+        pstats.Stats(prof).sort_stats("cumulative").print_stats(25)
+        return
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        raise SystemExit("pyinstrument is not installed: pip install pyinstrument (or use --profile cprofile)")
+    profiler = Profiler()
+    profiler.start()
+    for _ in range(iterations):
+        fn()
+    profiler.stop()
+    if out_path:
+        with open(out_path, "w") as f:
+            f.write(profiler.output_html() if out_path.endswith(".html") else profiler.output_text(unicode=True))
+        print(f"pyinstrument report written to {out_path}")
+    print(profiler.output_text(unicode=True, color=False))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--case", action="append", help="case(s) to run (default: all); see --list")
+    ap.add_argument("--list", action="store_true", help="list available cases")
+    ap.add_argument("--iterations", type=int, default=50)
+    ap.add_argument("--warmup", type=int, default=3)
+    ap.add_argument("--unpaid", action="store_true", help="render the unpaid variant (bank details block)")
+    ap.add_argument("--profile", choices=("cprofile", "pyinstrument"), help="profile the selected case(s) instead of timing")
+    ap.add_argument("--profile-out", default="", help="file for profiler output (.prof for cProfile, .html/.txt for pyinstrument)")
+    ap.add_argument("--json", dest="json_out", default="", help="write results as JSON")
+    ap.add_argument("--baseline", default="", help="JSON results of a previous run to compare against")
+    ap.add_argument("--max-slowdown", type=float, default=1.5, help="fail if median > baseline median x this")
+    args = ap.parse_args()
+
+    cases = build_cases(paid=not args.unpaid)
+    if args.list:
+        print("\n".join(cases))
+        return 0
+    selected = args.case or list(cases)
+    unknown = [c for c in selected if c not in cases]
+    if unknown:
+        print(f"unknown case(s): {', '.join(unknown)}; available: {', '.join(cases)}")
+        return 2
+
+    if args.profile:
+        for name in selected:
+            print(f"== {name} ({args.iterations} iterations, {args.profile})")
+            out = args.profile_out
+            if out and len(selected) > 1:
+                root, ext = os.path.splitext(out)
+                out = f"{root}.{name}{ext}"
+            profile_case(cases[name], args.iterations, args.profile, out)
+        return 0
+
+    results = {name: time_case(cases[name], args.iterations, args.warmup) for name in selected}
+    print(f"{'case':<16}{'median ms':>11}{'p95 ms':>10}{'min ms':>10}{'ops/s':>9}{'bytes':>10}")
+    for name, r in results.items():
+        print(f"{name:<16}{r['median_ms']:>11.2f}{r['p95_ms']:>10.2f}{r['min_ms']:>10.2f}{r['ops_per_s'] or 0:>9.1f}{r['output_bytes']:>10}")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump({"paid": not args.unpaid, "cases": results}, f, indent=2)
+
+    failures = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            base = json.load(f).get("cases", {})
+        for name, r in results.items():
+            b = base.get(name)
+            if b and b.get("median_ms") and r["median_ms"] > b["median_ms"] * args.max_slowdown:
+                failures.append(f"{name}: median {r['median_ms']}ms > {args.max_slowdown}x baseline {b['median_ms']}ms")
+    for msg in failures:
+        print(f"REGRESSION: {msg}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Import-time budget for the API: how long a fresh interpreter takes to import app.main.
+
+Every new API container pays this before it can serve, so it is checked like a test. Each run
+starts a new `python -X importtime -c "import app.main"` (after one unmeasured run that writes
+bytecode, as the image build would), and the median cumulative time of app.main is compared
+with the budget. The check also fails if a cold import loads any module in LAZY_MODULES: PDF,
+QR, storage, payment and HTTP clients, Redis and Celery are imported where they are first
+used, not at startup. The output names the app module that pulled one in. Exits 1 on failure.
+
+    python scripts/check_import_time.py
+    python scripts/check_import_time.py --budget-ms 1500 --runs 7 --top 25
+    IMPORT_BUDGET_MS=800 python scripts/check_import_time.py
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Heavy or optional dependencies that must only be imported on first use
+LAZY_MODULES = (
+    "reportlab",
+    "qrcode",
+    "PIL",
+    "fitz",
+    "google.cloud.storage",
+    "boto3",
+    "botocore",
+    "selcom_apigw_client",
+    "requests",
+    "redis",
+    "celery",
+    "kombu",
+)
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def import_profile(module: str) -> tuple[list[tuple[int, int, int, str]], float]:
+    """(self_us, cumulative_us, depth, name) per imported module, in -X importtime order, and wall seconds."""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")]))}
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - t0
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            rows.append((int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2, m.group(4)))
+    return rows, wall
+
+
+def importer_chain(rows: list[tuple[int, int, int, str]], i: int) -> list[str]:
+    """Modules that (transitively) imported rows[i], innermost first. -X importtime lists children before parents."""
+    chain, depth = [], rows[i][2]
+    for _, _, d, name in rows[i + 1:]:
+        if d < depth:
+            chain.append(name)
+            depth = d
+    return chain
+
+
+def lazy_violations(rows: list[tuple[int, int, int, str]]) -> list[str]:
+    found = []
+    for i, (_, _, _, name) in enumerate(rows):
+        hit = next((m for m in LAZY_MODULES if name == m or name.startswith(m + ".")), None)
+        if hit is None or any(v.startswith(hit + " ") for v in found):
+            continue
+        # Report the first app module on the way up: that is where the import should move
+        via = next((m for m in importer_chain(rows, i) if m.startswith("app.")), "?")
+        found.append(f"{hit} (imported via {via})")
+    return found
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--module", default="app.main")
+    ap.add_argument("--budget-ms", type=float, default=float(os.environ.get("IMPORT_BUDGET_MS", 1000)))
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=15, help="packages to list by import time (0 = none)")
+    args = ap.parse_args()
+
+    import_profile(args.module)  # writes __pycache__; not measured
+    totals, walls, rows = [], [], []
+    for _ in range(max(args.runs, 1)):
+        rows, wall = import_profile(args.module)
+        total = next((cum for _, cum, d, name in rows if name == args.module and d == 0), None)
+        if total is None:
+            raise SystemExit(f"{args.module} not found in -X importtime output")
+        totals.append(total / 1000)
+        walls.append(wall * 1000)
+
+    median = statistics.median(totals)
+    print(f"import {args.module}: median {median:.0f} ms over {len(totals)} runs "
+          f"(min {min(totals):.0f}, max {max(totals):.0f}; process wall median {statistics.median(walls):.0f} ms)")
+
+    if args.top:
+        by_package: dict[str, int] = defaultdict(int)
+        for self_us, _, _, name in rows:
+            by_package[name.split(".")[0]] += self_us
+        print("self time by top-level package (last run):")
+        for name, us in sorted(by_package.items(), key=lambda kv: -kv[1])[:args.top]:
+            print(f"  {name:<28} {us / 1000:>8.1f} ms")
+
+    failed = False
+    for v in lazy_violations(rows):
+        print(f"FAIL lazy module imported at startup: {v}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL {median:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if failed:
+        return 1
+    print(f"OK: within {args.budget_ms:.0f} ms, no lazy modules imported")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+EXPLAIN regression checks for the hot public and ops queries on time_entries / bookings.
+
+Runs EXPLAIN (FORMAT JSON) on the same queries the API builds (app.services.availability_service)
+and fails if a query stops using its expected index or falls back to a Seq Scan on a large table.
+
+By default a synthetic inventory is seeded inside a transaction (rolled back at the end), so it is
+safe to run against a dev database:
+
+    DATABASE_URL=postgresql+psycopg2://... python scripts/explain_hot_queries.py
+    python scripts/explain_hot_queries.py --no-seed      # plan against the data already there
+    python scripts/explain_hot_queries.py --routes 80 --days 365 --verbose
+
+Exit code 0 = all checks pass, 1 = at least one regression.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import func, text  # noqa: E402
+from sqlalchemy.dialects import postgresql  # noqa: E402
+
+from app.db.session import SessionLocal  # noqa: E402
+from app.models.booking import Booking  # noqa: E402
+from app.models.time_entry import TimeEntry  # noqa: E402
+from app.services.availability_service import (  # noqa: E402
+    public_slots_query,
+    calendar_min_price_query,
+    slot_dates_query,
+)
+
+SEED_ORIGIN = "Explain Check Origin"
+
+# Below this many time entries the planner rightly prefers seq scans; --no-seed runs are then informational only
+MIN_ROWS_FOR_CHECKS = 10000
+
+SEED_SQL = """
+INSERT INTO routes (id, from_label, to_label, main_region, region, active, created_at)
+SELECT 'explain-route-' || r, :origin, 'Destination ' || r, 'MAINLAND', 'Tanzania', true, now()
+FROM generate_series(1, :routes) AS r;
+
+INSERT INTO time_entries (id, route_id, date_str, start, "end", price_usd, price_tzs, seats_available,
+                          flight_no, cabin, visibility, status, currency, base_price_usd, created_at)
+SELECT 'explain-te-' || r || '-' || d || '-' || t,
+       'explain-route-' || r,
+       to_char(:start_day + d, 'YYYY-MM-DD'),
+       to_char(time '06:00' + t * interval '90 minutes', 'HH24:MI'),
+       to_char(time '07:00' + t * interval '90 minutes', 'HH24:MI'),
+       100 + (r * 7 + d) % 150, NULL, (r + d + t) % 6,
+       'FSB', 'Economy',
+       CASE WHEN (r + d) % 17 = 0 THEN 'HIDDEN' ELSE 'PUBLIC' END,
+       CASE WHEN (r + d + t) % 23 = 0 THEN 'DRAFT' ELSE 'PUBLISHED' END,
+       'USD', 0, now()
+FROM generate_series(1, :routes) AS r, generate_series(0, :days - 1) AS d, generate_series(0, :times - 1) AS t;
+
+INSERT INTO bookings (id, booking_ref, time_entry_id, user_id, status, payment_status, pax, currency,
+                      unit_price_usd, unit_price_tzs, total_usd, total_tzs, created_by_role,
+                      ticket_storage, ticket_status, created_at)
+SELECT 'explain-bk-' || b, 'EXP' || lpad(b::text, 8, '0'), 'explain-te-1-0-0', 'explain-user', 'CONFIRMED', 'paid',
+       1, 'USD', 100, 0, 100, 0, 'USER', 'local', 'none', now() - (b || ' minutes')::interval
+FROM generate_series(1, :bookings) AS b;
+
+ANALYZE routes;
+ANALYZE time_entries;
+ANALYZE bookings;
+"""
+
+
+def _sql(query) -> str:
+    stmt = getattr(query, "statement", query)
+    return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def _walk(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk(child)
+
+
+def explain(db, query) -> dict:
+    row = db.execute(text("EXPLAIN (FORMAT JSON) " + _sql(query))).scalar()
+    doc = row if isinstance(row, list) else json.loads(row)
+    return doc[0]["Plan"]
+
+
+def check(db, name: str, query, expect_index, no_seq_scan_on=("time_entries", "bookings"), verbose=False) -> bool:
+    """expect_index: index name, or a tuple of acceptable index names."""
+    expected = {expect_index} if isinstance(expect_index, str) else set(expect_index)
+    plan = explain(db, query)
+    nodes = list(_walk(plan))
+    used = {n.get("Index Name") for n in nodes if n.get("Index Name")}
+    seq = {n.get("Relation Name") for n in nodes if n.get("Node Type") == "Seq Scan"}
+    problems = []
+    if not expected & used:
+        problems.append(f"expected index {' or '.join(sorted(expected))}, plan used {sorted(used) or 'no index'}")
+    bad_seq = sorted(seq & set(no_seq_scan_on))
+    if bad_seq:
+        problems.append(f"Seq Scan on {', '.join(bad_seq)}")
+    only = any(n.get("Node Type") == "Index Only Scan" for n in nodes)
+    status = "FAIL" if problems else "ok"
+    print(f"[{status}] {name}: {sorted(used)}{' (index-only)' if only else ''} cost={plan.get('Total Cost')}")
+    for p in problems:
+        print(f"       {p}")
+    if verbose or problems:
+        print("       " + _sql(query).replace("\n", "\n       "))
+    return not problems
+
+
+def run_checks(db, route_ids: list[str], day: date, verbose=False) -> bool:
+    ok = True
+    ok &= check(db, "public time-entries (origin)", public_slots_query(db, route_ids, day),
+                "ix_time_entries_route_date_public", verbose=verbose)
+    ok &= check(db, "public ops-payload (route)", public_slots_query(db, route_ids[:1], day),
+                "ix_time_entries_route_date_public", verbose=verbose)
+    ok &= check(db, "public calendar-availability",
+                calendar_min_price_query(db, route_ids, day, day + timedelta(days=60), min_seats=2),
+                "ix_time_entries_route_date_public", verbose=verbose)
+    # no date bound: any index led by route_id is a good plan
+    ok &= check(db, "public slot-dates", slot_dates_query(db, route_ids[:3]),
+                ("ix_time_entries_route_date_public", "uq_time_entry_route_date_start"), verbose=verbose)
+    ok &= check(db, "ops time-entries (date)",
+                db.query(TimeEntry).filter(TimeEntry.flight_date == day)
+                .order_by(TimeEntry.flight_date.asc(), TimeEntry.departure_time.asc(), TimeEntry.start.asc()).limit(2000),
+                "ix_time_entries_date_departure", verbose=verbose)
+    ok &= check(db, "ops dashboard slot totals (day)",
+                db.query(func.count(TimeEntry.id), func.coalesce(func.sum(TimeEntry.seats_available), 0))
+                .filter(TimeEntry.flight_date == day),
+                "ix_time_entries_date_departure", verbose=verbose)
+    start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    ok &= check(db, "admin metrics overview (created_at range)",
+                db.query(func.count(Booking.id)).filter(Booking.created_at >= start, Booking.created_at < start + timedelta(days=1)),
+                "ix_bookings_created_at", verbose=verbose)
+    return ok
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--no-seed", action="store_true", help="do not seed synthetic data; plan against existing rows")
+    ap.add_argument("--routes", type=int, default=40)
+    ap.add_argument("--days", type=int, default=180)
+    ap.add_argument("--times", type=int, default=6, help="slots per route per day")
+    ap.add_argument("--bookings", type=int, default=20000)
+    ap.add_argument("--verbose", "-v", action="store_true", help="print SQL for every query")
+    args = ap.parse_args()
+
+    informational = False
+    db = SessionLocal()
+    try:
+        day = datetime.now(timezone.utc).date()
+        if args.no_seed:
+            route_ids = [rid for (rid,) in db.execute(text(
+                "SELECT route_id FROM time_entries GROUP BY route_id ORDER BY count(*) DESC LIMIT 5")).all()]
+            if not route_ids:
+                print("no time entries to plan against (run without --no-seed)")
+                return 1
+            rows = db.execute(text("SELECT count(*) FROM time_entries")).scalar()
+            if rows < MIN_ROWS_FOR_CHECKS:
+                informational = True
+                print(f"only {rows} time entries: plans below are informational (run without --no-seed for checks)")
+        else:
+            params = {"origin": SEED_ORIGIN, "routes": args.routes, "days": args.days, "times": args.times,
+                      "bookings": args.bookings, "start_day": day}
+            for stmt in filter(str.strip, SEED_SQL.split(";")):
+                db.execute(text(stmt), params)
+            route_ids = [f"explain-route-{r}" for r in range(1, min(args.routes, 5) + 1)]
+            day = day + timedelta(days=min(args.days - 1, 14))
+            total = db.execute(text("SELECT count(*) FROM time_entries")).scalar()
+            print(f"seeded {args.routes} routes x {args.days} days x {args.times} slots ({total} time entries in tx)")
+        ok = run_checks(db, route_ids, day, verbose=args.verbose)
+    finally:
+        db.rollback()
+        db.close()
+    if informational:
+        return 0
+    print("all checks passed" if ok else "EXPLAIN regression detected")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
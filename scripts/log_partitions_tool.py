@@ -0,0 +1,69 @@
+"""
+Monthly partitions of audit_logs and email_logs.
+
+status: rows and size per partition (including the default partition, which should stay empty).
+
+    python scripts/log_partitions_tool.py status
+
+maintain: what the daily beat job does (create upcoming partitions, archive expired ones), once.
+--no-archive only creates partitions; --today simulates another date.
+
+    python scripts/log_partitions_tool.py maintain --no-archive
+    python scripts/log_partitions_tool.py maintain --today 2027-06-01
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import text  # noqa: E402
+
+from app.db.session import engine  # noqa: E402
+from app.services.log_partitions import PARTITIONED_TABLES, maintain_log_partitions  # noqa: E402
+
+
+def cmd_status(args) -> int:
+    with engine.connect() as conn:
+        for table in PARTITIONED_TABLES:
+            rows = conn.execute(text("""
+                SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint, pg_total_relation_size(c.oid)
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                JOIN pg_class p ON p.oid = i.inhparent
+                WHERE p.relname = :table
+                ORDER BY c.relname
+            """), {"table": table}).all()
+            if not rows:
+                print(f"{table}: not partitioned")
+                continue
+            print(table)
+            for name, bound, est_rows, size in rows:
+                # Exact counts for the default partition: anything there means maintenance fell behind
+                n = conn.execute(text(f"SELECT count(*) FROM {name}")).scalar() if name.endswith("_default") else max(est_rows, 0)
+                print(f"  {name:<24} {n:>10} rows{'' if name.endswith('_default') else ' (est.)'}  {size / 1024:>10.0f} KiB  {bound}")
+    return 0
+
+
+def cmd_maintain(args) -> int:
+    today = date.fromisoformat(args.today) if args.today else None
+    result = maintain_log_partitions(engine, today=today, archive=not args.no_archive)
+    for table, r in result.items():
+        print(f"{table}: created {r['created'] or '-'}; archived {r['archived'] or '-'}; kept {r['kept'] or '-'}")
+    return 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("status", help="partitions, row estimates and sizes")
+    p = sub.add_parser("maintain", help="create upcoming partitions and archive expired ones")
+    p.add_argument("--no-archive", action="store_true")
+    p.add_argument("--today", default=None, help="YYYY-MM-DD (default: today, UTC)")
+    args = ap.parse_args()
+    return cmd_status(args) if args.cmd == "status" else cmd_maintain(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+Concurrency stress test for seat inventory: moves, cancellations, hold expiry and new bookings
+racing on a few small slots.
+
+Worker threads call the real ops routes in-process (single-booking move and cancel, flight-level
+move and cancel) with an ops token. Alongside them they run create_booking() and the
+expire_holds job. Every operation picks its slots and bookings at random, so moves run in both
+directions at once. At the end, every slot must satisfy
+
+    seats_available >= 0  and  seats_available + pax of its active bookings == capacity
+
+and no operation may have failed with a deadlock or any other unexpected error. Expected
+refusals, such as a full target (409) or a booking already cancelled or moved (404/409), are
+counted but are not failures. Exits 1 if a check fails.
+
+    DATABASE_URL=postgresql+psycopg2://... python scripts/stress_seat_transfers.py
+    python scripts/stress_seat_transfers.py --slots 3 --capacity 8 --workers 16 --ops 200
+
+Note that expire_holds expires every overdue hold in the database, not only the bench ones.
+Bench data is tagged with a run id and deleted at the end unless --keep is given.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import func, text, update  # noqa: E402
+
+from app.core.security import create_access_token  # noqa: E402
+from app.db.session import SessionLocal  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.booking import Booking  # noqa: E402
+from app.models.time_entry import TimeEntry  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.audit_service import flush_audit_buffer  # noqa: E402
+from app.services.booking_service import create_booking, make_booking_ref  # noqa: E402
+from app.services.flight_ops_service import INACTIVE_BOOKING_STATUSES  # noqa: E402
+from app.services.inventory_service import adjust_seats  # noqa: E402
+from app.tasks.worker_jobs import expire_holds  # noqa: E402
+from bench_booking_funnel import BenchData  # noqa: E402
+
+OPS = ("move", "move", "move", "flight_move", "cancel", "flight_cancel", "create", "expire")
+
+
+class Stress:
+    def __init__(self, data: BenchData, slot_ids: list[str], token: str, customers: list[str]):
+        self.data = data
+        self.slot_ids = slot_ids
+        self.headers = {"Authorization": f"Bearer {token}"}
+        self.customers = customers
+        self.outcomes: Counter[str] = Counter()
+        self.failures: list[str] = []
+        self._lock = threading.Lock()
+
+    def _record(self, op: str, outcome: str, error: str = "") -> None:
+        with self._lock:
+            self.outcomes[f"{op}:{outcome}"] += 1
+            if error:
+                self.failures.append(f"{op}: {error}")
+
+    def _booking_refs(self, slot_id: str) -> list[str]:
+        db = SessionLocal()
+        try:
+            return [r for (r,) in db.query(Booking.booking_ref).filter(
+                Booking.time_entry_id == slot_id, ~Booking.status.in_(INACTIVE_BOOKING_STATUSES))]
+        finally:
+            db.close()
+
+    def run_op(self, client: TestClient, rng: random.Random) -> None:
+        op = rng.choice(OPS)
+        src, dst = rng.sample(self.slot_ids, 2)
+        try:
+            if op == "create":
+                db = SessionLocal()
+                try:
+                    booker = db.get(User, rng.choice(self.customers))
+                    create_booking(db, src, booker, rng.randint(1, 3), [])
+                    self._record(op, "ok")
+                except ValueError:
+                    db.rollback()
+                    self._record(op, "refused")
+                finally:
+                    db.close()
+                return
+            if op == "expire":
+                expire_holds()
+                self._record(op, "ok")
+                return
+            refs = self._booking_refs(src)
+            if not refs:
+                self._record(op, "empty")
+                return
+            if op == "move":
+                r = client.post(f"/api/v1/ops/bookings/{rng.choice(refs)}/move", json={"target": dst}, headers=self.headers)
+            elif op == "cancel":
+                r = client.post(f"/api/v1/ops/bookings/{rng.choice(refs)}/cancel", json={}, headers=self.headers)
+            elif op == "flight_move":
+                pick = rng.sample(refs, min(len(refs), rng.randint(1, 4)))
+                r = client.post(f"/api/v1/ops/time-entries/{src}/move-bookings", headers=self.headers,
+                                json={"target_time_entry_id": dst, "booking_refs": pick, "notify": False})
+            else:
+                pick = rng.sample(refs, min(len(refs), rng.randint(1, 2)))
+                r = client.post(f"/api/v1/ops/time-entries/{src}/cancel-bookings", headers=self.headers,
+                                json={"booking_refs": pick, "close_slot": False, "notify": False})
+            if r.status_code == 200:
+                self._record(op, "ok")
+            elif r.status_code in (404, 409):
+                self._record(op, "refused")
+            else:
+                self._record(op, "error", f"HTTP {r.status_code} {r.text[:200]}")
+        except Exception as e:  # deadlocks and anything else unexpected surface here
+            kind = "deadlock" if "deadlock detected" in str(e) else "error"
+            self._record(op, kind, f"{type(e).__name__}: {str(e).splitlines()[0][:200]}")
+
+
+def seed(data: BenchData, slots: int, capacity: int, bookings: int, rng: random.Random) -> tuple[list[str], str, list[str]]:
+    data.seed(1, slots, 1)
+    db = SessionLocal()
+    try:
+        slot_ids = [t for (t,) in db.query(TimeEntry.id).filter(TimeEntry.route_id == data.route_id).order_by(TimeEntry.start)]
+        db.execute(update(TimeEntry).where(TimeEntry.id.in_(slot_ids)).values(seats_available=capacity))
+        ops = User(id=str(uuid.uuid4()), email=f"bench+{data.run_id}-ops@example.test", role="ops", password_hash="!")
+        customers = [User(id=str(uuid.uuid4()), email=f"bench+{data.run_id}-{i}@example.test", role="customer", password_hash="!")
+                     for i in range(8)]
+        db.add_all([ops, *customers])
+        now = datetime.now(timezone.utc)
+        placed = 0
+        for _ in range(bookings * 5):  # slots may fill up before `bookings` are placed
+            if placed >= bookings:
+                break
+            te_id, pax = rng.choice(slot_ids), rng.randint(1, 3)
+            try:
+                with db.begin_nested():
+                    adjust_seats(db, {te_id: -pax})
+            except ValueError:
+                continue
+            kind = rng.random()
+            db.add(Booking(
+                id=str(uuid.uuid4()), booking_ref=make_booking_ref(), time_entry_id=te_id,
+                user_id=rng.choice(customers).id, pax=pax, total_usd=100 * pax,
+                # A third paid, a third with holds that expire during the run, a third with live holds
+                status="CONFIRMED" if kind < 0.33 else "PENDING_PAYMENT",
+                payment_status="paid" if kind < 0.33 else "pending",
+                hold_expires_at=None if kind < 0.33 else now + (timedelta(seconds=rng.randint(0, 5)) if kind < 0.66 else timedelta(hours=1)),
+            ))
+            placed += 1
+        db.commit()
+        return slot_ids, create_access_token(ops.id), [c.id for c in customers]
+    finally:
+        db.close()
+
+
+def check(slot_ids: list[str], capacity: int) -> list[str]:
+    db = SessionLocal()
+    try:
+        problems = []
+        for te_id, seats in db.query(TimeEntry.id, TimeEntry.seats_available).filter(TimeEntry.id.in_(slot_ids)).order_by(TimeEntry.start):
+            held = db.query(func.coalesce(func.sum(Booking.pax), 0)).filter(
+                Booking.time_entry_id == te_id, ~Booking.status.in_(INACTIVE_BOOKING_STATUSES)).scalar()
+            ok = seats >= 0 and seats + held == capacity
+            print(f"  slot {te_id[:8]}: seats_available {seats:>3} + active pax {held:>3} = {seats + held:>3} (capacity {capacity}) {'ok' if ok else 'MISMATCH'}")
+            if not ok:
+                problems.append(f"slot {te_id}: {seats} free + {held} held != {capacity}")
+        return problems
+    finally:
+        db.close()
+
+
+def cleanup(data: BenchData, slot_ids: list[str]) -> None:
+    flush_audit_buffer()
+    db = SessionLocal()
+    try:
+        params = {"routes": [data.route_id, data.contention_route_id], "slots": slot_ids}
+        for stmt in (
+            "DELETE FROM cancellations WHERE booking_id IN (SELECT b.id FROM bookings b JOIN time_entries t ON t.id = b.time_entry_id WHERE t.route_id = ANY(:routes))",
+            "DELETE FROM audit_logs WHERE entity_id IN (SELECT b.id FROM bookings b JOIN time_entries t ON t.id = b.time_entry_id WHERE t.route_id = ANY(:routes))",
+            "DELETE FROM audit_logs WHERE entity_type = 'time_entry' AND entity_id = ANY(:slots)",
+        ):
+            db.execute(text(stmt), params)
+        db.commit()
+    finally:
+        db.close()
+    data.cleanup()
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--slots", type=int, default=4)
+    ap.add_argument("--capacity", type=int, default=12, help="seats per slot (small = more full-slot refusals)")
+    ap.add_argument("--bookings", type=int, default=16, help="bookings seeded before the run (fewer if the slots fill up)")
+    ap.add_argument("--workers", type=int, default=12)
+    ap.add_argument("--ops", type=int, default=100, help="operations per worker")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--keep", action="store_true", help="keep bench data in the database")
+    args = ap.parse_args()
+
+    rng = random.Random(args.seed)
+    data = BenchData(uuid.uuid4().hex[:8])
+    slot_ids: list[str] = []
+    try:
+        slot_ids, token, customers = seed(data, max(args.slots, 2), args.capacity, args.bookings, rng)
+        stress = Stress(data, slot_ids, token, customers)
+        print(f"run {data.run_id}: {args.workers} workers x {args.ops} ops on {len(slot_ids)} slots of {args.capacity} seats")
+
+        def worker(n: int) -> None:
+            wrng = random.Random(rng.random() + n)
+            with TestClient(app, raise_server_exceptions=True) as client:
+                for _ in range(args.ops):
+                    stress.run_op(client, wrng)
+
+        t0 = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        total = sum(stress.outcomes.values())
+        print(f"{total} operations in {elapsed:.1f}s ({total / elapsed:.0f}/s)")
+        for key in sorted(stress.outcomes):
+            print(f"  {key:<24} {stress.outcomes[key]:>6}")
+
+        problems = check(slot_ids, args.capacity)
+        for f in stress.failures[:20]:
+            print(f"FAIL {f}")
+        for p in problems:
+            print(f"FAIL {p}")
+        if stress.failures or problems:
+            return 1
+        print("OK: no oversell, no lost seats, no deadlocks")
+        return 0
+    finally:
+        if not args.keep and slot_ids:
+            cleanup(data, slot_ids)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
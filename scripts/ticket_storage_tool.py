@@ -0,0 +1,128 @@
+"""
+Ticket storage maintenance.
+
+check: round-trip a ticket through a backend (put, exists, get, signed URL fetch, delete), plus one
+object above the multipart threshold for s3. Works against MinIO or any S3 stand-in:
+
+    docker compose --profile s3 up -d minio
+    TICKET_STORAGE_BACKEND=s3 S3_ENDPOINT_URL=http://localhost:9000 S3_BUCKET_NAME=flysunbird-tickets \\
+        S3_ACCESS_KEY_ID=flysunbird S3_SECRET_ACCESS_KEY=flysunbird-secret \\
+        python scripts/ticket_storage_tool.py check --create-bucket
+
+shard-local: move flat <TICKET_LOCAL_DIR>/<ref>.pdf files into the sharded layout and update
+bookings.ticket_object_key (dry run unless --apply):
+
+    python scripts/ticket_storage_tool.py shard-local
+    python scripts/ticket_storage_tool.py shard-local --apply
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.ticket_storage import (  # noqa: E402
+    LocalTicketStorage,
+    S3TicketStorage,
+    get_ticket_storage,
+)
+
+
+def cmd_check(args) -> int:
+    backend = get_ticket_storage(args.backend)
+    print(f"backend: {backend.name}")
+    if isinstance(backend, S3TicketStorage) and args.create_bucket:
+        client = backend.client()
+        try:
+            client.head_bucket(Bucket=backend.bucket_name)
+        except Exception:
+            client.create_bucket(Bucket=backend.bucket_name)
+            print(f"created bucket {backend.bucket_name}")
+
+    ref = f"FSB-CHECK-{uuid.uuid4().hex[:8].upper()}"
+    payloads = [("small", b"%PDF-1.4\n" + os.urandom(32 * 1024))]
+    if isinstance(backend, S3TicketStorage):
+        payloads.append(("multipart", b"%PDF-1.4\n" + os.urandom(backend.multipart_threshold + 1024 * 1024)))
+
+    failures = 0
+    for label, data in payloads:
+        t0 = time.perf_counter()
+        key = backend.put(f"{ref}-{label}", data)
+        put_ms = (time.perf_counter() - t0) * 1000
+        t0 = time.perf_counter()
+        got = backend.get_bytes(key)
+        get_ms = (time.perf_counter() - t0) * 1000
+        ok = backend.exists(key) and got == data
+        print(f"{label:<10} {len(data):>10} bytes  key={key}  put {put_ms:.1f}ms  get {get_ms:.1f}ms  {'ok' if ok else 'MISMATCH'}")
+        failures += not ok
+        signed = backend.signed_url(key)
+        if signed:
+            import requests
+
+            url, expires_in = signed
+            again, _ = backend.signed_url(key)
+            r = requests.get(url, timeout=60)
+            fetched = r.ok and r.content == data
+            print(f"{'':<10} signed url ({expires_in}s, cached={again == url}): HTTP {r.status_code} {'ok' if fetched else 'FAILED'}")
+            failures += not fetched
+        backend.delete(key)
+        if backend.exists(key):
+            print(f"{'':<10} delete left the object behind")
+            failures += 1
+    if backend.get_bytes(f"missing/{ref}.pdf") is not None or backend.exists(f"missing/{ref}.pdf"):
+        print("missing object reported as present")
+        failures += 1
+    print("PASS" if not failures else f"FAIL ({failures})")
+    return 1 if failures else 0
+
+
+def cmd_shard_local(args) -> int:
+    from app.db.session import SessionLocal
+    from app.models.booking import Booking
+
+    backend = get_ticket_storage("local")
+    assert isinstance(backend, LocalTicketStorage)
+    sharded = LocalTicketStorage(backend.base_dir, sharded=True)
+    db = SessionLocal()
+    moved = 0
+    try:
+        rows = db.query(Booking).filter(Booking.ticket_storage == "local", Booking.ticket_object_key.isnot(None)).all()
+        for b in rows:
+            key = b.ticket_object_key
+            new_key = sharded.key_for(b.booking_ref)
+            if key == new_key:
+                continue
+            src = backend.path_for(key)
+            if not os.path.isfile(src):
+                print(f"skip {b.booking_ref}: {src} missing")
+                continue
+            print(f"{src} -> {sharded.path_for(new_key)}")
+            if args.apply:
+                dst = sharded.path_for(new_key)
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                os.replace(src, dst)
+                b.ticket_object_key = new_key
+                db.commit()  # per file, so an interrupted run leaves keys and files consistent
+            moved += 1
+    finally:
+        db.close()
+    print(f"{moved} ticket(s) {'moved' if args.apply else 'to move (dry run; pass --apply)'}")
+    return 0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("check", help="round-trip test of a storage backend")
+    p.add_argument("--backend", default=None, help="local | gcs | s3 (default: TICKET_STORAGE_BACKEND / auto)")
+    p.add_argument("--create-bucket", action="store_true", help="s3: create the bucket if it does not exist")
+    p = sub.add_parser("shard-local", help="move flat local tickets into the sharded layout")
+    p.add_argument("--apply", action="store_true")
+    args = ap.parse_args()
+    return cmd_check(args) if args.cmd == "check" else cmd_shard_local(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,13 +1,13 @@
 #!/usr/bin/env python3
 """
-Run migrations (same process, same DATABASE_URL), then seed, then uvicorn.
-Ensures tables exist before seed and app start.
+Run the startup steps (migrations, seed, legacy cleanup; skipped when unchanged), then uvicorn.
+Ensures tables exist before app start.
 """
 import os
 import sys
 from pathlib import Path
 
-# Load .env before any code that reads os.environ (e.g. wait_for_db)
+# Load .env before any code that reads os.environ (e.g. settings)
 try:
     from dotenv import load_dotenv
     env_path = Path(__file__).resolve().parent / ".env"
@@ -15,30 +15,19 @@ try:
 except Exception:
     pass
 
-# 1) Wait for DB
-import wait_for_db  # noqa: F401
-
-# 2) Run migrations using the same settings as the app
+# 1) Wait for DB, then migrations, seed and legacy cleanup, each only if its inputs changed (app/startup.py)
 from app.core.config import settings
-from alembic.config import Config
-from alembic import command
-
-alembic_cfg = Config(os.path.join(os.path.dirname(__file__), "alembic.ini"))
-alembic_cfg.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
-command.upgrade(alembic_cfg, "head")
+from app.startup import run as run_startup
+run_startup()
 
-# 3) Seed using an engine created *after* migrations (avoids app engine created during Alembic env load)
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-seed_engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
-SeedSession = sessionmaker(autocommit=False, autoflush=False, bind=seed_engine)
-seed_db = SeedSession()
-from app.seed import run as run_seed
-run_seed(seed_db)
-seed_db.close()
-seed_engine.dispose()
+# Prometheus multiprocess mode: start with an empty samples directory
+if settings.PROMETHEUS_MULTIPROC_DIR:
+    import shutil
+    shutil.rmtree(settings.PROMETHEUS_MULTIPROC_DIR, ignore_errors=True)
+    os.makedirs(settings.PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = settings.PROMETHEUS_MULTIPROC_DIR
 
-# 4) Start uvicorn (replace current process)
+# 2) Start uvicorn (replace current process)
 os.execv(
     sys.executable,
     [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "0.0.0.0", "--port", "8000"],